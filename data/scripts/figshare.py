@@ -0,0 +1,195 @@
+"""Local, checksum-verified cache of the snake cross-section from FigShare.
+
+The raw coordinates are stored under their SHA-256 digest
+(content-addressed) in the cache directory, and an index maps the FigShare
+URL to the digest of its content.
+The cache directory defaults to `data/.cache` and can be changed with the
+environment variable `SNAKELIPS_CACHE`; setting `SNAKELIPS_OFFLINE=1`
+forbids any download (offline mode).
+
+To seed the cache on a node without internet access, copy the raw file
+and run: `python figshare.py --add snakeFigshare.txt`.
+"""
+
+import argparse
+import hashlib
+import os
+import pathlib
+import shutil
+import tempfile
+import urllib.request
+
+import numpy
+import yaml
+
+
+URL = 'https://ndownloader.figshare.com/files/3088811'
+CACHEDIR = pathlib.Path(os.environ.get(
+    'SNAKELIPS_CACHE',
+    pathlib.Path(__file__).absolute().parents[1] / '.cache'))
+
+
+def is_offline():
+    """Return True if downloads are disabled by the environment."""
+    value = os.environ.get('SNAKELIPS_OFFLINE', '0')
+    return value.lower() in ('1', 'true', 'yes')
+
+
+def sha256sum(filepath, blocksize=2**16):
+    """Compute the SHA-256 digest of a file."""
+    h = hashlib.sha256()
+    with open(filepath, 'rb') as infile:
+        for block in iter(lambda: infile.read(blocksize), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _read_index(cachedir):
+    """Read the index of the cache (mapping URL -> digest)."""
+    filepath = cachedir / 'index.yaml'
+    if not filepath.is_file():
+        return {}
+    with open(filepath, 'r') as infile:
+        return yaml.safe_load(infile) or {}
+
+
+def _write_index(cachedir, index):
+    """Write the index of the cache."""
+    with open(cachedir / 'index.yaml', 'w') as outfile:
+        yaml.safe_dump(index, outfile, default_flow_style=False)
+
+
+def add_file(filepath, url=URL, sha256=None, cachedir=CACHEDIR):
+    """Store a local copy of the raw file into the cache.
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the file to store.
+    url : str
+        URL the file was downloaded from; default: FigShare URL.
+    sha256 : str
+        Expected SHA-256 digest of the file; default: None (no check).
+    cachedir : pathlib.Path
+        Cache directory.
+
+    Returns
+    -------
+    pathlib.Path
+        Path of the cached file.
+
+    """
+    digest = sha256sum(filepath)
+    if sha256 is not None and digest != sha256:
+        raise ValueError(f'Checksum mismatch for {url}: '
+                         f'expected {sha256}, got {digest}')
+    cachedir.mkdir(parents=True, exist_ok=True)
+    cached = cachedir / f'{digest}.txt'
+    if not cached.is_file():
+        shutil.copyfile(filepath, cached)
+    index = _read_index(cachedir)
+    index[url] = digest
+    _write_index(cachedir, index)
+    return cached
+
+
+def fetch(url=URL, sha256=None, offline=None, cachedir=CACHEDIR):
+    """Return the path of the cached raw file, downloading it if necessary.
+
+    Parameters
+    ----------
+    url : str
+        URL of the raw file; default: FigShare URL.
+    sha256 : str
+        Expected SHA-256 digest of the file; default: None (use the digest
+        recorded in the index of the cache, if any).
+    offline : bool
+        If True, never download the file; default: None (use environment
+        variable `SNAKELIPS_OFFLINE`).
+    cachedir : pathlib.Path
+        Cache directory.
+
+    Returns
+    -------
+    pathlib.Path
+        Path of the cached file (content verified).
+
+    """
+    if offline is None:
+        offline = is_offline()
+    digest = sha256 or _read_index(cachedir).get(url)
+    if digest is not None:
+        cached = cachedir / f'{digest}.txt'
+        if cached.is_file():
+            if sha256sum(cached) == digest:
+                return cached
+            print(f'[WARNING] Corrupted cache entry {cached}; removing it')
+            cached.unlink()
+    if offline:
+        raise RuntimeError(f'{url} is not in the cache {cachedir} '
+                           'and downloads are disabled (offline mode)')
+    print(f'[INFO] Downloading {url} ...')
+    cachedir.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=cachedir) as tmpdir:
+        filepath = pathlib.Path(tmpdir) / 'download.txt'
+        urllib.request.urlretrieve(url, str(filepath))
+        return add_file(filepath, url=url, sha256=digest, cachedir=cachedir)
+
+
+def load_coordinates(url=URL, sha256=None, offline=None, binary=True,
+                     cachedir=CACHEDIR):
+    """Load the raw coordinates of the cross-section through the cache.
+
+    Parameters
+    ----------
+    url : str
+        URL of the raw file; default: FigShare URL.
+    sha256 : str
+        Expected SHA-256 digest of the file; default: None.
+    offline : bool
+        If True, never download the file; default: None (use environment).
+    binary : bool
+        If True, load (and create if missing) a binary NumPy copy
+        of the coordinates next to the cached text file; default: True.
+    cachedir : pathlib.Path
+        Cache directory.
+
+    Returns
+    -------
+    numpy.ndarray
+        x-coordinates of the cross-section.
+    numpy.ndarray
+        y-coordinates of the cross-section.
+
+    """
+    filepath = fetch(url=url, sha256=sha256, offline=offline,
+                     cachedir=cachedir)
+    npypath = filepath.with_suffix('.npy')
+    if binary and npypath.is_file():
+        x, y = numpy.load(npypath)
+        return x.copy(), y.copy()
+    with open(filepath, 'r') as infile:
+        coords = numpy.loadtxt(infile, dtype=numpy.float64, unpack=True)
+    if binary:
+        numpy.save(npypath, coords)
+    return coords[0], coords[1]
+
+
+def parse_command_line():
+    """Parse the command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--add', dest='filepath', type=pathlib.Path,
+                        default=None,
+                        help='store a local copy of the raw file in the cache')
+    parser.add_argument('--offline', action='store_true',
+                        help='do not download the raw file')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_command_line()
+    if args.filepath is not None:
+        filepath = add_file(args.filepath)
+    else:
+        filepath = fetch(offline=args.offline or None)
+    print(f'[INFO] Cached file: {filepath}')
@@ -0,0 +1,353 @@
+"""Curves and tools to reshape the lips of the snake cross-section."""
+
+import numpy
+
+
+class Point2D(object):
+    """Structure to store the coordinates of a point in 2D."""
+
+    def __init__(self, x, y):
+        """Set coordinates of the point."""
+        self.x, self.y = x, y
+
+    def __repr__(self):
+        """Return the representation of the object."""
+        return f'Point2D({self.x}, {self.y})'
+
+    def distance(self, point):
+        """Compute the distance to another point."""
+        return numpy.sqrt((point.x - self.x)**2 + (point.y - self.y)**2)
+
+
+class Curve2D(object):
+    """Structure to store the coordinates of a 2D curve.
+
+    The coordinates are stored in a single (N, 2) array; `x` and `y`
+    are views of its columns.
+    Sub-curves obtained with `view` share the buffer of their parent.
+    Segment lengths and the index of the points are computed lazily
+    and cached.
+    """
+
+    def __init__(self, x, y=None):
+        """Set coordinates of the curve.
+
+        Parameters
+        ----------
+        x : numpy.ndarray
+            x-coordinates of the points, or (N, 2) array of coordinates
+            if `y` is None.
+        y : numpy.ndarray
+            y-coordinates of the points; default: None.
+
+        """
+        if y is None:
+            xy = numpy.asarray(x, dtype=numpy.float64)
+        else:
+            xy = numpy.column_stack((x, y)).astype(numpy.float64, copy=False)
+        if xy.ndim != 2 or xy.shape[1] != 2:
+            raise ValueError(f'Expected (N, 2) coordinates, got {xy.shape}')
+        self._set_coords(xy)
+
+    def _set_coords(self, xy):
+        """Set the buffer of coordinates and reset the cached quantities."""
+        self.xy = xy
+        self._cumsum = None
+        self._index = None
+
+    def __repr__(self):
+        """Return the representation of the object."""
+        return (f'Curve2D(start={self.start},\n' +
+                f'        end={self.end},\n' +
+                f'        size={self.size},\n' +
+                f'        length={self.length})')
+
+    @property
+    def x(self):
+        """Return the x-coordinates (view)."""
+        return self.xy[:, 0]
+
+    @property
+    def y(self):
+        """Return the y-coordinates (view)."""
+        return self.xy[:, 1]
+
+    @property
+    def size(self):
+        """Return the number of points."""
+        return self.xy.shape[0]
+
+    @property
+    def start(self):
+        """Return the first point of the curve."""
+        return self.point(0)
+
+    @property
+    def end(self):
+        """Return the last point of the curve."""
+        return self.point(-1)
+
+    @property
+    def length(self):
+        """Return the length of the curve."""
+        return self.cumsum_lengths()[-1]
+
+    def point(self, i):
+        """Return the point of the curve with index i."""
+        return Point2D(*self.xy[i])
+
+    def find_index(self, point, tol=0.0):
+        """Find index of point in the curve.
+
+        Parameters
+        ----------
+        point : Point2D
+            The point to look for.
+        tol : float
+            Tolerance on the distance between the points; default: 0.0
+            (exact match, hashed lookup).
+
+        Returns
+        -------
+        int or None
+            Index of the first matching point; None if not found.
+
+        """
+        if tol > 0.0:
+            dist = numpy.hypot(self.x - point.x, self.y - point.y)
+            idx = numpy.flatnonzero(dist <= tol)
+            return int(idx[0]) if idx.size > 0 else None
+        if self._index is None:
+            index = {}
+            for i, key in enumerate(map(tuple, self.xy.tolist())):
+                index.setdefault(key, i)
+            self._index = index
+        return self._index.get((float(point.x), float(point.y)))
+
+    def apply_mask(self, mask):
+        """Apply a mask to return a new 2D curve."""
+        return Curve2D(self.xy[mask])
+
+    def view(self, start=None, end=None, stride=1):
+        """Return a sub part of the curve (sharing the same buffer)."""
+        return Curve2D(self.xy[start:end:stride])
+
+    def append(self, curves):
+        """Return a new extended curve."""
+        if not hasattr(curves, '__iter__'):
+            curves = [curves]
+        return Curve2D(numpy.concatenate((self.xy, *(c.xy for c in curves))))
+
+    def cumsum_lengths(self):
+        """Return cumulated sum of distances along the curve."""
+        if self._cumsum is None:
+            dx, dy = numpy.diff(self.xy, axis=0).T
+            lengths = numpy.sqrt(dx**2 + dy**2)
+            self._cumsum = numpy.concatenate(([0.0], numpy.cumsum(lengths)))
+        return self._cumsum
+
+    def rotate(self, center=Point2D(0.0, 0.0), theta=0.0):
+        """Rotate the curve."""
+        cos, sin = numpy.cos(theta), numpy.sin(theta)
+        xr, yr = self.x - center.x, self.y - center.y
+        self._set_coords(numpy.column_stack((center.x + xr * cos - yr * sin,
+                                             center.y + xr * sin + yr * cos)))
+
+    def reverse(self):
+        """Reverse the curve."""
+        self._set_coords(self.xy[::-1])
+
+
+class Circle2D(Curve2D):
+    """Structure to store the coordinates of a 2D circle."""
+
+    def __init__(self, center, R, num=50):
+        """Create the circle."""
+        self.center = center
+        self.R = R
+        theta = numpy.linspace(0.0, 2 * numpy.pi, num=num)[:-1]
+        super().__init__(center.x + R * numpy.cos(theta),
+                         center.y + R * numpy.sin(theta))
+
+    def __repr__(self):
+        """Return the representation of the object."""
+        return (f'Circle2D(R={self.R},\n' +
+                f'         center={self.center},\n' +
+                f'         size={self.size})')
+
+
+class Line2D(Curve2D):
+    """Structure to store the coordinates of a 2D line."""
+
+    def __init__(self, point1, point2, num=50):
+        """Create the line between two given points."""
+        super().__init__(numpy.linspace(point1.x, point2.x, num=num),
+                         numpy.linspace(point1.y, point2.y, num=num))
+
+    def __repr__(self):
+        """Return the representation of the object."""
+        return (f'Line2D(start={self.start},\n' +
+                f'       end={self.end},\n' +
+                f'       size={self.size},\n' +
+                f'       length={self.length})')
+
+
+def reshape_lip(curve, reverse=False):
+    """Reshape a lip of the cross-section.
+
+    We replace the lip with an circular arc followed by a straight section.
+
+    Parameters
+    ----------
+    curve : Curve2D
+        2D curve of the original lip.
+    reverse : bool
+        Set to True if the lip coordinates start from the upper surface
+        of the snake cross-section to finish in the lower surface;
+        default: False.
+
+    Returns
+    -------
+    Curve2D
+        2D curve of the modified lip.
+
+    """
+    s = -1 if reverse else 1
+    curve = Curve2D(s * curve.x[::s], curve.y[::s])
+    start, end = curve.point(1), curve.end
+    prev = curve.start
+    # Find the intersection between the line (`prev`, `start`)
+    # and horizontal line passing by `end`.
+    inters = Point2D(start.x +
+                     (end.y - start.y) / (start.y - prev.y) *
+                     (start.x - prev.x),
+                     end.y)
+    # Compute distance (`start`, `inters`).
+    L = start.distance(inters)
+    # Compute intermediate point at distance `L` of `inters`
+    # on the horizontal line.
+    interm = Point2D(inters.x + L, end.y)
+    # Compute the center of the circle with radius R,
+    # passing by `start` and `interm` points,
+    # such that lines (`prev`, `start`) and (`interm`, `end`) are tangents
+    # to the circle, and such that the center and the intermediate points
+    # have the same x-coord. (Using Pythagorean theorem.)
+    center = Point2D(interm.x,
+                     ((start.x - interm.x)**2 + start.y**2 - interm.y**2) /
+                     (2 * (start.y - interm.y)))
+    # Create the circle.
+    R = center.y - end.y
+    circle = Circle2D(center, R)
+    # Keep arc that will define the retracted lip.
+    arc = circle.apply_mask((circle.x < center.x) & (circle.y < start.y))
+    # Concatenate curves to form the modified lip.
+    start_line = Line2D(prev, start, num=2)
+    end_line = Line2D(Point2D(center.x, end.y), end, num=2)
+    lip = start_line.append([arc, end_line])
+    return Curve2D(s * lip.x[::s], lip.y[::s])
+
+
+def truncate_curve(curve0, start, target_length, reverse=False):
+    """Return a truncated curve based on a target distance (along the curve).
+
+    The last point for the new curve is interpolated.
+
+    Parameters
+    ----------
+    curve0 : Curve2D
+        2D curve to truncate.
+    start : Point2D
+        Starting point along the curve.
+    target_length : float
+        Target length of the new curve.
+    reverse : bool
+        If True, truncate the curve in the reverse direction; default: False.
+
+    Returns
+    -------
+    Curve2D
+        The truncated curve with given length.
+    int
+        Index of the last point that belongs the both curves
+        (one before interpolation).
+
+    """
+    curve_dir = curve0.view(stride=-1) if reverse else curve0
+    idx = curve_dir.find_index(start)
+    curve = curve_dir.view(start=idx)
+    # Compute cumulated distances.
+    cumsum_lengths = curve.cumsum_lengths()
+    # Find cutoff index (last point strictly before the target length).
+    index = numpy.searchsorted(cumsum_lengths, target_length) - 1
+    p1 = curve.point(index)
+    p2 = curve.point(index + 1)
+    # Get remaining distance to add.
+    extra_length = target_length - cumsum_lengths[index]
+    # Compute the first ignored distance.
+    next_length = cumsum_lengths[index + 1] - cumsum_lengths[index]
+    # Interpolation.
+    pi = Point2D(p1.x + extra_length / next_length * (p2.x - p1.x),
+                 p1.y + extra_length / next_length * (p2.y - p1.y))
+    # Keep section of interest.
+    curve = Curve2D(numpy.vstack((curve.xy[:index + 1], [[pi.x, pi.y]])))
+    assert(abs(curve.length - target_length) < 1e-12)
+    if reverse:
+        curve.reverse()
+        return curve, curve0.size - 1 - (idx + index)
+    return curve, idx + index
+
+
+def find_lip_tip(section, back=False):
+    """Return the tip of a lip (lowest point of the front or back half).
+
+    Parameters
+    ----------
+    section : Curve2D
+        2D curve of the cross-section (centered at x=0).
+    back : bool
+        If True, return the tip of the back lip; default: False.
+
+    Returns
+    -------
+    Point2D
+        The tip of the lip.
+
+    """
+    curve = section.apply_mask(section.x > 0.0 if back else section.x < 0.0)
+    return curve.point(numpy.argmin(curve.y))
+
+
+def retract_lip(section, tip, length, back=False):
+    """Retract a lip of the cross-section.
+
+    The lip spans `length` (along the curve) on both sides of its tip;
+    it is replaced with a circular arc and a straight line
+    (see `reshape_lip`).
+
+    Parameters
+    ----------
+    section : Curve2D
+        2D curve of the cross-section.
+    tip : Point2D
+        Tip of the lip (a point of the section).
+    length : float
+        Distance along the curve between the tip and the lip boundaries.
+    back : bool
+        Set to True for the back lip; default: False.
+
+    Returns
+    -------
+    Curve2D
+        2D curve of the modified lip.
+    int
+        Index (in the section) of the first point replaced by the lip
+        (the section is kept up to this index, excluded).
+    int
+        Index (in the section) of the last point replaced by the lip
+        (the section resumes after this index).
+
+    """
+    curve1, index1 = truncate_curve(section, tip, length, reverse=True)
+    curve2, index2 = truncate_curve(section, tip, length)
+    lip = reshape_lip(curve1.append(curve2), reverse=back)
+    return lip, index1, index2
@@ -1,20 +1,15 @@
 """Get snake cross-section from FigShare and plot geometry."""
 
 from matplotlib import pyplot
-import numpy
 import pathlib
-import urllib.request
+
+import figshare
 
 scriptdir = pathlib.Path(__file__).absolute().parent
 rootdir = scriptdir.parent
 
-# Get geometry from FigShare.
-filename = pathlib.Path('snakeFigshare.txt')
-url = 'https://ndownloader.figshare.com/files/3088811'
-urllib.request.urlretrieve(url, str(filename))
-with open(filename, 'r') as infile:
-    coords = numpy.loadtxt(infile, dtype=numpy.float64, unpack=True)
-filename.unlink()
+# Get geometry from FigShare (through the local cache).
+coords = figshare.load_coordinates()
 
 # Plot the geometry.
 pyplot.rc('font', family='serif', size=12)
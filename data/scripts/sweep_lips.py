@@ -0,0 +1,182 @@
+"""Generate cross-sections for a sweep of front and back lip sizes.
+
+Each lip is retracted once per requested length (distance along the curve
+between the tip and the boundaries of the lip, in chord units); the
+sections for all (front, back) combinations are then assembled into a
+single buffer of coordinates and saved into a NumPy archive.
+A length of zero keeps the original lip; a length longer than the curve
+on either side of the tip cannot be retracted, and its combinations are
+marked invalid.
+"""
+
+import argparse
+import pathlib
+import time
+
+import numpy
+
+from geometry import Curve2D, find_lip_tip, retract_lip
+
+
+scriptdir = pathlib.Path(__file__).absolute().parent
+rootdir = scriptdir.parent
+
+
+def _lip_variants(snake, lengths, back=False):
+    """Retract a lip for each given length.
+
+    Returns the (F, 2) coordinates of each modified lip, the (F, 2)
+    indices of the points of the section it replaces (first and last), and
+    the (F,) validity of each length (False, with an empty lip, if the
+    length exceeds the curve available on either side of the tip).
+    """
+    tip = find_lip_tip(snake, back=back)
+    tip_idx = snake.find_index(tip)
+    # Lengths of the curve before and after the tip.
+    cumsum_lengths = snake.cumsum_lengths()
+    available = min(cumsum_lengths[tip_idx],
+                    cumsum_lengths[-1] - cumsum_lengths[tip_idx])
+    lips, bounds = [], numpy.empty((len(lengths), 2), dtype=numpy.int64)
+    valid = numpy.ones(len(lengths), dtype=bool)
+    for k, length in enumerate(lengths):
+        if length <= 0.0 or length > available:
+            # Keep the original lip: replace nothing with nothing.
+            lips.append(numpy.empty((0, 2)))
+            bounds[k] = tip_idx, tip_idx - 1
+            valid[k] = length <= 0.0
+        else:
+            lip, index1, index2 = retract_lip(snake, tip, length, back=back)
+            lips.append(lip.xy)
+            bounds[k] = index1, index2
+    return lips, bounds, valid
+
+
+def sweep_lips(snake, front_lengths, back_lengths):
+    """Generate the modified sections for all combinations of lip sizes.
+
+    Parameters
+    ----------
+    snake : Curve2D
+        2D curve of the original cross-section (unit chord).
+    front_lengths : array_like
+        Lengths of the front lip, of shape (F,).
+    back_lengths : array_like
+        Lengths of the back lip, of shape (B,).
+
+    Returns
+    -------
+    numpy.ndarray
+        Coordinates of all sections concatenated, of shape (M, 2).
+    numpy.ndarray
+        Offsets of each section in the coordinates, of shape (F * B + 1,);
+        section (i, j) is `coords[offsets[i * B + j]:offsets[i * B + j + 1]]`.
+    numpy.ndarray
+        Validity of each combination, of shape (F, B);
+        a combination is invalid (and empty) if the lips overlap or if a
+        lip is too long to be retracted.
+
+    """
+    front_lips, front_bounds, front_valid = _lip_variants(snake,
+                                                         front_lengths)
+    back_lips, back_bounds, back_valid = _lip_variants(snake, back_lengths,
+                                                       back=True)
+    # Compute the size of all sections at once.
+    front_sizes = numpy.array([lip.shape[0] for lip in front_lips])
+    back_sizes = numpy.array([lip.shape[0] for lip in back_lips])
+    front_delta = front_sizes - (front_bounds[:, 1] - front_bounds[:, 0] + 1)
+    back_delta = back_sizes - (back_bounds[:, 1] - back_bounds[:, 0] + 1)
+    valid = ((front_bounds[:, 1, None] < back_bounds[None, :, 0]) &
+             front_valid[:, None] & back_valid[None, :])
+    sizes = snake.size + front_delta[:, None] + back_delta[None, :]
+    sizes = numpy.where(valid, sizes, 0)
+    offsets = numpy.concatenate(([0], numpy.cumsum(sizes.ravel())))
+    # Fill a single buffer with the pieces of each section.
+    coords = numpy.empty((offsets[-1], 2))
+    B = len(back_lips)
+    for i, j in zip(*numpy.nonzero(valid)):
+        (f1, f2), (b1, b2) = front_bounds[i], back_bounds[j]
+        pieces = [snake.xy[:f1], front_lips[i], snake.xy[f2 + 1:b1],
+                  back_lips[j], snake.xy[b2 + 1:]]
+        start = offsets[i * B + j]
+        for piece in pieces:
+            coords[start:start + piece.shape[0]] = piece
+            start += piece.shape[0]
+    return coords, offsets, valid
+
+
+def write_sweep(filepath, front_lengths, back_lengths, coords, offsets, valid):
+    """Save the sections of a sweep into a compressed NumPy archive."""
+    numpy.savez_compressed(filepath,
+                           front_lengths=numpy.asarray(front_lengths),
+                           back_lengths=numpy.asarray(back_lengths),
+                           coords=coords, offsets=offsets, valid=valid)
+
+
+def read_sweep(filepath):
+    """Load the sections of a sweep from a NumPy archive.
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the archive.
+
+    Returns
+    -------
+    numpy.ndarray
+        Lengths of the front lip, of shape (F,).
+    numpy.ndarray
+        Lengths of the back lip, of shape (B,).
+    dict
+        Sections (Curve2D, views of a single buffer) keyed by (i, j)
+        for all valid combinations.
+
+    """
+    with numpy.load(filepath) as data:
+        front_lengths = data['front_lengths']
+        back_lengths = data['back_lengths']
+        coords, offsets = data['coords'], data['offsets']
+        valid = data['valid']
+    B = back_lengths.size
+    sections = {}
+    for i, j in zip(*numpy.nonzero(valid)):
+        k = i * B + j
+        sections[(i, j)] = Curve2D(coords[offsets[k]:offsets[k + 1]])
+    return front_lengths, back_lengths, sections
+
+
+def parse_command_line():
+    """Parse the command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--front', dest='front_range', type=float, nargs=3,
+                        default=(0.0, 0.3, 16),
+                        metavar=('START', 'END', 'NUM'),
+                        help='lengths of the front lip (linspace)')
+    parser.add_argument('--back', dest='back_range', type=float, nargs=3,
+                        default=(0.0, 0.3, 16),
+                        metavar=('START', 'END', 'NUM'),
+                        help='lengths of the back lip (linspace)')
+    parser.add_argument('--output', type=pathlib.Path,
+                        default=rootdir / 'lip_sweep.npz',
+                        help='path of the NumPy archive to write')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_command_line()
+    start, end, num = args.front_range
+    front_lengths = numpy.linspace(start, end, num=int(num))
+    start, end, num = args.back_range
+    back_lengths = numpy.linspace(start, end, num=int(num))
+
+    # Load the original cross-section (unit chord, centered at origin).
+    filepath = rootdir / 'snake_bothlips.txt'
+    snake = Curve2D(*numpy.loadtxt(filepath, unpack=True))
+
+    tic = time.perf_counter()
+    coords, offsets, valid = sweep_lips(snake, front_lengths, back_lengths)
+    print(f'[INFO] Generated {numpy.count_nonzero(valid)} sections '
+          f'({valid.size - numpy.count_nonzero(valid)} invalid) '
+          f'in {time.perf_counter() - tic:.3f} s')
+    write_sweep(args.output, front_lengths, back_lengths,
+                coords, offsets, valid)
+    print(f'[INFO] Sections saved into {args.output}')
@@ -0,0 +1,182 @@
+"""Render an animation of the vorticity field in parallel.
+
+Each worker process builds the figure once (axes, labels, body polygon)
+and, for every time step it receives, reads the vorticity field, replaces
+the filled contours, updates the time label, and returns the RGBA pixels
+of the frame.
+The main process receives the frames in order and pipes them to FFmpeg
+(MP4 or GIF); without FFmpeg, GIF files are written with Pillow.
+"""
+
+import multiprocessing
+import os
+import pathlib
+import shutil
+import subprocess
+import time
+
+import numpy
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import petibmpy
+
+import archive
+
+
+_worker = {}  # figure template and data source (in workers)
+
+
+def _read_frame(source, timestep):
+    """Read the vorticity field at a time step."""
+    if source.suffix == '.h5':  # archive
+        frames = archive.iter_frames(source, 'wz', timesteps=[timestep])
+        return next(frames)[1]
+    return petibmpy.read_field_hdf5(source / f'{timestep:0>7}.h5', 'wz')
+
+
+def _init_worker(source, grid, body, dt, levels, limits, dpi):
+    """Build the figure template of a worker."""
+    fig = Figure(figsize=(5.0, 3.0), dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    text = ax.text(-0.5, 1.0, '')
+    ax.set_xlabel('x')
+    ax.set_ylabel('y')
+    ax.fill(*body, color='gray', zorder=3)
+    ax.set_aspect('equal', adjustable='box')
+    ax.set_xlim(limits[:2])
+    ax.set_ylim(limits[2:])
+    fig.tight_layout()
+    # Restrict the grid to the view (contours outside are not visible).
+    x, y = grid
+    i0, i1 = numpy.searchsorted(x, limits[:2])
+    j0, j1 = numpy.searchsorted(y, limits[2:])
+    view = (slice(max(j0 - 1, 0), j1 + 1), slice(max(i0 - 1, 0), i1 + 1))
+    _worker.update(source=source, fig=fig, ax=ax, text=text, dt=dt,
+                   levels=levels, x=x[view[1]], y=y[view[0]], view=view,
+                   contours=None)
+
+
+def _remove_contours(contours):
+    """Remove filled contours from their axis."""
+    try:
+        contours.remove()
+    except AttributeError:  # older Matplotlib
+        for collection in contours.collections:
+            collection.remove()
+
+
+def _render(timestep):
+    """Render the frame of a time step and return its RGBA pixels."""
+    w = _worker
+    wz = _read_frame(w['source'], timestep)
+    if w['contours'] is not None:
+        _remove_contours(w['contours'])
+    w['contours'] = w['ax'].contourf(w['x'], w['y'], wz[w['view']],
+                                     levels=w['levels'], extend='both')
+    w['text'].set_text(f't = {timestep * w["dt"]:.1f}')
+    w['fig'].canvas.draw()
+    return numpy.array(w['fig'].canvas.buffer_rgba(), dtype=numpy.uint8)
+
+
+def _open_ffmpeg(filepath, width, height, fps):
+    """Start FFmpeg to encode RGBA frames read from its standard input."""
+    cmd = ['ffmpeg', '-y', '-loglevel', 'error',
+           '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f'{width}x{height}',
+           '-r', str(fps), '-i', '-']
+    if filepath.suffix == '.gif':
+        cmd += ['-vf', 'split[a][b];[a]palettegen[p];[b][p]paletteuse']
+    else:
+        cmd += ['-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2', '-pix_fmt', 'yuv420p',
+                '-vcodec', 'libx264']
+    return subprocess.Popen(cmd + [str(filepath)], stdin=subprocess.PIPE)
+
+
+def animate_vorticity(source, grid, body, timesteps, filepath, dt,
+                      levels=numpy.linspace(-5.0, 5.0, num=50),
+                      limits=(-1.0, 4.0, -1.5, 1.5), fps=10, dpi=150,
+                      nproc=None):
+    """Render the vorticity field at the given time steps into a video.
+
+    Parameters
+    ----------
+    source : pathlib.Path
+        Vorticity archive (`wz.h5`) or directory with one file per step.
+    grid : list of numpy.ndarray
+        Gridlines of the vorticity field.
+    body : tuple of numpy.ndarray
+        Coordinates of the body.
+    timesteps : list of int
+        Time steps to render (in the order of the animation).
+    filepath : pathlib.Path
+        Path of the video (`.mp4` or `.gif`).
+    dt : float
+        Time-step size (to label the frames).
+    levels : numpy.ndarray
+        Contour levels.
+    limits : tuple of floats
+        View (xmin, xmax, ymin, ymax); default: (-1.0, 4.0, -1.5, 1.5).
+    fps : int
+        Frames per second of the video; default: 10.
+    dpi : int
+        Resolution of the frames; default: 150.
+    nproc : int
+        Number of worker processes; default: None (number of CPUs).
+
+    Returns
+    -------
+    float
+        Rendering throughput (frames per second).
+
+    """
+    filepath = pathlib.Path(filepath)
+    if len(timesteps) == 0:
+        raise ValueError('No frame to animate')
+    use_ffmpeg = shutil.which('ffmpeg') is not None
+    if not use_ffmpeg and filepath.suffix != '.gif':
+        raise RuntimeError('FFmpeg is required to write MP4 files')
+    nproc = max(1, min(nproc or os.cpu_count() or 1, len(timesteps)))
+    initargs = (pathlib.Path(source), grid, body, dt, levels, limits, dpi)
+    print(f'[INFO] Rendering {len(timesteps)} frame(s) '
+          f'with {nproc} process(es) ...')
+    tic = time.perf_counter()
+    if nproc == 1:
+        _init_worker(*initargs)
+        frames = map(_render, timesteps)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(nproc, initializer=_init_worker,
+                                    initargs=initargs)
+        frames = pool.imap(_render, timesteps)
+    encoder, images = None, []
+    try:
+        for i, frame in enumerate(frames):
+            if not use_ffmpeg:
+                from PIL import Image
+                images.append(Image.fromarray(frame).convert('RGB')
+                              .quantize())
+            else:
+                if encoder is None:
+                    height, width = frame.shape[:2]
+                    encoder = _open_ffmpeg(filepath, width, height, fps)
+                encoder.stdin.write(frame.tobytes())
+            elapsed = time.perf_counter() - tic
+            print(f'[time step {timesteps[i]}] Rendered frame '
+                  f'({i + 1}/{len(timesteps)}, '
+                  f'{(i + 1) / elapsed:.2f} frames/s)')
+    finally:
+        if pool is not None:
+            pool.terminate()  # all frames are done (or one failed)
+            pool.join()
+        if encoder is not None:
+            encoder.stdin.close()
+            encoder.wait()
+    if encoder is not None and encoder.returncode != 0:
+        raise RuntimeError(f'FFmpeg failed to write {filepath}')
+    if images:
+        images[0].save(filepath, save_all=True, append_images=images[1:],
+                       duration=int(1000 / fps), loop=0)
+    throughput = len(timesteps) / (time.perf_counter() - tic)
+    print(f'[INFO] Saved {filepath} ({throughput:.2f} frames/s)')
+    return throughput
@@ -0,0 +1,170 @@
+"""Archive of a derived field (e.g., vorticity) in a single HDF5 file.
+
+Instead of one HDF5 file per time step (plus a grid file), all snapshots
+of a field are stored in one file:
+
+* `grid/x`, `grid/y`: gridlines of the field;
+* `timesteps`: time steps of the frames (in the order they were written);
+* `stamps`: write time (in ns) of each frame (to detect updated frames);
+* `<name>`: chunked and compressed dataset of shape (nframes, ny, nx),
+  one chunk per frame, optionally stored in single precision.
+
+Frames are appended (or overwritten) by a single writer; readers stream
+them one at a time.
+"""
+
+import pathlib
+import time
+
+import h5py
+import numpy
+
+
+class ArchiveWriter(object):
+    """Append frames of a field to an archive."""
+
+    def __init__(self, filepath, name, grid, dtype='float64',
+                 compression='gzip'):
+        """Open (or create) the archive.
+
+        An existing archive is started anew if its grid or storage type
+        differ from the requested ones.
+
+        Parameters
+        ----------
+        filepath : pathlib.Path
+            Path of the archive.
+        name : str
+            Name of the field.
+        grid : list of numpy.ndarray
+            Gridlines of the field (x first).
+        dtype : str
+            Storage type of the values; default: 'float64'.
+        compression : str
+            HDF5 compression filter; default: 'gzip'.
+
+        """
+        self.filepath = pathlib.Path(filepath)
+        self.name = name
+        self.dtype = numpy.dtype(dtype)
+        if self.filepath.is_file() and not self._is_compatible(grid):
+            print(f'[INFO] Starting a new archive {self.filepath} '
+                  '(grid or precision changed)')
+            self.filepath.unlink()
+        self.file = h5py.File(self.filepath, 'a')
+        if name not in self.file:
+            shape = tuple(line.size for line in grid[::-1])
+            for dim, line in zip('xyz', grid):
+                self.file.create_dataset(f'grid/{dim}', data=line)
+            self.file.create_dataset('timesteps', (0,), dtype=numpy.int64,
+                                     maxshape=(None,))
+            self.file.create_dataset('stamps', (0,), dtype=numpy.int64,
+                                     maxshape=(None,))
+            self.file.create_dataset(name, (0,) + shape, dtype=self.dtype,
+                                     maxshape=(None,) + shape,
+                                     chunks=(1,) + shape,
+                                     compression=compression, shuffle=True)
+        self.index = {int(timestep): i for i, timestep
+                      in enumerate(self.file['timesteps'][:])}
+
+    def _is_compatible(self, grid):
+        """Check if the existing archive has the same grid and precision."""
+        with h5py.File(self.filepath, 'r') as f:
+            if self.name not in f or f[self.name].dtype != self.dtype:
+                return False
+            current = [f['grid'][dim][:] for dim in ('x', 'y', 'z')
+                       if dim in f['grid']]
+        return (len(current) == len(grid) and
+                all(numpy.array_equal(a, b) for a, b in zip(current, grid)))
+
+    def write(self, timestep, values):
+        """Write (or overwrite) the frame of a time step.
+
+        Returns
+        -------
+        int
+            Stamp of the frame (write time in nanoseconds).
+
+        """
+        timesteps, stamps = self.file['timesteps'], self.file['stamps']
+        dset = self.file[self.name]
+        stamp = time.time_ns()
+        i = self.index.get(int(timestep))
+        if i is None:
+            i = dset.shape[0]
+            for d in (dset, timesteps, stamps):
+                d.resize(i + 1, axis=0)
+            timesteps[i] = timestep
+            self.index[int(timestep)] = i
+        dset[i] = values
+        stamps[i] = stamp
+        self.file.flush()
+        return stamp
+
+    def close(self):
+        """Close the archive."""
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def get_archive_path(outdir, name):
+    """Return the path of the archive of a field in a directory."""
+    return pathlib.Path(outdir) / f'{name}.h5'
+
+
+def read_grid(filepath):
+    """Read the gridlines of the field stored in an archive."""
+    with h5py.File(filepath, 'r') as f:
+        return [f['grid'][dim][:] for dim in ('x', 'y', 'z')
+                if dim in f['grid']]
+
+
+def get_frames(filepath):
+    """Return the time steps of an archive with their write stamps.
+
+    Returns
+    -------
+    dict
+        Stamp of the frame for each time step.
+
+    """
+    if not pathlib.Path(filepath).is_file():
+        return {}
+    with h5py.File(filepath, 'r') as f:
+        return {int(timestep): int(stamp) for timestep, stamp
+                in zip(f['timesteps'][:], f['stamps'][:])}
+
+
+def iter_frames(filepath, name, timesteps=None):
+    """Stream the frames of an archive (one frame in memory at a time).
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the archive.
+    name : str
+        Name of the field.
+    timesteps : list of int
+        Time steps to read; default: None (all frames, sorted).
+
+    Yields
+    ------
+    int
+        Time step.
+    numpy.ndarray
+        Values of the field (double precision).
+
+    """
+    with h5py.File(filepath, 'r') as f:
+        index = {int(timestep): i
+                 for i, timestep in enumerate(f['timesteps'][:])}
+        if timesteps is None:
+            timesteps = sorted(index)
+        dset = f[name]
+        for timestep in timesteps:
+            yield timestep, dset[index[timestep]].astype(numpy.float64)
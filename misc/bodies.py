@@ -0,0 +1,127 @@
+"""Read and write immersed boundaries with a binary companion file.
+
+Next to the text file read by PetIBM (e.g., `snake.body`), we store the
+coordinates in an HDF5 file (e.g., `snake.body.h5`) with the number of
+markers and the generation parameters as attributes.
+The binary file also records the size and modification time of the text
+file it mirrors; it is only used when both still match.
+"""
+
+import pathlib
+
+import h5py
+
+import petibmpy
+
+
+def get_binary_path(filepath):
+    """Return the path of the binary companion of a body file."""
+    filepath = pathlib.Path(filepath)
+    return filepath.with_name(filepath.name + '.h5')
+
+
+def _stat(filepath):
+    """Return the size and modification time (in ns) of a file."""
+    stat = filepath.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def write_binary_body(filepath, x, y, **params):
+    """Write the binary companion of a body file.
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the text file (must exist).
+    x : numpy.ndarray
+        x-coordinates of the markers.
+    y : numpy.ndarray
+        y-coordinates of the markers.
+    params : dict
+        Generation parameters stored as attributes (e.g., section, aoa, ds).
+
+    """
+    filepath = pathlib.Path(filepath)
+    size, mtime_ns = _stat(filepath)
+    with h5py.File(get_binary_path(filepath), 'w') as f:
+        f.create_dataset('x', data=x)
+        f.create_dataset('y', data=y)
+        f.attrs['n'] = x.size
+        f.attrs['source_size'] = size
+        f.attrs['source_mtime_ns'] = mtime_ns
+        for key, value in params.items():
+            f.attrs[key] = value
+
+
+def write_body(filepath, x, y, **params):
+    """Write a body file (text format) and its binary companion.
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the text file.
+    x : numpy.ndarray
+        x-coordinates of the markers.
+    y : numpy.ndarray
+        y-coordinates of the markers.
+    params : dict
+        Generation parameters stored in the binary file.
+
+    """
+    petibmpy.write_body(filepath, x, y)
+    write_binary_body(filepath, x, y, **params)
+
+
+def is_binary_up_to_date(filepath):
+    """Check if the binary companion of a body file is up to date."""
+    filepath = pathlib.Path(filepath)
+    binpath = get_binary_path(filepath)
+    if not binpath.is_file():
+        return False
+    if not filepath.is_file():
+        return True  # only the binary file is available
+    size, mtime_ns = _stat(filepath)
+    with h5py.File(binpath, 'r') as f:
+        return (f.attrs.get('source_size') == size and
+                f.attrs.get('source_mtime_ns') == mtime_ns)
+
+
+def read_body(filepath, update=True):
+    """Read the coordinates of a body.
+
+    The binary companion is used if it is up to date; otherwise, the text
+    file is parsed (and the binary companion is refreshed if requested).
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the text file.
+    update : bool
+        If True, write the binary companion when falling back to the text
+        file; default: True.
+
+    Returns
+    -------
+    numpy.ndarray
+        x-coordinates of the markers.
+    numpy.ndarray
+        y-coordinates of the markers.
+
+    """
+    filepath = pathlib.Path(filepath)
+    if is_binary_up_to_date(filepath):
+        with h5py.File(get_binary_path(filepath), 'r') as f:
+            return f['x'][:], f['y'][:]
+    x, y = petibmpy.read_body(filepath, skiprows=1)
+    if update:
+        try:
+            write_binary_body(filepath, x, y)
+        except OSError:  # read-only location
+            pass
+    return x, y
+
+
+def read_body_params(filepath):
+    """Return the attributes stored in the binary companion of a body file."""
+    with h5py.File(get_binary_path(filepath), 'r') as f:
+        return {key: value for key, value in f.attrs.items()}
@@ -0,0 +1,161 @@
+"""Create the immersed boundaries of all simulations in a single process.
+
+The cases are listed in a YAML manifest (section x AoA x ds x offset).
+Each section is loaded and regularized once per marker spacing; the
+regularized section is then rotated to all requested angles of attack
+with a single vectorized operation before writing the `snake.body` files.
+"""
+
+import argparse
+import collections
+import pathlib
+import time
+
+import numpy
+import yaml
+
+import petibmpy
+
+import bodies
+
+
+ROOTDIR = pathlib.Path(__file__).absolute().parents[1]
+
+Case = collections.namedtuple('Case', ['path', 'section', 'aoa', 'ds',
+                                       'offset'])
+
+
+def read_manifest(filepath):
+    """Read the list of cases from a YAML manifest.
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the manifest; simulation paths are relative to its folder.
+
+    Returns
+    -------
+    list of Case
+        The cases to process.
+
+    """
+    with open(filepath, 'r') as infile:
+        entries = yaml.safe_load(infile)['cases']
+    cases = []
+    for entry in entries:
+        offset = tuple(entry.get('offset', (0.0, 0.0)))
+        cases.append(Case(filepath.parent / entry['path'], entry['section'],
+                          float(entry['aoa']), float(entry['ds']), offset))
+    return cases
+
+
+def rotate2d_batch(x, y, angles, center=(0.0, 0.0)):
+    """Rotate 2D coordinates by several angles at once.
+
+    Parameters
+    ----------
+    x : numpy.ndarray
+        x-coordinates of the points, of shape (N,).
+    y : numpy.ndarray
+        y-coordinates of the points, of shape (N,).
+    angles : array_like
+        Angles of rotation (in degrees), of shape (M,).
+    center : tuple of floats
+        Center of rotation; default: (0.0, 0.0).
+
+    Returns
+    -------
+    numpy.ndarray
+        x-coordinates of the rotated points, of shape (M, N).
+    numpy.ndarray
+        y-coordinates of the rotated points, of shape (M, N).
+
+    """
+    xc, yc = center
+    theta = numpy.radians(numpy.asarray(angles, dtype=numpy.float64))
+    cos, sin = numpy.cos(theta)[:, None], numpy.sin(theta)[:, None]
+    xr, yr = x - xc, y - yc
+    return xc + xr * cos - yr * sin, yc + xr * sin + yr * cos
+
+
+def create_bodies(cases, datadir=ROOTDIR / 'data', verbose=True):
+    """Create and write the immersed boundaries of the given cases.
+
+    Parameters
+    ----------
+    cases : list of Case
+        The cases to process.
+    datadir : pathlib.Path
+        Directory with the coordinates of the cross-sections;
+        default: the `data` folder of the repository.
+    verbose : bool
+        If True, print the time spent in each phase; default: True.
+
+    Returns
+    -------
+    dict
+        Time (in seconds) spent in each phase.
+
+    """
+    timings = collections.OrderedDict()
+
+    # Load and regularize each section once per marker spacing.
+    tic = time.perf_counter()
+    sections = {}
+    for key in sorted({(case.section, case.ds) for case in cases}):
+        section, ds = key
+        filepath = datadir / f'snake_{section}.txt'
+        x, y = petibmpy.read_body(filepath, skiprows=1)
+        sections[key] = petibmpy.regularize2d(x, y, ds=ds)
+    timings['regularize'] = time.perf_counter() - tic
+
+    # Rotate each regularized section to all requested angles at once.
+    tic = time.perf_counter()
+    groups = collections.defaultdict(list)
+    for case in cases:
+        groups[(case.section, case.ds)].append(case)
+    rotated = []
+    for key, group in groups.items():
+        angles = [-case.aoa for case in group]
+        X, Y = rotate2d_batch(*sections[key], angles)
+        for case, x, y in zip(group, X, Y):
+            rotated.append((case, x + case.offset[0], y + case.offset[1]))
+    timings['rotate'] = time.perf_counter() - tic
+
+    # Write the coordinates into files.
+    tic = time.perf_counter()
+    for case, x, y in rotated:
+        case.path.mkdir(parents=True, exist_ok=True)
+        bodies.write_body(case.path / 'snake.body', x, y,
+                          section=case.section, aoa=case.aoa, ds=case.ds,
+                          offset=case.offset)
+    timings['write'] = time.perf_counter() - tic
+
+    if verbose:
+        print(f'[INFO] Created {len(rotated)} bodies '
+              f'from {len(sections)} regularized sections')
+        for phase, elapsed in timings.items():
+            print(f'[INFO] {phase:<10} {elapsed:.3f} s')
+    return timings
+
+
+def parse_command_line():
+    """Parse the command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--manifest', type=pathlib.Path,
+                        default=ROOTDIR / 'runs' / 'bodies.yaml',
+                        help='YAML manifest with the cases to process')
+    parser.add_argument('--filter', dest='pattern', default=None,
+                        help='only process cases whose path matches '
+                             'the glob pattern (relative to the manifest)')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_command_line()
+    cases = read_manifest(args.manifest)
+    if args.pattern is not None:
+        cases = [case for case in cases
+                 if case.path.relative_to(args.manifest.parent)
+                 .match(args.pattern)]
+    create_bodies(cases)
@@ -0,0 +1,306 @@
+"""Estimate the cost of a simulation before submitting it to Azure Batch.
+
+The estimate is based on the input files of the simulation directory
+(config.yaml, mesh.yaml, probes.yaml, and snake.body) and reports
+the number of unknowns, the number of Lagrangian markers, the size
+of the output files, and the wall-time.
+The wall-time model (seconds per time step as a linear function of the
+number of cells per process) is calibrated from the PETSc log files
+(view.log) of past runs; the number of processes of a new run is read
+from its Batch Shipyard configuration (processes per node times number
+of nodes) or given on the command line:
+
+    python misc/estimate_cost.py --calibrate runs --model runs/cost_model.yaml
+    python misc/estimate_cost.py runs/Re2000/both_lips/2k35 \
+        --model runs/cost_model.yaml
+"""
+
+import argparse
+import collections
+import pathlib
+import re
+
+import numpy
+import yaml
+
+import meshcache
+
+
+FLOAT_SIZE = 8  # PetIBM writes double-precision values
+HDF5_OVERHEAD = 2048  # approximate size (in bytes) of an HDF5 dataset header
+FORCES_LINE_SIZE = 3 * 26  # size of a line in forces-0.txt (in bytes)
+
+Estimate = collections.namedtuple(
+    'Estimate', ['ncells', 'unknowns', 'markers', 'nsteps', 'nsnapshots',
+                 'snapshot_size', 'nrestarts', 'restart_size', 'probes_size',
+                 'forces_size', 'disk_size', 'walltime', 'nodes', 'nprocs',
+                 'max_walltime'])
+
+
+def read_yaml(filepath):
+    """Read a YAML file (return an empty dictionary if missing)."""
+    if not filepath.is_file():
+        return {}
+    with open(filepath, 'r') as infile:
+        return yaml.safe_load(infile) or {}
+
+
+def read_number_markers(filepath):
+    """Read the number of markers from the header of a body file."""
+    with open(filepath, 'r') as infile:
+        return int(infile.readline().split()[0])
+
+
+def get_mesh_filepath(simudir):
+    """Return the path of the YAML file with the mesh of a simulation."""
+    filepath = simudir / 'mesh.yaml'
+    if filepath.is_file():
+        return filepath
+    return simudir / 'config.yaml'  # mesh included in the configuration
+
+
+def get_field_coordinates(gridlines, field):
+    """Return the coordinates of a field on the staggered grid."""
+    centers = [0.5 * (line[:-1] + line[1:]) for line in gridlines]
+    faces = [line[1:-1] for line in gridlines]
+    if field == 'u':
+        return faces[0], centers[1]
+    if field == 'v':
+        return centers[0], faces[1]
+    return centers[0], centers[1]
+
+
+def count_probe_points(probe, gridlines):
+    """Count the number of grid points inside the box of a volume probe."""
+    coords = get_field_coordinates(gridlines, probe['field'])
+    npoints = 1
+    for direction, coord in zip('xy', coords):
+        start, end = probe['box'][direction]
+        npoints *= numpy.count_nonzero((coord >= start) & (coord <= end))
+    return npoints
+
+
+def parse_wall_time(value):
+    """Convert a Batch Shipyard duration (d.hh:mm:ss) into seconds."""
+    days, _, hms = str(value).rpartition('.')
+    hours, minutes, seconds = (int(v) for v in hms.split(':'))
+    return ((int(days or 0) * 24 + hours) * 60 + minutes) * 60 + seconds
+
+
+def parse_view_log(filepath):
+    """Return the wall-time (in seconds) and number of processes of a run."""
+    walltime, nprocs = None, None
+    with open(filepath, 'r') as infile:
+        for line in infile:
+            match = re.search(r'with (\d+) processors?', line)
+            if match and nprocs is None:
+                nprocs = int(match.group(1))
+            match = re.match(r'Time \(sec\):\s+(\S+)', line)
+            if match:
+                walltime = float(match.group(1))
+                break
+    return walltime, nprocs
+
+
+def calibrate(rootdir):
+    """Fit the wall-time model on the past runs found under a directory.
+
+    Parameters
+    ----------
+    rootdir : pathlib.Path
+        Directory to search for `output/view.log` files.
+
+    Returns
+    -------
+    dict
+        Coefficients of the model (seconds per time step =
+        `intercept + slope * ncells / nprocs`) and the calibration points
+        (runs whose number of processes is unknown are skipped).
+
+    """
+    points = []
+    for filepath in sorted(rootdir.glob('**/output/view.log')):
+        simudir = filepath.parents[1]
+        walltime, nprocs = parse_view_log(filepath)
+        params = read_yaml(simudir / 'config.yaml').get('parameters', {})
+        if walltime is None or 'nt' not in params:
+            continue
+        if nprocs is None:
+            print(f'[WARNING] {filepath}: unknown number of processes; '
+                  'skipping')
+            continue
+        nsteps = params['nt'] - params.get('startStep', 0)
+        gridlines = meshcache.read_mesh_yaml(get_mesh_filepath(simudir))
+        ncells = int(numpy.prod([line.size - 1 for line in gridlines]))
+        points.append(dict(path=str(simudir.relative_to(rootdir)),
+                           ncells=ncells, nprocs=nprocs,
+                           seconds_per_step=walltime / nsteps))
+    if len(points) == 0:
+        raise RuntimeError(f'No view.log file found under {rootdir}')
+    loads = numpy.array([p['ncells'] / p['nprocs'] for p in points])
+    rates = numpy.array([p['seconds_per_step'] for p in points])
+    slope, intercept = numpy.mean(rates / loads), 0.0
+    if numpy.unique(loads).size > 1:
+        slope, intercept = numpy.polyfit(loads, rates, 1)
+        if intercept < 0.0:  # no negative time per step: fit y = slope x
+            slope, intercept = loads.dot(rates) / loads.dot(loads), 0.0
+    return dict(intercept=float(intercept), slope=float(slope),
+                points=points)
+
+
+def estimate(simudir, model=None, nprocs=None):
+    """Estimate the cost of a simulation.
+
+    Parameters
+    ----------
+    simudir : pathlib.Path
+        Simulation directory.
+    model : dict
+        Wall-time model (as returned by `calibrate`); default: None
+        (wall-time not estimated).
+    nprocs : int
+        Number of processes; default: None (read from the Batch Shipyard
+        configuration; wall-time not estimated if not found).
+
+    Returns
+    -------
+    Estimate
+        The estimated cost (sizes in bytes, times in seconds).
+
+    """
+    config = read_yaml(simudir / 'config.yaml')
+    params = config['parameters']
+    gridlines = meshcache.read_mesh_yaml(get_mesh_filepath(simudir))
+    nx, ny = (line.size - 1 for line in gridlines)
+    ncells = nx * ny
+    nu, nv = (nx - 1) * ny, nx * (ny - 1)
+    markers = 0
+    for body in config.get('bodies', []):
+        filepath = simudir / body['file']
+        if filepath.is_file():
+            markers += read_number_markers(filepath)
+    unknowns = nu + nv + ncells + 2 * markers
+
+    start, nt = params.get('startStep', 0), params['nt']
+    nsteps = nt - start
+    nsnapshots = nsteps // params['nsave']
+    nrestarts = nsteps // params.get('nrestart', nt + 1)
+    # Snapshots: velocity, pressure, and Lagrangian forces.
+    snapshot_size = FLOAT_SIZE * unknowns + 4 * HDF5_OVERHEAD
+    # Restart: snapshot with the explicit terms of the previous time step.
+    restart_size = snapshot_size + FLOAT_SIZE * 2 * (nu + nv)
+
+    probes_size = 0
+    for probe in read_yaml(simudir / 'probes.yaml').get('probes', []):
+        if probe.get('type', 'VOLUME') != 'VOLUME':
+            continue
+        npoints = count_probe_points(probe, gridlines)
+        nframes = nsteps // (probe.get('n_sum') or probe.get('n_monitor', 1))
+        probes_size += nframes * (FLOAT_SIZE * npoints + HDF5_OVERHEAD)
+    forces_size = nsteps * FORCES_LINE_SIZE
+
+    disk_size = (nsnapshots * snapshot_size + nrestarts * restart_size +
+                 probes_size + forces_size)
+
+    pool = read_yaml(simudir / 'config_shipyard' / 'pool.yaml')
+    vm_count = pool.get('pool_specification', {}).get('vm_count', {})
+    nodes = vm_count.get('dedicated', 0) + vm_count.get('low_priority', 0)
+    jobs = read_yaml(simudir / 'config_shipyard' / 'jobs.yaml')
+    max_walltime = None
+    for job in jobs.get('job_specifications', []):
+        if 'max_wall_time' in job:
+            max_walltime = parse_wall_time(job['max_wall_time'])
+        for task in job.get('tasks', []):
+            mpi = task.get('multi_instance', {}).get('mpi', {})
+            if nprocs is None and nodes and 'processes_per_node' in mpi:
+                nprocs = nodes * mpi['processes_per_node']
+
+    walltime = None
+    if model is not None and nprocs is not None:
+        walltime = nsteps * (model['intercept'] +
+                             model['slope'] * ncells / nprocs)
+
+    return Estimate(ncells, unknowns, markers, nsteps, nsnapshots,
+                    snapshot_size, nrestarts, restart_size, probes_size,
+                    forces_size, disk_size, walltime, nodes or None,
+                    nprocs, max_walltime)
+
+
+def _human_size(size):
+    """Return a human-readable size."""
+    for unit in ['B', 'KiB', 'MiB', 'GiB']:
+        if size < 1024.0:
+            return f'{size:.1f} {unit}'
+        size /= 1024.0
+    return f'{size:.1f} TiB'
+
+
+def _human_time(seconds):
+    """Return a human-readable duration."""
+    hours, remainder = divmod(int(round(seconds)), 3600)
+    return f'{hours}h{remainder // 60:02d}m'
+
+
+def print_estimate(simudir, est, model=None):
+    """Print the estimated cost of a simulation."""
+    print(f'[{simudir}]')
+    print(f'  cells:          {est.ncells}')
+    print(f'  unknowns:       {est.unknowns} '
+          f'(including {est.markers} Lagrangian markers)')
+    print(f'  time steps:     {est.nsteps}')
+    print(f'  snapshots:      {est.nsnapshots} x '
+          f'{_human_size(est.snapshot_size)}')
+    print(f'  restarts:       {est.nrestarts} x '
+          f'{_human_size(est.restart_size)}')
+    print(f'  probes output:  {_human_size(est.probes_size)}')
+    print(f'  forces output:  {_human_size(est.forces_size)}')
+    print(f'  total disk:     {_human_size(est.disk_size)}')
+    if est.walltime is not None:
+        print(f'  wall-time:      {_human_time(est.walltime)} '
+              f'({est.nprocs} processes)')
+        if est.nodes is not None:
+            print(f'  node-hours:     {est.nodes * est.walltime / 3600:.1f} '
+                  f'({est.nodes} node(s))')
+        if est.max_walltime is not None and est.walltime > est.max_walltime:
+            print(f'  [WARNING] estimated wall-time exceeds max_wall_time '
+                  f'of the job ({_human_time(est.max_walltime)})')
+    elif model is not None:
+        print('  [WARNING] unknown number of processes (use --nprocs); '
+              'wall-time not estimated')
+
+
+def parse_command_line():
+    """Parse the command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('simudirs', type=pathlib.Path, nargs='*',
+                        help='simulation directories')
+    parser.add_argument('--model', type=pathlib.Path, default=None,
+                        help='YAML file with the wall-time model')
+    parser.add_argument('--calibrate', type=pathlib.Path, default=None,
+                        metavar='DIR',
+                        help='calibrate the wall-time model from the '
+                             'view.log files found under DIR')
+    parser.add_argument('--nprocs', type=int, default=None,
+                        help='number of processes of the runs '
+                             '(default: read from config_shipyard)')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_command_line()
+    model = None
+    if args.calibrate is not None:
+        model = calibrate(args.calibrate)
+        print(f'[INFO] Calibrated wall-time model on '
+              f'{len(model["points"])} run(s): seconds per step = '
+              f'{model["intercept"]:.4g} + {model["slope"]:.4g} * '
+              'ncells / nprocs')
+        if args.model is not None:
+            with open(args.model, 'w') as outfile:
+                yaml.safe_dump(model, outfile, default_flow_style=False)
+    elif args.model is not None:
+        model = read_yaml(args.model)
+    for simudir in args.simudirs:
+        print_estimate(simudir,
+                       estimate(simudir, model=model, nprocs=args.nprocs),
+                       model=model)
@@ -0,0 +1,226 @@
+"""Compute time-averaged and fluctuation fields from saved snapshots.
+
+The snapshots of a simulation (`output/<timestep>.h5`) within a time
+window are read one at a time; the mean and the second moments of the
+velocity components and pressure are updated with Welford's algorithm,
+so that memory use does not depend on the number of snapshots.
+The Reynolds shear stress <u'v'> is computed at the cell centers (u and
+v averaged from the faces), away from the domain boundaries.
+The statistics are written next to `grid.h5` (`output/stats.h5`):
+
+* `u/mean`, `u/std`, `v/mean`, `v/std`, `p/mean`, `p/std` on the grids
+  of the fields (see `grid.h5`), where `std` is the standard deviation
+  (RMS of the fluctuations about the mean, not the root mean square);
+* `uv/mean` (<u'v'>) on the gridlines stored in `uv/x` and `uv/y`.
+
+    python misc/field_stats.py runs/Re2000/both_lips/2k35 \
+        --time-limits 50 80
+"""
+
+import argparse
+import pathlib
+import time
+
+import h5py
+import numpy
+import yaml
+
+import incremental
+import vorticity
+
+
+class RunningStats(object):
+    """Running mean, variance, and covariance of fields (Welford)."""
+
+    def __init__(self, pairs=()):
+        """Initialize the accumulator.
+
+        Parameters
+        ----------
+        pairs : list of tuple of str
+            Pairs of fields whose covariance is computed; default: ().
+
+        """
+        self.pairs = list(pairs)
+        self.count = 0
+        self.mean, self.m2, self.comoment = {}, {}, {}
+
+    def update(self, fields):
+        """Add a sample.
+
+        Parameters
+        ----------
+        fields : dict of numpy.ndarray
+            Values of each field in the sample.
+
+        """
+        self.count += 1
+        deltas = {}
+        for name, values in fields.items():
+            if name not in self.mean:
+                self.mean[name] = numpy.zeros(values.shape)
+                self.m2[name] = numpy.zeros(values.shape)
+            delta = values - self.mean[name]
+            self.mean[name] += delta / self.count
+            self.m2[name] += delta * (values - self.mean[name])
+            deltas[name] = delta
+        for a, b in self.pairs:
+            if (a, b) not in self.comoment:
+                self.comoment[(a, b)] = numpy.zeros(fields[a].shape)
+            self.comoment[(a, b)] += deltas[a] * (fields[b] - self.mean[b])
+
+    def merge(self, other):
+        """Combine with the statistics of another set of samples.
+
+        Uses the pairwise update of Chan et al., so that samples can be
+        accumulated in parallel and merged afterwards.
+        """
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count = other.count
+            self.mean = {k: v.copy() for k, v in other.mean.items()}
+            self.m2 = {k: v.copy() for k, v in other.m2.items()}
+            self.comoment = {k: v.copy() for k, v in other.comoment.items()}
+            return
+        n_a, n_b = self.count, other.count
+        count = n_a + n_b
+        deltas = {}
+        for name in other.mean:
+            delta = other.mean[name] - self.mean[name]
+            self.m2[name] += other.m2[name] + delta**2 * (n_a * n_b / count)
+            self.mean[name] += delta * (n_b / count)
+            deltas[name] = delta
+        for (a, b), comoment in other.comoment.items():
+            self.comoment[(a, b)] += (comoment +
+                                      deltas[a] * deltas[b] *
+                                      (n_a * n_b / count))
+        self.count = count
+
+    def variance(self, name):
+        """Return the (population) variance of a field."""
+        return self.m2[name] / self.count
+
+    def covariance(self, a, b):
+        """Return the (population) covariance of two fields."""
+        return self.comoment[(a, b)] / self.count
+
+
+def get_cell_centered_velocity(u, v):
+    """Average the velocity components at the interior cell centers.
+
+    Parameters
+    ----------
+    u : numpy.ndarray
+        x-velocity on the x-faces, of shape (ny, nx - 1).
+    v : numpy.ndarray
+        y-velocity on the y-faces, of shape (ny - 1, nx).
+
+    Returns
+    -------
+    numpy.ndarray
+        x-velocity at the cell centers, of shape (ny - 2, nx - 2).
+    numpy.ndarray
+        y-velocity at the cell centers, of shape (ny - 2, nx - 2).
+
+    """
+    uc = 0.5 * (u[1:-1, :-1] + u[1:-1, 1:])
+    vc = 0.5 * (v[:-1, 1:-1] + v[1:, 1:-1])
+    return uc, vc
+
+
+def get_timesteps(simudir, time_limits):
+    """Return the saved time steps within a time window."""
+    with open(simudir / 'config.yaml', 'r') as infile:
+        params = yaml.safe_load(infile)['parameters']
+    timesteps = numpy.arange(params.get('startStep', 0), params['nt'] + 1,
+                             params['nsave'])
+    times = timesteps * params['dt']
+    tol = 1e-6
+    mask = ((times >= time_limits[0] - tol) &
+            (times <= time_limits[1] + tol))
+    return [int(timestep) for timestep in timesteps[mask]]
+
+
+def compute_field_stats(datadir, timesteps, verbose=True):
+    """Compute the statistics of the velocity and pressure fields.
+
+    Parameters
+    ----------
+    datadir : pathlib.Path
+        Directory with the snapshots written by PetIBM.
+    timesteps : list of int
+        Time steps of the snapshots to use.
+    verbose : bool
+        If True, print the progress; default: True.
+
+    Returns
+    -------
+    RunningStats
+        Statistics of the fields u, v, p, uc, and vc (velocity components
+        at the cell centers), with the covariance of (uc, vc).
+
+    """
+    stats = RunningStats(pairs=[('uc', 'vc')])
+    tic = time.perf_counter()
+    for i, timestep in enumerate(timesteps):
+        filepath = datadir / f'{timestep:0>7}.h5'
+        fields = {name: vorticity.read_field_hdf5(filepath, name)
+                  for name in ('u', 'v', 'p')}
+        fields['uc'], fields['vc'] = get_cell_centered_velocity(fields['u'],
+                                                                fields['v'])
+        stats.update(fields)
+        if verbose:
+            elapsed = time.perf_counter() - tic
+            print(f'[time step {timestep}] Added snapshot '
+                  f'({i + 1}/{len(timesteps)}, '
+                  f'{(i + 1) / elapsed:.2f} snapshots/s)')
+    return stats
+
+
+def write_field_stats(filepath, stats, grid_p, timesteps, time_limits):
+    """Write the statistics of the fields into a HDF5 file."""
+    with h5py.File(filepath, 'w') as outfile:
+        for name in ('u', 'v', 'p'):
+            outfile.create_dataset(f'{name}/mean', data=stats.mean[name])
+            outfile.create_dataset(f'{name}/std',
+                                   data=numpy.sqrt(stats.variance(name)))
+        outfile.create_dataset('uv/mean', data=stats.covariance('uc', 'vc'))
+        outfile.create_dataset('uv/x', data=grid_p[0][1:-1])
+        outfile.create_dataset('uv/y', data=grid_p[1][1:-1])
+        outfile.attrs['count'] = stats.count
+        outfile.attrs['timesteps'] = timesteps
+        outfile.attrs['time_limits'] = time_limits
+
+
+def parse_command_line():
+    """Parse the command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('simudirs', type=pathlib.Path, nargs='+',
+                        help='simulation directories')
+    parser.add_argument('--time-limits', type=float, nargs=2,
+                        default=[50.0, 80.0], metavar=('START', 'END'),
+                        help='time window (default: 50 80)')
+    parser.add_argument('--output', default='stats.h5',
+                        help='name of the file written in the output folder '
+                             '(default: stats.h5)')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_command_line()
+    for simudir in args.simudirs:
+        datadir = simudir / 'output'
+        timesteps = incremental.get_saved_timesteps(
+            datadir, get_timesteps(simudir, args.time_limits))
+        if len(timesteps) == 0:
+            print(f'[WARNING] {simudir}: no snapshot in the time window')
+            continue
+        print(f'[INFO] {simudir}: {len(timesteps)} snapshot(s) between '
+              f't={args.time_limits[0]} and t={args.time_limits[1]}')
+        stats = compute_field_stats(datadir, timesteps)
+        grid_p = vorticity.read_grid_hdf5(datadir / 'grid.h5', 'p')
+        filepath = datadir / args.output
+        write_field_stats(filepath, stats, grid_p, timesteps,
+                          args.time_limits)
+        print(f'[INFO] Saved {filepath}')
@@ -0,0 +1,281 @@
+"""Load the force coefficients of many simulations into a labelled cube.
+
+The simulations (Reynolds number x section x angle of attack) are loaded
+in parallel with a process pool (parsing a force history for the first
+time is CPU-bound; see `forces.py` for the cache).
+For each simulation, the drag and lift coefficients are computed and
+their mean and RMS values are taken over a time window; the histories
+within the window can be kept too (interpolated on the time values of
+the first simulation with a force history, if they differ).
+The results are gathered into arrays of shape (Re, section, AoA) (and
+(Re, section, AoA, time) for the histories), with NaN values for missing
+simulations, and written into a single HDF5 file:
+
+* `Re`, `aoa`: Reynolds numbers and angles of attack;
+  attribute `sections`: names of the sections (folders);
+* `cd/mean`, `cd/rms`, `cl/mean`, `cl/rms`;
+* (optional) `t`, `cd/history`, `cl/history`;
+* (optional) `f`, `cd/psd`, `cl/psd`, `cd/St`, `cl/St` (see `spectra.py`).
+
+    python misc/force_cube.py --filter 'Re2000/*/*' --history
+"""
+
+import argparse
+import collections
+import multiprocessing
+import os
+import pathlib
+import time
+
+import h5py
+import numpy
+
+import petibmpy
+
+import create_bodies
+import forces
+import window_stats
+
+
+ROOTDIR = pathlib.Path(__file__).absolute().parents[1]
+
+Case = collections.namedtuple('Case', ['Re', 'section', 'aoa', 'simudir'])
+
+NAMES = ('cd/mean', 'cd/rms', 'cl/mean', 'cl/rms')
+
+
+def get_cases(manifest, pattern='Re*/*/*'):
+    """Return the simulations of the manifest of the immersed boundaries.
+
+    Parameters
+    ----------
+    manifest : pathlib.Path
+        Path of the YAML manifest (see `create_bodies.py`).
+    pattern : str
+        Glob pattern of the simulation paths (relative to the manifest),
+        of the form `Re<number>/<section>/<folder>`; default: 'Re*/*/*'.
+
+    Returns
+    -------
+    list of Case
+        The simulations.
+
+    """
+    cases = []
+    for case in create_bodies.read_manifest(manifest):
+        path = case.path.relative_to(manifest.parent)
+        if path.match(pattern):
+            cases.append(Case(int(path.parts[0][2:]), path.parts[1],
+                              case.aoa, case.path))
+    return cases
+
+
+def _load_case(args):
+    """Compute the statistics (and history) of the force coefficients."""
+    case, time_limits, history = args
+    filepath = case.simudir / 'output' / 'forces-0.txt'
+    if not filepath.is_file():
+        return case, None
+    t, fx, fy = forces.read_forces(filepath)
+    cd, cl = petibmpy.get_force_coefficients(fx, fy, coeff=2.0)
+    stats = window_stats.get_statistics(t, cd, cl, limits=time_limits)
+    result = {f'{name}/{key}': stats[key][i]
+              for i, name in enumerate(('cd', 'cl'))
+              for key in ('mean', 'rms')}
+    if history:
+        mask = (t >= time_limits[0]) & (t <= time_limits[1])
+        result.update({'t': numpy.array(t[mask]),
+                       'cd/history': numpy.array(cd[mask]),
+                       'cl/history': numpy.array(cl[mask])})
+    return case, result
+
+
+class ForceCube(object):
+    """Force coefficients labelled by Reynolds number, section, and AoA."""
+
+    def __init__(self, Re, sections, angles, time_limits, data, t=None,
+                 f=None):
+        """Store the labels and the arrays.
+
+        Parameters
+        ----------
+        Re : list of int
+            Reynolds numbers.
+        sections : list of str
+            Names of the sections.
+        angles : list of float
+            Angles of attack (in degrees).
+        time_limits : tuple of floats
+            Time window of the statistics.
+        data : dict of numpy.ndarray
+            Arrays of shape (Re, section, AoA[, time]).
+        t : numpy.ndarray
+            Time values of the histories; default: None (no history).
+        f : numpy.ndarray
+            Frequencies of the spectra; default: None (no spectrum).
+
+        """
+        self.Re, self.sections = list(Re), list(sections)
+        self.angles, self.time_limits = list(angles), tuple(time_limits)
+        self.data, self.t, self.f = data, t, f
+
+    def get(self, name, Re, section):
+        """Return the values vs. the angle of attack for a given section.
+
+        Parameters
+        ----------
+        name : str
+            Name of the quantity (e.g., 'cd/mean', 'cl/history', 'cl/St').
+        Re : int
+            Reynolds number.
+        section : str
+            Name of the section.
+
+        Returns
+        -------
+        numpy.ndarray
+            The values, of shape (AoA,) (or (AoA, time) for histories and
+            (AoA, frequency) for spectra).
+
+        """
+        return self.data[name][self.Re.index(Re),
+                               self.sections.index(section)]
+
+
+def load_cube(cases, time_limits=(50.0, 80.0), history=False, nproc=None,
+              sections=None):
+    """Load the force coefficients of simulations in parallel.
+
+    Parameters
+    ----------
+    cases : list of Case
+        The simulations.
+    time_limits : tuple of floats
+        Time window of the statistics; default: (50.0, 80.0).
+    history : bool
+        If True, keep the histories within the time window; default: False.
+    nproc : int
+        Number of worker processes; default: None (number of CPUs).
+    sections : list of str
+        Order of the sections; default: None (order of appearance).
+
+    Returns
+    -------
+    ForceCube
+        The labelled force coefficients.
+
+    """
+    Re = sorted({case.Re for case in cases})
+    if sections is None:
+        sections = list(collections.OrderedDict.fromkeys(
+            case.section for case in cases))
+    angles = sorted({case.aoa for case in cases})
+    shape = (len(Re), len(sections), len(angles))
+    data = {name: numpy.full(shape, numpy.nan) for name in NAMES}
+    nproc = max(1, min(nproc or os.cpu_count() or 1, len(cases)))
+    print(f'[INFO] Loading {len(cases)} simulation(s) '
+          f'with {nproc} process(es) ...')
+    tic = time.perf_counter()
+    tasks = [(case, time_limits, history) for case in cases]
+    if nproc == 1:
+        results = map(_load_case, tasks)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(nproc)
+        results = pool.imap(_load_case, tasks)
+    t = None
+    try:
+        for case, result in results:
+            if result is None:
+                print(f'[WARNING] {case.simudir}: no force history')
+                continue
+            index = (Re.index(case.Re), sections.index(case.section),
+                     angles.index(case.aoa))
+            for name in NAMES:
+                data[name][index] = result[name]
+            if history:
+                if t is None:
+                    t = result['t']
+                    for name in ('cd/history', 'cl/history'):
+                        data[name] = numpy.full(shape + t.shape, numpy.nan)
+                for name in ('cd/history', 'cl/history'):
+                    values = result[name]
+                    if not numpy.array_equal(result['t'], t):
+                        values = numpy.interp(t, result['t'], values,
+                                              left=numpy.nan,
+                                              right=numpy.nan)
+                    data[name][index] = values
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    print(f'[INFO] Loaded {len(cases)} simulation(s) in '
+          f'{time.perf_counter() - tic:.2f} s')
+    return ForceCube(Re, sections, angles, time_limits, data, t=t)
+
+
+def write_cube(filepath, cube):
+    """Write a cube of force coefficients into a HDF5 file."""
+    filepath = pathlib.Path(filepath)
+    filepath.parent.mkdir(parents=True, exist_ok=True)
+    with h5py.File(filepath, 'w') as outfile:
+        outfile.create_dataset('Re', data=cube.Re)
+        outfile.create_dataset('aoa', data=cube.angles)
+        if cube.t is not None:
+            outfile.create_dataset('t', data=cube.t)
+        if cube.f is not None:
+            outfile.create_dataset('f', data=cube.f)
+        for name, values in cube.data.items():
+            outfile.create_dataset(name, data=values)
+        outfile.attrs['sections'] = numpy.array(cube.sections,
+                                                dtype=h5py.string_dtype())
+        outfile.attrs['time_limits'] = cube.time_limits
+
+
+def read_cube(filepath):
+    """Read a cube of force coefficients from a HDF5 file."""
+    with h5py.File(filepath, 'r') as infile:
+        sections = [s.decode() if isinstance(s, bytes) else str(s)
+                    for s in infile.attrs['sections']]
+        data = {}
+        for group in ('cd', 'cl'):
+            for key in infile[group]:
+                data[f'{group}/{key}'] = infile[group][key][:]
+        t = infile['t'][:] if 't' in infile else None
+        f = infile['f'][:] if 'f' in infile else None
+        return ForceCube([int(Re) for Re in infile['Re'][:]], sections,
+                         [float(aoa) for aoa in infile['aoa'][:]],
+                         [float(v) for v in infile.attrs['time_limits']],
+                         data, t=t, f=f)
+
+
+def parse_command_line():
+    """Parse the command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--manifest', type=pathlib.Path,
+                        default=ROOTDIR / 'runs' / 'bodies.yaml',
+                        help='YAML manifest with the simulations')
+    parser.add_argument('--filter', dest='pattern', default='Re*/*/*',
+                        help='only load simulations whose path matches '
+                             'the glob pattern (default: Re*/*/*)')
+    parser.add_argument('--time-limits', type=float, nargs=2,
+                        default=[50.0, 80.0], metavar=('START', 'END'),
+                        help='time window (default: 50 80)')
+    parser.add_argument('--history', action='store_true',
+                        help='keep the histories within the time window')
+    parser.add_argument('--nproc', type=int, default=None,
+                        help='number of worker processes '
+                             '(default: all CPUs)')
+    parser.add_argument('--output', type=pathlib.Path,
+                        default=ROOTDIR / 'runs' / 'force_coefficients.h5',
+                        help='path of the HDF5 file')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_command_line()
+    cases = get_cases(args.manifest, pattern=args.pattern)
+    cube = load_cube(cases, time_limits=args.time_limits,
+                     history=args.history, nproc=args.nproc)
+    write_cube(args.output, cube)
+    print(f'[INFO] Saved {args.output}')
@@ -0,0 +1,124 @@
+"""Binary cache of the force histories written by PetIBM (forces-0.txt).
+
+Each text file is parsed once and stored as a NumPy file holding one row
+per column of the text file (time, fx, fy[, fz]), so that each quantity is
+contiguous on disk and can be memory-mapped.
+The name of a cache entry is derived from the absolute path of the text
+file and includes its size and modification time: an entry is stale (and
+replaced) as soon as the text file changes.
+The cache directory defaults to `data/.cache/forces` and can be changed
+with the environment variable `SNAKELIPS_CACHE`.
+
+    python misc/forces.py runs/Re2000/*/*/output/forces-0.txt
+"""
+
+import argparse
+import hashlib
+import os
+import pathlib
+import tempfile
+
+import numpy
+
+import petibmpy
+
+
+ROOTDIR = pathlib.Path(__file__).absolute().parents[1]
+CACHEDIR = pathlib.Path(os.environ.get('SNAKELIPS_CACHE',
+                                       ROOTDIR / 'data' / '.cache')) / 'forces'
+
+
+def _get_prefix(filepath):
+    """Return the prefix of the cache entries of a text file."""
+    key = str(pathlib.Path(filepath).absolute())
+    return hashlib.sha256(key.encode()).hexdigest()[:32]
+
+
+def get_cache_path(filepath):
+    """Return the path of the cache entry of the current version of a file.
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the text file with the force history.
+
+    Returns
+    -------
+    pathlib.Path
+        Path of the NumPy file (which may not exist yet).
+
+    """
+    stat = pathlib.Path(filepath).stat()
+    name = f'{_get_prefix(filepath)}-{stat.st_size}-{stat.st_mtime_ns}.npy'
+    return CACHEDIR / name
+
+
+def convert(filepath):
+    """Parse a force history and store it in the cache.
+
+    Stale entries of the same file are removed.
+
+    Returns
+    -------
+    pathlib.Path
+        Path of the cache entry.
+
+    """
+    cachepath = get_cache_path(filepath)
+    data = numpy.array(petibmpy.read_forces(filepath), dtype=numpy.float64)
+    CACHEDIR.mkdir(parents=True, exist_ok=True)
+    # Write into a temporary file first to keep the entry consistent.
+    fd, tmpname = tempfile.mkstemp(dir=CACHEDIR, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as outfile:
+        numpy.save(outfile, numpy.ascontiguousarray(data))
+    os.replace(tmpname, cachepath)
+    for stale in CACHEDIR.glob(f'{_get_prefix(filepath)}-*.npy'):
+        if stale != cachepath:
+            stale.unlink()
+    return cachepath
+
+
+def read_forces(filepath, mmap=True):
+    """Read a force history (time values and force components).
+
+    The text file is converted into the cache the first time (and after
+    each change); otherwise, the cache entry is loaded.
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the text file with the force history.
+    mmap : bool
+        If True, memory-map the arrays (read-only); default: True.
+
+    Returns
+    -------
+    tuple of numpy.ndarray
+        Time values and force components (as `petibmpy.read_forces`).
+
+    """
+    cachepath = get_cache_path(filepath)
+    if not cachepath.is_file():
+        try:
+            cachepath = convert(filepath)
+        except OSError:  # read-only cache location
+            return tuple(petibmpy.read_forces(filepath))
+    data = numpy.load(cachepath, mmap_mode='r' if mmap else None)
+    return tuple(data)
+
+
+def parse_command_line():
+    """Parse the command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('filepaths', type=pathlib.Path, nargs='+',
+                        help='force histories to convert')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_command_line()
+    for filepath in args.filepaths:
+        if get_cache_path(filepath).is_file():
+            print(f'[INFO] {filepath}: cache is up to date')
+            continue
+        print(f'[INFO] {filepath}: saved {convert(filepath)}')
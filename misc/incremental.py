@@ -0,0 +1,137 @@
+"""Track the inputs of post-processing outputs to only redo what changed.
+
+A manifest (YAML file) stored next to the outputs records, for each output
+file, the fingerprints of the input files it was generated from (size and
+modification time, or SHA-256 digest of the content) and the parameters
+used.
+An output is up to date if it exists and if its inputs and parameters
+still match the recorded ones; new or changed snapshots are processed
+again, the other ones are skipped.
+"""
+
+import copy
+import hashlib
+import os
+import pathlib
+
+import yaml
+
+
+def fingerprint(filepath, content=False):
+    """Return the fingerprint of a file.
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the file.
+    content : bool
+        If True, use the SHA-256 digest of the content (robust to copies);
+        otherwise, use the size and modification time; default: False.
+
+    Returns
+    -------
+    dict
+        The fingerprint.
+
+    """
+    stat = pathlib.Path(filepath).stat()
+    if not content:
+        return dict(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+    sha256 = hashlib.sha256()
+    with open(filepath, 'rb') as infile:
+        for block in iter(lambda: infile.read(2**20), b''):
+            sha256.update(block)
+    return dict(size=stat.st_size, sha256=sha256.hexdigest())
+
+
+class Manifest(object):
+    """Fingerprints of the inputs of the outputs in a directory."""
+
+    def __init__(self, filepath, content=False):
+        """Load the manifest (empty if the file does not exist).
+
+        Parameters
+        ----------
+        filepath : pathlib.Path
+            Path of the YAML manifest.
+        content : bool
+            If True, fingerprint the inputs with their content;
+            default: False (size and modification time).
+
+        """
+        self.filepath = pathlib.Path(filepath)
+        self.content = content
+        self.entries = {}
+        if self.filepath.is_file():
+            with open(self.filepath, 'r') as infile:
+                self.entries = yaml.safe_load(infile) or {}
+
+    def _key(self, filepath):
+        """Return the key of an input file (relative to the manifest)."""
+        return os.path.relpath(filepath, self.filepath.parent)
+
+    def _record(self, inputs, params):
+        """Return the record of the given inputs and parameters."""
+        record = dict(inputs={self._key(filepath): fingerprint(filepath,
+                                                               self.content)
+                              for filepath in inputs})
+        if params:
+            record['params'] = copy.deepcopy(params)  # no YAML aliases
+        return record
+
+    def is_up_to_date(self, output, inputs, params=None, key=None):
+        """Check if an output is up to date with its inputs.
+
+        Parameters
+        ----------
+        output : pathlib.Path
+            Path of the output file.
+        inputs : list of pathlib.Path
+            Paths of the input files.
+        params : dict
+            Parameters used to generate the output; default: None.
+        key : str
+            Key of the output in the manifest; default: None (name of the
+            output file). Use it for outputs stored as parts of a file.
+
+        Returns
+        -------
+        bool
+            True if the output can be reused.
+
+        """
+        output = pathlib.Path(output)
+        entry = self.entries.get(key or output.name)
+        if entry is None or not output.is_file():
+            return False
+        if entry.get('params') != (params or None):
+            return False
+        recorded = entry.get('inputs', {})
+        if set(recorded) != {self._key(filepath) for filepath in inputs}:
+            return False
+        # Compare the sizes first (cheap, even with content fingerprints).
+        for filepath in inputs:
+            stat = pathlib.Path(filepath).stat()
+            if recorded[self._key(filepath)].get('size') != stat.st_size:
+                return False
+        return entry == self._record(inputs, params)
+
+    def update(self, output, inputs, params=None, key=None):
+        """Record the inputs of an output (call after writing the output)."""
+        key = key or pathlib.Path(output).name
+        self.entries[key] = self._record(inputs, params)
+
+    def save(self):
+        """Write the manifest (atomically)."""
+        self.filepath.parent.mkdir(parents=True, exist_ok=True)
+        tmppath = self.filepath.with_name(
+            f'.{self.filepath.name}.{os.getpid()}')
+        with open(tmppath, 'w') as outfile:
+            yaml.safe_dump(self.entries, outfile, default_flow_style=False)
+        tmppath.replace(self.filepath)
+
+
+def get_saved_timesteps(datadir, timesteps):
+    """Return the time steps whose solution file exists (skip the others)."""
+    return [timestep for timestep in timesteps
+            if (datadir / f'{timestep:0>7}.h5').is_file()]
@@ -0,0 +1,175 @@
+"""Cache of structured Cartesian meshes keyed on their configuration.
+
+The configuration passed to `petibmpy.CartesianGrid` (list of directions
+with their sub-domains) is serialized in a canonical form and hashed.
+Each cache entry stores the YAML file written by PetIBM's `write_yaml`
+and the gridlines as NumPy arrays, so that identical configurations are
+only computed once.
+The cache directory defaults to `data/.cache/meshes` and can be changed
+with the environment variable `SNAKELIPS_CACHE`.
+"""
+
+import hashlib
+import json
+import os
+import pathlib
+import shutil
+import tempfile
+
+import numpy
+import yaml
+
+import petibmpy
+
+
+ROOTDIR = pathlib.Path(__file__).absolute().parents[1]
+CACHEDIR = pathlib.Path(os.environ.get('SNAKELIPS_CACHE',
+                                       ROOTDIR / 'data' / '.cache')) / 'meshes'
+
+
+def _canonical(obj):
+    """Convert a configuration into plain Python types (numbers as floats)."""
+    if isinstance(obj, dict):
+        return {str(key): _canonical(value) for key, value in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_canonical(value) for value in obj]
+    if isinstance(obj, (bool, numpy.bool_)):
+        return bool(obj)
+    if isinstance(obj, (int, float, numpy.integer, numpy.floating)):
+        return float(obj)
+    return obj
+
+
+def config_hash(config, ndigits=10):
+    """Return the hash of a mesh configuration.
+
+    Parameters
+    ----------
+    config : list of dict
+        Configuration of the mesh (as passed to `petibmpy.CartesianGrid`).
+    ndigits : int
+        Number of digits used to write the YAML file; default: 10.
+
+    Returns
+    -------
+    str
+        SHA-256 digest of the canonical configuration.
+
+    """
+    data = dict(config=_canonical(config), ndigits=ndigits)
+    text = json.dumps(data, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _compute(config, entry, ndigits):
+    """Generate the mesh and store it in a cache entry."""
+    grid = petibmpy.CartesianGrid(config)
+    entry.parent.mkdir(parents=True, exist_ok=True)
+    # Write into a temporary folder first to keep the entry consistent.
+    tmpdir = pathlib.Path(tempfile.mkdtemp(dir=entry.parent))
+    grid.write_yaml(tmpdir / 'mesh.yaml', ndigits=ndigits)
+    gridlines = grid.get_gridlines()
+    numpy.savez(tmpdir / 'gridlines.npz',
+                **{f'x{i}': line for i, line in enumerate(gridlines)})
+    try:
+        tmpdir.rename(entry)
+    except OSError:  # entry created by another process in the meantime
+        shutil.rmtree(tmpdir)
+    return gridlines
+
+
+def load_gridlines(config, ndigits=10, cachedir=CACHEDIR):
+    """Return the gridlines of a mesh (computed once per configuration).
+
+    Parameters
+    ----------
+    config : list of dict
+        Configuration of the mesh (as passed to `petibmpy.CartesianGrid`).
+    ndigits : int
+        Number of digits used to write the YAML file; default: 10.
+    cachedir : pathlib.Path
+        Cache directory.
+
+    Returns
+    -------
+    list of numpy.ndarray
+        The gridlines (one array per direction).
+
+    """
+    entry = cachedir / config_hash(config, ndigits=ndigits)
+    if not (entry / 'gridlines.npz').is_file():
+        return _compute(config, entry, ndigits)
+    with numpy.load(entry / 'gridlines.npz') as data:
+        return [data[f'x{i}'] for i in range(len(data.files))]
+
+
+def write_mesh_yaml(config, filepath, ndigits=10, cachedir=CACHEDIR):
+    """Write the YAML file of a mesh, reusing a cached copy when available.
+
+    Parameters
+    ----------
+    config : list of dict
+        Configuration of the mesh (as passed to `petibmpy.CartesianGrid`).
+    filepath : pathlib.Path
+        Path of the YAML file to write.
+    ndigits : int
+        Number of digits used to write the YAML file; default: 10.
+    cachedir : pathlib.Path
+        Cache directory.
+
+    Returns
+    -------
+    list of numpy.ndarray
+        The gridlines (one array per direction).
+
+    """
+    gridlines = load_gridlines(config, ndigits=ndigits, cachedir=cachedir)
+    entry = cachedir / config_hash(config, ndigits=ndigits)
+    shutil.copyfile(entry / 'mesh.yaml', filepath)
+    return gridlines
+
+
+def print_info(gridlines):
+    """Print the number of cells and the extent of a mesh."""
+    ncells = [line.size - 1 for line in gridlines]
+    print('Number of cells: {} ({})'.format(
+        'x'.join(str(n) for n in ncells), numpy.prod(ncells)))
+    for direction, line in zip('xyz', gridlines):
+        widths = numpy.diff(line)
+        print(f'{direction}: [{line[0]}, {line[-1]}], '
+              f'min width = {widths.min():.6g}, '
+              f'max width = {widths.max():.6g}')
+
+
+def read_mesh_yaml(filepath):
+    """Read the gridlines of a mesh from a YAML file written by PetIBM.
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the YAML file (e.g., `mesh.yaml`).
+
+    Returns
+    -------
+    list of numpy.ndarray
+        The gridlines (one array per direction).
+
+    """
+    with open(filepath, 'r') as infile:
+        config = yaml.safe_load(infile)['mesh']
+    gridlines = []
+    for direction in config:
+        start, pieces = direction['start'], []
+        for sub in direction['subDomains']:
+            n, end = sub['cells'], sub['end']
+            r = sub.get('stretchRatio', 1.0)
+            if abs(r - 1.0) < 1e-12:
+                widths = numpy.full(n, (end - start) / n)
+            else:
+                h = (end - start) * (r - 1.0) / (r**n - 1.0)
+                widths = h * r**numpy.arange(n)
+            pieces.append(start + numpy.cumsum(widths[:-1]))
+            pieces.append([end])
+            start = end
+        gridlines.append(numpy.concatenate([[direction['start']], *pieces]))
+    return gridlines
@@ -0,0 +1,370 @@
+"""Compute POD and DMD modes of the wake from streamed snapshots.
+
+The snapshots of a simulation (`output/<timestep>.h5`) within a time
+window are read one at a time, optionally restricted to a region of
+interest (box), and never assembled into a dense snapshot matrix.
+The fields (e.g., u and v) are stacked into one vector per snapshot; the
+POD is the truncated SVD of the matrix of the fluctuations (mean
+subtracted), computed either with:
+
+* a randomized SVD (Halko et al.): the range of the matrix is sketched
+  with a random test matrix and refined with power iterations, each pass
+  over the snapshots reading every file once (2 + power_iterations
+  passes);
+* an incremental SVD (Brand): the truncated basis is updated with each
+  snapshot (2 passes: mean, then update).
+
+Memory use is of the order of (rank + oversampling) vectors of the size
+of a snapshot.
+The DMD is computed in the subspace of the POD modes (projected DMD), from
+the POD coefficients of consecutive snapshots (uniformly spaced in time).
+Note that the snapshot vectors are not weighted by the cell areas.
+
+The modes and spectra are written in `output/modes.h5`:
+
+* `<name>/x`, `<name>/y`, `<name>/mean`: gridlines and mean of each field;
+* `pod/singular_values`, `pod/energy` (fraction of the fluctuation energy
+  of each mode), `pod/coefficients` (rank, nt), `pod/<name>` (rank, ny,
+  nx);
+* `dmd/eigenvalues`, `dmd/frequencies`, `dmd/growth_rates`,
+  `dmd/amplitudes`, `dmd/<name>` (rank, ny, nx, complex), sorted by
+  decreasing amplitude.
+
+    python misc/modes.py runs/Re2000/both_lips/2k35 --box -1 4 -1.5 1.5
+"""
+
+import argparse
+import pathlib
+import time
+
+import h5py
+import numpy
+import yaml
+
+import field_stats
+import incremental
+import vorticity
+
+
+def get_box_slices(grid, box):
+    """Return the hyperslab (in (y, x) order) of a field inside a box."""
+    i0, i1 = numpy.searchsorted(grid[0], box[:2])
+    j0, j1 = numpy.searchsorted(grid[1], box[2:])
+    return slice(j0, j1), slice(i0, i1)
+
+
+class SnapshotReader(object):
+    """Read snapshots as vectors of stacked (and windowed) fields."""
+
+    def __init__(self, datadir, names, box=None):
+        """Read the grids of the fields.
+
+        Parameters
+        ----------
+        datadir : pathlib.Path
+            Directory with the snapshots and the grid written by PetIBM.
+        names : list of str
+            Names of the fields to stack.
+        box : tuple of floats
+            Region of interest (xmin, xmax, ymin, ymax); default: None
+            (whole domain).
+
+        """
+        self.datadir = datadir
+        self.names = list(names)
+        self.grids, self.slices, self.shapes = {}, {}, {}
+        for name in self.names:
+            grid = vorticity.read_grid_hdf5(datadir / 'grid.h5', name)
+            slices = None
+            if box is not None:
+                slices = get_box_slices(grid, box)
+                grid = [line[s] for line, s in zip(grid, slices[::-1])]
+            self.grids[name], self.slices[name] = grid, slices
+            self.shapes[name] = tuple(line.size for line in grid[::-1])
+        self.size = sum(int(numpy.prod(shape))
+                        for shape in self.shapes.values())
+
+    def read(self, timestep):
+        """Return the snapshot vector at a time step."""
+        filepath = self.datadir / f'{timestep:0>7}.h5'
+        return numpy.concatenate([
+            vorticity.read_field_hdf5(filepath, name,
+                                      slices=self.slices[name]).ravel()
+            for name in self.names])
+
+    def split(self, vectors):
+        """Split vectors (last axis) into the fields, on their grids."""
+        fields, start = {}, 0
+        for name in self.names:
+            end = start + int(numpy.prod(self.shapes[name]))
+            fields[name] = vectors[..., start:end].reshape(
+                vectors.shape[:-1] + self.shapes[name])
+            start = end
+        return fields
+
+
+def _stream(reader, timesteps, verbose, label):
+    """Yield the snapshot vectors, printing the progress of a pass."""
+    tic = time.perf_counter()
+    for i, timestep in enumerate(timesteps):
+        yield i, reader.read(timestep)
+        if verbose:
+            elapsed = time.perf_counter() - tic
+            print(f'[{label}] Read time step {timestep} '
+                  f'({i + 1}/{len(timesteps)}, '
+                  f'{(i + 1) / elapsed:.2f} snapshots/s)')
+
+
+def _compute_mean(reader, timesteps, verbose):
+    """Return the mean vector and the total fluctuation energy."""
+    stats = field_stats.RunningStats()
+    for _, x in _stream(reader, timesteps, verbose, 'mean'):
+        stats.update({'x': x})
+    return stats.mean['x'], float(numpy.sum(stats.m2['x']))
+
+
+def randomized_svd(reader, timesteps, rank, oversampling=10,
+                   power_iterations=1, seed=None, verbose=True):
+    """Truncated SVD of the fluctuations with a streamed randomized SVD.
+
+    Parameters
+    ----------
+    reader : SnapshotReader
+        Reader of the snapshot vectors.
+    timesteps : list of int
+        Time steps of the snapshots.
+    rank : int
+        Number of modes to keep.
+    oversampling : int
+        Number of additional random vectors of the sketch; default: 10.
+    power_iterations : int
+        Number of power iterations (one pass each); default: 1.
+    seed : int
+        Seed of the random test matrix; default: None.
+    verbose : bool
+        If True, print the progress; default: True.
+
+    Returns
+    -------
+    numpy.ndarray
+        Mean vector, of shape (n,).
+    float
+        Total fluctuation energy (sum of the squared fluctuations).
+    numpy.ndarray
+        Left singular vectors (modes), of shape (n, rank).
+    numpy.ndarray
+        Singular values, of shape (rank,).
+    numpy.ndarray
+        Right singular vectors, of shape (rank, nt).
+
+    """
+    nt = len(timesteps)
+    k = min(rank + oversampling, nt)
+    omega = numpy.random.RandomState(seed).standard_normal((nt, k))
+    # First pass: mean and sketch of the (uncentered) matrix; the sketch
+    # of the fluctuations is recovered with the mean afterwards.
+    stats = field_stats.RunningStats()
+    sketch = numpy.zeros((reader.size, k))
+    for i, x in _stream(reader, timesteps, verbose, 'sketch'):
+        stats.update({'x': x})
+        sketch += numpy.outer(x, omega[i])
+    mean, energy = stats.mean['x'], float(numpy.sum(stats.m2['x']))
+    sketch -= numpy.outer(mean, omega.sum(axis=0))
+    for it in range(power_iterations + 1):
+        q, _ = numpy.linalg.qr(sketch)
+        # Projection of the fluctuations on the basis (rows of b.T), and
+        # next sketch (X X^T Q) in the same pass.
+        b = numpy.empty((k, nt))
+        last = it == power_iterations
+        if not last:
+            sketch = numpy.zeros((reader.size, k))
+        label = 'project' if last else f'power iteration {it + 1}'
+        for i, x in _stream(reader, timesteps, verbose, label):
+            x = x - mean
+            b[:, i] = q.T @ x
+            if not last:
+                sketch += numpy.outer(x, b[:, i])
+    ub, s, vt = numpy.linalg.svd(b, full_matrices=False)
+    return mean, energy, q @ ub[:, :rank], s[:rank], vt[:rank]
+
+
+def incremental_svd(reader, timesteps, rank, oversampling=10,
+                    verbose=True, tol=1e-10):
+    """Truncated SVD of the fluctuations with an incremental SVD (Brand).
+
+    The basis keeps `rank + oversampling` vectors while snapshots are
+    added, to limit the truncation error, and is truncated to `rank` at
+    the end.
+
+    Returns
+    -------
+    numpy.ndarray
+        Mean vector, of shape (n,).
+    float
+        Total fluctuation energy (sum of the squared fluctuations).
+    numpy.ndarray
+        Left singular vectors (modes), of shape (n, rank).
+    numpy.ndarray
+        Singular values, of shape (rank,).
+    numpy.ndarray
+        Right singular vectors, of shape (rank, nt).
+
+    """
+    mean, energy = _compute_mean(reader, timesteps, verbose)
+    k = rank + oversampling
+    u = numpy.zeros((reader.size, 0))
+    s = numpy.zeros(0)
+    v = numpy.zeros((0, 0))  # rows: snapshots, columns: modes
+    for i, x in _stream(reader, timesteps, verbose, 'update'):
+        x = x - mean
+        p = u.T @ x
+        r = x - u @ p
+        rho = numpy.linalg.norm(r)
+        extend = rho > tol * max(1.0, numpy.linalg.norm(x))
+        m = s.size
+        kmat = numpy.zeros((m + 1, m + 1))
+        kmat[:m, :m] = numpy.diag(s)
+        kmat[:m, m] = p
+        kmat[m, m] = rho if extend else 0.0
+        uk, s, vkt = numpy.linalg.svd(kmat)
+        basis = numpy.hstack([u, (r / rho)[:, None] if extend
+                              else numpy.zeros((reader.size, 1))])
+        vext = numpy.zeros((v.shape[0] + 1, m + 1))
+        vext[:-1, :m] = v
+        vext[-1, m] = 1.0
+        u, v = basis @ uk, vext @ vkt.T
+        if s.size > k:
+            u, s, v = u[:, :k], s[:k], v[:, :k]
+        if i % 10 == 9:  # restore the orthogonality lost to round-off
+            q, rmat = numpy.linalg.qr(u)
+            uq, s, vqt = numpy.linalg.svd(rmat * s)
+            u, v = q @ uq, v @ vqt.T
+    return mean, energy, u[:, :rank], s[:rank], v[:, :rank].T
+
+
+def compute_dmd(coefficients, dt):
+    """Compute the DMD in the subspace of the POD modes (projected DMD).
+
+    Parameters
+    ----------
+    coefficients : numpy.ndarray
+        POD coefficients of the snapshots, of shape (rank, nt).
+    dt : float
+        Time interval between consecutive snapshots.
+
+    Returns
+    -------
+    numpy.ndarray
+        Eigenvalues (discrete time), of shape (rank,).
+    numpy.ndarray
+        Eigenvectors (DMD modes in the POD basis), of shape (rank, rank).
+    numpy.ndarray
+        Amplitudes of the modes (fit of the first snapshot).
+
+    """
+    a1, a2 = coefficients[:, :-1], coefficients[:, 1:]
+    atilde = a2 @ numpy.linalg.pinv(a1)
+    eigvals, eigvecs = numpy.linalg.eig(atilde)
+    amplitudes = numpy.linalg.lstsq(eigvecs, coefficients[:, 0],
+                                    rcond=None)[0]
+    order = numpy.argsort(-numpy.abs(amplitudes))
+    return eigvals[order], eigvecs[:, order], amplitudes[order]
+
+
+def write_modes(filepath, reader, mean, energy, modes, s, vt, dmd, dt,
+                attrs):
+    """Write the POD and DMD modes and spectra into a HDF5 file."""
+    eigvals, eigvecs, amplitudes = dmd
+    omega = numpy.log(eigvals.astype(numpy.complex128)) / dt
+    with h5py.File(filepath, 'w') as outfile:
+        for name, values in reader.split(mean).items():
+            for dim, line in zip('xyz', reader.grids[name]):
+                outfile.create_dataset(f'{name}/{dim}', data=line)
+            outfile.create_dataset(f'{name}/mean', data=values)
+        outfile.create_dataset('pod/singular_values', data=s)
+        outfile.create_dataset('pod/energy',
+                               data=s**2 / energy if energy > 0.0 else s)
+        outfile.create_dataset('pod/coefficients', data=s[:, None] * vt)
+        for name, values in reader.split(modes.T).items():
+            outfile.create_dataset(f'pod/{name}', data=values)
+        outfile.create_dataset('dmd/eigenvalues', data=eigvals)
+        outfile.create_dataset('dmd/frequencies',
+                               data=omega.imag / (2.0 * numpy.pi))
+        outfile.create_dataset('dmd/growth_rates', data=omega.real)
+        outfile.create_dataset('dmd/amplitudes', data=amplitudes)
+        for name, values in reader.split((modes @ eigvecs).T).items():
+            outfile.create_dataset(f'dmd/{name}', data=values)
+        for key, value in attrs.items():
+            outfile.attrs[key] = value
+
+
+def parse_command_line():
+    """Parse the command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('simudir', type=pathlib.Path,
+                        help='simulation directory')
+    parser.add_argument('--time-limits', type=float, nargs=2,
+                        default=[50.0, 80.0], metavar=('START', 'END'),
+                        help='time window (default: 50 80)')
+    parser.add_argument('--fields', nargs='+', default=['u', 'v'],
+                        help='fields to stack (default: u v)')
+    parser.add_argument('--box', type=float, nargs=4, default=None,
+                        metavar=('XMIN', 'XMAX', 'YMIN', 'YMAX'),
+                        help='region of interest (default: whole domain)')
+    parser.add_argument('--rank', type=int, default=10,
+                        help='number of modes (default: 10)')
+    parser.add_argument('--method', default='randomized',
+                        choices=['randomized', 'incremental'],
+                        help='SVD algorithm (default: randomized)')
+    parser.add_argument('--oversampling', type=int, default=10,
+                        help='additional basis vectors (default: 10)')
+    parser.add_argument('--power-iterations', type=int, default=1,
+                        help='power iterations of the randomized SVD '
+                             '(default: 1)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed of the randomized SVD')
+    parser.add_argument('--output', default='modes.h5',
+                        help='name of the file written in the output folder '
+                             '(default: modes.h5)')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_command_line()
+    datadir = args.simudir / 'output'
+    with open(args.simudir / 'config.yaml', 'r') as infile:
+        params = yaml.safe_load(infile)['parameters']
+    timesteps = incremental.get_saved_timesteps(
+        datadir, field_stats.get_timesteps(args.simudir, args.time_limits))
+    if len(timesteps) < 2:
+        raise ValueError(f'{args.simudir}: less than two snapshots in the '
+                         'time window')
+    steps = numpy.diff(timesteps)
+    if numpy.any(steps != steps[0]):
+        print('[WARNING] Snapshots are not uniformly spaced in time '
+              '(missing files?); the DMD spectrum is not reliable')
+    dt = float(steps[0]) * params['dt']
+    rank = min(args.rank, len(timesteps))
+
+    reader = SnapshotReader(datadir, args.fields, box=args.box)
+    print(f'[INFO] {args.simudir}: {len(timesteps)} snapshot(s) of '
+          f'{reader.size} values ({", ".join(args.fields)})')
+    if args.method == 'randomized':
+        mean, energy, modes, s, vt = randomized_svd(
+            reader, timesteps, rank, oversampling=args.oversampling,
+            power_iterations=args.power_iterations, seed=args.seed)
+    else:
+        mean, energy, modes, s, vt = incremental_svd(
+            reader, timesteps, rank, oversampling=args.oversampling)
+    dmd = compute_dmd(s[:, None] * vt, dt)
+    print(f'[INFO] Energy captured by {rank} POD mode(s): '
+          f'{numpy.sum(s**2) / energy:.2%}')
+
+    attrs = dict(method=args.method, rank=rank, timesteps=timesteps,
+                 time_limits=args.time_limits, dt=dt)
+    if args.box is not None:
+        attrs['box'] = args.box
+    filepath = datadir / args.output
+    write_modes(filepath, reader, mean, energy, modes, s, vt, dmd, dt,
+                attrs)
+    print(f'[INFO] Saved {filepath}')
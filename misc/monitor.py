@@ -0,0 +1,321 @@
+"""Monitor the force history of a running simulation and stop it early.
+
+The file `forces-0.txt` written by PetIBM is followed like `tail -f`: only
+the lines appended since the previous poll are parsed (an incomplete last
+line is kept for the next poll, and lines whose time value does not
+increase, e.g., after a restart, are skipped).
+The drag and lift coefficients are reduced on the fly to batch sums;
+after a first batch of maximum duration, a batch ends once it spans a
+given number of shedding cycles (or after the maximum duration, without
+shedding); only the most recent batches are kept (a ring of fixed size,
+the oldest batches, i.e., the transient, are dropped first), so that
+memory use is bounded, whatever the number of time steps.
+As in `transient.py`, a cycle ends at an upward crossing of the lift
+through a band about its mean over the previous batch (half-width: a
+fraction of its standard deviation over the previous batch), counted
+only after the lift went below the band, so that noise does not add
+spurious cycles.
+From the completed batches, the end of the initial transient is detected
+with MSER and the mean, RMS, standard error of the mean (batch means),
+and shedding frequency (cycles per unit time) are estimated, as done
+offline by `transient.py`.
+Once the standard errors of the mean of Cd and Cl are below a tolerance,
+the monitor writes a stop file with the statistics and, optionally, sends
+a signal to the solver.
+
+The monitor must run on the machine where the solver writes the force
+history (`--pid` refers to a local process), with Python and NumPy, e.g.,
+next to a local run:
+
+    petibm-decoupledibpm -probes probes.yaml &
+    python misc/monitor.py output/forces-0.txt --pid $! --tol 0.005
+
+It is not wired into the Batch Shipyard jobs (`config_shipyard/jobs.yaml`):
+their container (`barbagroup/petibm`) has neither Python nor NumPy, the
+solver runs under `mpirun` in a copy of the simulation directory, and the
+output is only copied to the file share once the solver exits.
+"""
+
+import argparse
+import collections
+import os
+import pathlib
+import signal
+import time
+
+import numpy
+import yaml
+
+import transient
+
+
+class ForceMonitor(object):
+    """Incremental statistics of the force coefficients of a running job."""
+
+    def __init__(self, filepath, cycles=2, max_duration=10.0, coeff=2.0,
+                 band=0.5, max_batches=100):
+        """Initialize the monitor (nothing is read yet).
+
+        Parameters
+        ----------
+        filepath : pathlib.Path
+            Path of the force history written by PetIBM.
+        cycles : int
+            Number of shedding cycles per batch; default: 2.
+        max_duration : float
+            Maximum duration of a batch (without shedding); default: 10.0.
+        coeff : float
+            Scaling factor from forces to force coefficients; default: 2.0.
+        band : float
+            Half-width of the hysteresis band, relative to the standard
+            deviation of the lift over the previous batch; default: 0.5.
+        max_batches : int
+            Number of completed batches kept (the most recent ones);
+            default: 100.
+
+        """
+        self.filepath = pathlib.Path(filepath)
+        self.cycles, self.max_duration = cycles, max_duration
+        self.coeff, self.band = coeff, band
+        self.max_batches = max_batches
+        self.reset()
+
+    def reset(self):
+        """Forget everything read so far."""
+        self.offset, self.partial = 0, b''
+        self.t_last = -numpy.inf
+        self.armed = False  # lift below the band since the last crossing
+        # Per batch: start time, count, sums and sums of squares of
+        # (cd, cl), number of upward crossings of the lift, and end time.
+        # The first batch only warms up (reference level of the lift).
+        self.batches = collections.deque(maxlen=self.max_batches)
+        self.previous = None  # last batch closed
+        self._new_batch()
+
+    def _new_batch(self):
+        self.current = dict(start=None, end=None, count=0,
+                            sum=numpy.zeros(2), sumsq=numpy.zeros(2),
+                            crossings=0)
+
+    def poll(self):
+        """Parse the lines appended since the previous poll.
+
+        Returns
+        -------
+        int
+            Number of new time steps.
+
+        """
+        if not self.filepath.is_file():
+            return 0
+        if self.filepath.stat().st_size < self.offset:  # file was rewritten
+            self.reset()
+        with open(self.filepath, 'rb') as infile:
+            infile.seek(self.offset)
+            data = infile.read()
+        self.offset += len(data)
+        data = self.partial + data
+        end = data.rfind(b'\n') + 1
+        self.partial = data[end:]
+        lines = data[:end].split()
+        if not lines:
+            return 0
+        values = numpy.array(lines, dtype=numpy.float64)
+        ncols = len(data[:data.find(b'\n')].split())
+        values = values.reshape(-1, ncols)
+        t, fx, fy = values[:, 0], values[:, 1], values[:, 2]
+        # Skip the time values already seen (restart with overlap).
+        mask = t > numpy.maximum.accumulate(numpy.append(self.t_last,
+                                                         t[:-1]))
+        t, fx, fy = t[mask], fx[mask], fy[mask]
+        if t.size > 0:
+            self._update(t, self.coeff * fx, self.coeff * fy)
+        return int(t.size)
+
+    def _add(self, t, cd, cl):
+        """Add samples to the current batch."""
+        b = self.current
+        if b['start'] is None:
+            b['start'] = float(t[0])
+        x = numpy.array([cd, cl])
+        b['count'] += t.size
+        b['sum'] += x.sum(axis=1)
+        b['sumsq'] += (x**2).sum(axis=1)
+        self.t_last = t[-1]
+
+    def _reference(self):
+        """Return the mean and band half-width of the lift (previous batch)."""
+        b = self.previous
+        mean = b['sum'][1] / b['count']
+        std = numpy.sqrt(max(b['sumsq'][1] / b['count'] - mean**2, 0.0))
+        return mean, self.band * std
+
+    def _close(self, t):
+        """Close the current batch (the next one starts at time t)."""
+        self.current['end'] = float(t)
+        if self.previous is not None:
+            self.batches.append(self.current)
+        self.previous = self.current
+        self._new_batch()
+
+    def _update(self, t, cd, cl):
+        """Add samples, closing batches at shedding cycles."""
+        pos, n = 0, t.size
+        while pos < n:
+            b = self.current
+            if b['count'] == 0:
+                self._add(t[pos:pos + 1], cd[pos:pos + 1], cl[pos:pos + 1])
+                pos += 1
+                continue
+            # Search a crossing before the maximum duration of the batch.
+            limit = pos + numpy.searchsorted(t[pos:],
+                                             b['start'] + self.max_duration)
+            # An upward crossing only counts once the lift went below the
+            # band (no reference level yet in the first batch).
+            i = numpy.empty(0, dtype=int)
+            if self.previous is not None:
+                mean, h = self._reference()
+                y = cl[pos:limit] - mean
+                start = 0
+                if not self.armed:
+                    low = numpy.flatnonzero(y < -h)
+                    self.armed = low.size > 0
+                    start = low[0] if self.armed else y.size
+                i = start + numpy.flatnonzero(y[start:] > h)
+            if i.size == 0:
+                if limit > pos:
+                    self._add(t[pos:limit], cd[pos:limit], cl[pos:limit])
+                pos = limit
+                if limit < n:  # maximum duration reached
+                    self._close(t[limit])
+                continue
+            c = pos + i[0]  # first sample above the band
+            self.armed = False
+            if c > pos:
+                self._add(t[pos:c], cd[pos:c], cl[pos:c])
+            b['crossings'] += 1
+            if b['crossings'] == self.cycles:
+                self._close(t[c])
+            self._add(t[c:c + 1], cd[c:c + 1], cl[c:c + 1])
+            pos = c + 1
+
+    def get_statistics(self, min_batches=5):
+        """Return the statistics of the completed batches after the transient.
+
+        Returns
+        -------
+        dict
+            Time reached, end of the transient, number of batches used,
+            and mean, RMS, and standard error of the mean of Cd and Cl,
+            and shedding frequency (None when not enough batches).
+
+        """
+        complete = list(self.batches)
+        stats = dict(time=float(self.t_last), batches=0)
+        if len(complete) < 2 * min_batches:
+            return stats
+        means = numpy.array([b['sum'] / b['count'] for b in complete]).T
+        d = max(transient.mser(means[0])[0], transient.mser(means[1])[0])
+        used = complete[d:]
+        count = sum(b['count'] for b in used)
+        mean = sum(b['sum'] for b in used) / count
+        rms = numpy.sqrt(sum(b['sumsq'] for b in used) / count)
+        errors = [transient.get_standard_errors(m[d:])[-1] for m in means]
+        shedding = [b for b in used if b['crossings'] == self.cycles]
+        frequency = None
+        if shedding:
+            frequency = float(len(shedding) * self.cycles /
+                              sum(b['end'] - b['start'] for b in shedding))
+        stats.update(start=used[0]['start'], batches=len(used),
+                     cd=dict(mean=float(mean[0]), rms=float(rms[0]),
+                             error=float(errors[0])),
+                     cl=dict(mean=float(mean[1]), rms=float(rms[1]),
+                             error=float(errors[1])),
+                     frequency=frequency)
+        return stats
+
+
+def is_converged(stats, tol, min_batches=5):
+    """Check if the standard errors of the mean of Cd and Cl are below tol."""
+    return (stats['batches'] >= min_batches and
+            stats['cd']['error'] <= tol and stats['cl']['error'] <= tol)
+
+
+def _is_running(pid):
+    """Check if a process is still running."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def parse_command_line():
+    """Parse the command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('filepath', type=pathlib.Path,
+                        help='force history (forces-0.txt)')
+    parser.add_argument('--tol', type=float, default=0.005,
+                        help='tolerance on the standard error of the mean '
+                             'of Cd and Cl (default: 0.005)')
+    parser.add_argument('--cycles', type=int, default=2,
+                        help='shedding cycles per batch (default: 2)')
+    parser.add_argument('--max-duration', type=float, default=10.0,
+                        help='maximum duration of a batch (default: 10.0)')
+    parser.add_argument('--max-batches', type=int, default=100,
+                        help='number of recent batches kept (default: 100)')
+    parser.add_argument('--min-batches', type=int, default=5,
+                        help='minimum number of batches after the '
+                             'transient (default: 5)')
+    parser.add_argument('--interval', type=float, default=60.0,
+                        help='seconds between two polls (default: 60)')
+    parser.add_argument('--stop-file', type=pathlib.Path, default=None,
+                        help='file written once converged '
+                             '(default: STOP next to the force history)')
+    parser.add_argument('--pid', type=int, default=None,
+                        help='process to signal once converged '
+                             '(the monitor also exits when it ends)')
+    parser.add_argument('--signal', default='SIGTERM',
+                        help='signal sent to the process (default: SIGTERM)')
+    parser.add_argument('--once', action='store_true',
+                        help='read the file once, report, and exit')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_command_line()
+    stop_file = args.stop_file or args.filepath.parent / 'STOP'
+    monitor = ForceMonitor(args.filepath, cycles=args.cycles,
+                           max_duration=args.max_duration,
+                           max_batches=args.max_batches)
+    while True:
+        tic = time.perf_counter()
+        nlines = monitor.poll()
+        stats = monitor.get_statistics(min_batches=args.min_batches)
+        if stats['batches'] > 0:
+            print(f'[t={stats["time"]:.2f}] +{nlines} lines '
+                  f'({time.perf_counter() - tic:.3f} s); '
+                  f'transient until t={stats["start"]:.1f}; '
+                  f'<C_D>={stats["cd"]["mean"]:.4f} '
+                  f'(SE {stats["cd"]["error"]:.4f}), '
+                  f'<C_L>={stats["cl"]["mean"]:.4f} '
+                  f'(SE {stats["cl"]["error"]:.4f}), '
+                  f'f={stats["frequency"] or float("nan"):.4f}', flush=True)
+        else:
+            print(f'[t={stats["time"]:.2f}] +{nlines} lines; '
+                  'not enough batches yet', flush=True)
+        if stats['batches'] > 0 and is_converged(stats, args.tol,
+                                                 args.min_batches):
+            with open(stop_file, 'w') as outfile:
+                yaml.safe_dump(stats, outfile, default_flow_style=False)
+            print(f'[INFO] Converged; saved {stop_file}', flush=True)
+            if args.pid is not None and _is_running(args.pid):
+                os.kill(args.pid, getattr(signal, args.signal))
+                print(f'[INFO] Sent {args.signal} to process {args.pid}')
+            break
+        if args.once or (args.pid is not None and
+                         not _is_running(args.pid)):
+            break
+        time.sleep(args.interval)
@@ -0,0 +1,282 @@
+"""Find the stretched Cartesian mesh with the fewest cells.
+
+The mesh is described by nested refinement boxes (finest first), each with
+its required (maximum) grid spacing, inside the computational domain with
+its own maximum spacing.
+The finest box is uniform; between two consecutive boxes (and between the
+coarsest box and the domain boundaries), the grid spacing is stretched
+geometrically from the finer spacing to the coarser one.
+For each stretched segment, we search the stretching ratio (up to the
+maximum allowed) that minimizes the number of cells, accounting for the
+way PetIBM adjusts stretched sub-domains to the length of the segment,
+and checking that the ratio between consecutive cell widths (including
+at the junctions between sub-domains) stays below the maximum.
+
+The result is a configuration that can be passed to
+`petibmpy.CartesianGrid` (same layout as in the create_mesh_yaml.py
+scripts).
+"""
+
+import argparse
+import collections
+import math
+
+import numpy
+import yaml
+
+
+Box = collections.namedtuple('Box', ['xstart', 'xend', 'ystart', 'yend'])
+
+SIDES = ('x-', 'x+', 'y-', 'y+')
+
+
+def stretched_segment(length, width, ratio, max_width):
+    """Return the number of cells of a stretched sub-domain.
+
+    The sub-domain is split (as PetIBM does) into a geometrically stretched
+    part (starting with cells of `width`) followed by a uniform part
+    (with cells of `max_width`).
+    Operations are vectorized over the stretching ratio.
+
+    Parameters
+    ----------
+    length : float
+        Length of the sub-domain.
+    width : float
+        Width of the first cell.
+    ratio : numpy.ndarray
+        Stretching ratios (> 1).
+    max_width : float
+        Maximum cell width.
+
+    Returns
+    -------
+    numpy.ndarray
+        Number of cells in the stretched part.
+    numpy.ndarray
+        Number of cells in the uniform part.
+    numpy.ndarray
+        Actual width of the first stretched cell.
+    numpy.ndarray
+        Actual width of the last stretched cell.
+
+    """
+    ratio = numpy.asarray(ratio, dtype=numpy.float64)
+    log_r = numpy.log(ratio)
+    # Stretch the cells until reaching the maximum width.
+    n0 = numpy.ceil(numpy.log(max_width / width) / log_r)
+    length0 = width * (ratio**n0 - 1.0) / (ratio - 1.0)
+    # Fill the rest of the segment with uniform cells.
+    n_uniform = numpy.floor(numpy.maximum(length - length0, 0.0) / max_width)
+    length_s = length - n_uniform * max_width
+    n_stretch = numpy.maximum(
+        numpy.round(numpy.log1p(length_s * (ratio - 1.0) / width) / log_r),
+        1.0)
+    first = length_s * (ratio - 1.0) / (ratio**n_stretch - 1.0)
+    last = first * ratio**(n_stretch - 1.0)
+    return (n_stretch.astype(int), n_uniform.astype(int), first, last)
+
+
+def optimize_segment(start, end, width, max_width, max_ratio, reverse=False,
+                     num=1000):
+    """Find the sub-domain with the fewest cells for a stretched segment.
+
+    Parameters
+    ----------
+    start : float
+        Start of the segment.
+    end : float
+        End of the segment.
+    width : float
+        Grid spacing on the fine side of the segment.
+    max_width : float
+        Grid spacing on the coarse side of the segment (maximum).
+    max_ratio : float
+        Maximum ratio between the widths of two consecutive cells.
+    reverse : bool
+        Set to True if the fine side is at the end of the segment;
+        default: False.
+    num : int
+        Number of stretching ratios to try; default: 1000.
+
+    Returns
+    -------
+    dict
+        Configuration of the sub-domain.
+    int
+        Number of cells in the sub-domain.
+
+    """
+    length = end - start
+    # Uniform sub-domain with the fine spacing (always valid).
+    n_fine = int(math.ceil(length / width - 1e-6))
+    uniform_width = width
+    if abs(length / width - n_fine) > 1e-6:
+        # PetIBM requires an integer number of cells.
+        uniform_width = length / n_fine
+    best = (dict(start=start, end=end, width=uniform_width), n_fine)
+    if max_ratio <= 1.0 or max_width <= width:
+        return best
+    ratios = numpy.round(numpy.linspace(1.0, max_ratio, num=num + 1)[1:], 6)
+    n_stretch, n_uniform, first, last = stretched_segment(length, width,
+                                                          ratios, max_width)
+    tol = 1e-9
+    valid = ((first <= width * max_ratio * (1 + tol)) &
+             (first * max_ratio >= width * (1 - tol)) &
+             (last <= max_width * (1 + tol)) &
+             ((n_uniform == 0) | (max_width <= last * max_ratio * (1 + tol))))
+    if not numpy.any(valid):
+        return best
+    ncells = numpy.where(valid, n_stretch + n_uniform, numpy.iinfo(int).max)
+    # Fewest cells; ties broken with the smallest stretching ratio.
+    k = int(numpy.argmin(ncells))
+    if ncells[k] >= best[1]:
+        return best
+    config = dict(start=start, end=end, width=width,
+                  stretchRatio=float(ratios[k]), max_width=max_width)
+    if reverse:
+        config['reverse'] = True
+    return config, int(ncells[k])
+
+
+def optimize_mesh(domain, max_width, boxes, widths, max_ratio, num=1000):
+    """Find the mesh configuration with the fewest cells.
+
+    Parameters
+    ----------
+    domain : Box
+        Extents of the computational domain.
+    max_width : float
+        Maximum grid spacing in the domain.
+    boxes : list of Box
+        Refinement boxes, from the finest to the coarsest (nested).
+    widths : list of floats
+        Maximum grid spacing in each box.
+    max_ratio : float or dict
+        Maximum stretching ratio; use a dictionary with keys in
+        ('x-', 'x+', 'y-', 'y+') to set a different ratio on each side
+        of the boxes.
+    num : int
+        Number of stretching ratios to try per segment; default: 1000.
+
+    Returns
+    -------
+    list of dict
+        Configuration of the mesh (to pass to `petibmpy.CartesianGrid`).
+    list of int
+        Number of cells in each direction.
+
+    """
+    if not isinstance(max_ratio, dict):
+        max_ratio = {side: max_ratio for side in SIDES}
+    allboxes = list(boxes) + [domain]
+    allwidths = list(widths) + [max_width]
+    config, ncells = [], []
+    for direction in 'xy':
+        starts = [getattr(box, direction + 'start') for box in allboxes]
+        ends = [getattr(box, direction + 'end') for box in allboxes]
+        if any(s1 < s0 for s0, s1 in zip(starts[1:], starts[:-1])) or \
+           any(e1 > e0 for e0, e1 in zip(ends[1:], ends[:-1])):
+            raise ValueError(f'Boxes are not nested in {direction}-direction')
+        # Uniform sub-domain in the finest box.
+        sub, n = optimize_segment(starts[0], ends[0], allwidths[0],
+                                  allwidths[0], 1.0)
+        lower, upper, total = [], [sub], n
+        for k in range(len(allboxes) - 1):
+            w_fine, w_coarse = allwidths[k], allwidths[k + 1]
+            if starts[k + 1] < starts[k]:
+                sub, n = optimize_segment(starts[k + 1], starts[k],
+                                          w_fine, w_coarse,
+                                          max_ratio[direction + '-'],
+                                          reverse=True, num=num)
+                lower.insert(0, sub)
+                total += n
+            if ends[k + 1] > ends[k]:
+                sub, n = optimize_segment(ends[k], ends[k + 1],
+                                          w_fine, w_coarse,
+                                          max_ratio[direction + '+'],
+                                          num=num)
+                upper.append(sub)
+                total += n
+        config.append(dict(direction=direction, start=starts[-1],
+                           subDomains=lower + upper))
+        ncells.append(total)
+    return config, ncells
+
+
+def count_cells(config):
+    """Count the number of cells of a mesh configuration.
+
+    Parameters
+    ----------
+    config : list of dict
+        Configuration of the mesh (as passed to `petibmpy.CartesianGrid`).
+
+    Returns
+    -------
+    list of int
+        Number of cells in each direction.
+
+    """
+    ncells = []
+    for direction in config:
+        total = 0
+        for sub in direction['subDomains']:
+            length = sub['end'] - sub['start']
+            ratio = sub.get('stretchRatio', 1.0)
+            if abs(ratio - 1.0) < 1e-12:
+                total += int(round(length / sub['width']))
+            else:
+                n_stretch, n_uniform, _, _ = stretched_segment(
+                    length, sub['width'], ratio,
+                    sub.get('max_width', numpy.inf))
+                total += int(n_stretch) + int(n_uniform)
+        ncells.append(total)
+    return ncells
+
+
+def parse_command_line():
+    """Parse the command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--domain', type=float, nargs=4, required=True,
+                        metavar=('XSTART', 'XEND', 'YSTART', 'YEND'),
+                        help='extents of the computational domain')
+    parser.add_argument('--max-width', type=float, required=True,
+                        help='maximum grid spacing in the domain')
+    parser.add_argument('--box', dest='boxes', type=float, nargs=5,
+                        action='append', required=True,
+                        metavar=('XSTART', 'XEND', 'YSTART', 'YEND', 'WIDTH'),
+                        help='refinement box with its maximum grid spacing '
+                             '(repeat from the finest to the coarsest)')
+    parser.add_argument('--max-ratio', type=float, default=1.1,
+                        help='maximum stretching ratio (default: 1.1)')
+    parser.add_argument('--side-ratio', dest='side_ratios', default=[],
+                        action='append', metavar='SIDE=RATIO',
+                        help='maximum stretching ratio on a given side '
+                             f'of the boxes ({", ".join(SIDES)}), '
+                             'e.g. x+=1.01 in the wake')
+    parser.add_argument('--output', default=None,
+                        help='YAML file to write the configuration')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_command_line()
+    max_ratio = {side: args.max_ratio for side in SIDES}
+    for item in args.side_ratios:
+        side, value = item.split('=')
+        if side not in SIDES:
+            raise ValueError(f'Unknown side {side}; choose from {SIDES}')
+        max_ratio[side] = float(value)
+    boxes = [Box(*values[:4]) for values in args.boxes]
+    widths = [values[4] for values in args.boxes]
+    config, ncells = optimize_mesh(Box(*args.domain), args.max_width,
+                                   boxes, widths, max_ratio)
+    print(f'[INFO] Number of cells: {ncells[0]}x{ncells[1]} '
+          f'({ncells[0] * ncells[1]})')
+    text = yaml.safe_dump(config, default_flow_style=None, sort_keys=False)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, 'w') as outfile:
+            outfile.write(text)
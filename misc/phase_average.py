@@ -0,0 +1,275 @@
+"""Phase-average the wake over the vortex-shedding cycle.
+
+The shedding phase is detected from the lift coefficient (`forces-0.txt`)
+within a time window, either with the Hilbert transform of the
+fluctuating lift (analytic signal) or by interpolating the phase linearly
+between upward zero-crossings; in both cases, the phase is zero at the
+maximum lift.
+The saved snapshots (u, v, p) are binned by phase and accumulated in a
+streaming pass (Welford's algorithm), with the phase bins spread across a
+process pool: each task accumulates the snapshots of a single bin (or of
+a part of it when there are more processes than bins), and its statistics
+are merged as soon as it completes, so that the memory used does not grow
+with the number of processes.
+Frames of the volume probes are binned the same way.
+The phase-averaged fields are written in `output/phase_average.h5`:
+
+* `phases`: center of each phase bin (in radians), `counts`: number of
+  snapshots in each bin;
+* `<name>/mean`, `<name>/std` (standard deviation within the bin) for
+  the fields u, v, and p, of shape (nbins, ny, nx);
+* `probes/<probe>/mean`, of shape (nbins, ny, nx), and `probes/<probe>/x`,
+  `probes/<probe>/y`.
+
+    python misc/phase_average.py runs/Re2000/both_lips/2k35 --nbins 8
+"""
+
+import argparse
+import multiprocessing
+import os
+import pathlib
+
+import h5py
+import numpy
+import yaml
+from scipy import signal
+
+import petibmpy
+
+import field_stats
+import forces
+import incremental
+import probes
+import vorticity
+
+
+FIELDS = ('u', 'v', 'p')
+
+
+def read_lift_coefficient(simudir):
+    """Return the time values and the lift coefficient of a simulation."""
+    filepath = simudir / 'output' / 'forces-0.txt'
+    t, fx, fy = forces.read_forces(filepath)
+    _, cl = petibmpy.get_force_coefficients(fx, fy, coeff=2.0)
+    return t, cl
+
+
+def get_shedding_phase(t, cl, time_limits, method='hilbert'):
+    """Detect the shedding phase from the lift coefficient.
+
+    Parameters
+    ----------
+    t : numpy.ndarray
+        Time values.
+    cl : numpy.ndarray
+        Lift coefficient.
+    time_limits : tuple of floats
+        Time window to use.
+    method : str
+        'hilbert' (analytic signal) or 'zero-crossing' (linear phase
+        between upward zero-crossings); default: 'hilbert'.
+
+    Returns
+    -------
+    numpy.ndarray
+        Time values in the window.
+    numpy.ndarray
+        Unwrapped phase (zero at the maximum lift); NaN where undefined
+        (before the first or after the last zero-crossing).
+
+    """
+    mask = (t >= time_limits[0]) & (t <= time_limits[1])
+    t, fluct = t[mask], cl[mask] - numpy.mean(cl[mask])
+    if method == 'hilbert':
+        return t, numpy.unwrap(numpy.angle(signal.hilbert(fluct)))
+    if method != 'zero-crossing':
+        raise ValueError(f'Unknown method {method}')
+    idx = numpy.where((fluct[:-1] < 0.0) & (fluct[1:] >= 0.0))[0]
+    if idx.size < 2:
+        raise ValueError('Less than two shedding cycles in the window')
+    # Times of the upward zero-crossings (linear interpolation).
+    tc = t[idx] - fluct[idx] * (t[idx + 1] - t[idx]) / (fluct[idx + 1] -
+                                                        fluct[idx])
+    # A cosine crosses zero upward at a phase of -pi/2.
+    phase_c = 2.0 * numpy.pi * numpy.arange(idx.size) - 0.5 * numpy.pi
+    return t, numpy.interp(t, tc, phase_c, left=numpy.nan,
+                           right=numpy.nan)
+
+
+def get_phase_bins(times, t, phase, nbins):
+    """Return the phase bin of each time value (-1 if undefined)."""
+    values = numpy.interp(times, t, phase, left=numpy.nan, right=numpy.nan)
+    bins = numpy.full(times.size, -1, dtype=int)
+    valid = ~numpy.isnan(values)
+    wrapped = numpy.mod(values[valid], 2.0 * numpy.pi)
+    bins[valid] = numpy.minimum((wrapped / (2.0 * numpy.pi) * nbins)
+                                .astype(int), nbins - 1)
+    return bins
+
+
+def _accumulate(args):
+    """Accumulate the snapshots of a phase bin."""
+    datadir, k, timesteps = args
+    stats = field_stats.RunningStats()
+    for timestep in timesteps:
+        filepath = datadir / f'{timestep:0>7}.h5'
+        stats.update({name: vorticity.read_field_hdf5(filepath, name)
+                      for name in FIELDS})
+    return k, stats
+
+
+def phase_average_fields(datadir, timesteps, bins, nbins, nproc=None):
+    """Phase-average the snapshots in a streaming pass with a process pool.
+
+    Parameters
+    ----------
+    datadir : pathlib.Path
+        Directory with the snapshots written by PetIBM.
+    timesteps : list of int
+        Time steps of the snapshots.
+    bins : numpy.ndarray
+        Phase bin of each snapshot (-1 to skip it).
+    nbins : int
+        Number of phase bins.
+    nproc : int
+        Number of worker processes; default: None (number of CPUs).
+
+    Returns
+    -------
+    list of field_stats.RunningStats
+        Statistics of the fields in each phase bin.
+
+    """
+    groups = [[int(timestep) for timestep, b in zip(timesteps, bins)
+               if b == k] for k in range(nbins)]
+    if not any(groups):
+        raise ValueError('No snapshot to phase-average')
+    nproc = nproc or os.cpu_count() or 1
+    # Split the bins when there are more processes than bins.
+    nsplit = -(-nproc // nbins)
+    tasks = [(datadir, k, chunk.tolist())
+             for k, group in enumerate(groups) if len(group) > 0
+             for chunk in numpy.array_split(numpy.array(group),
+                                            min(nsplit, len(group)))]
+    nproc = max(1, min(nproc, len(tasks)))
+    print(f'[INFO] Phase-averaging {sum(map(len, groups))} snapshot(s) in '
+          f'{nbins} bin(s) with {nproc} process(es) ...')
+    stats = [field_stats.RunningStats() for _ in range(nbins)]
+    if nproc == 1:
+        for k, part in map(_accumulate, tasks):
+            stats[k].merge(part)
+    else:
+        with multiprocessing.Pool(nproc) as pool:
+            for k, part in pool.imap_unordered(_accumulate, tasks):
+                stats[k].merge(part)
+    return stats
+
+
+def phase_average_probe(filepath, t, phase, nbins, time_limits):
+    """Phase-average the frames of a volume probe (one bin at a time).
+
+    Returns
+    -------
+    list of numpy.ndarray
+        Gridlines of the probe.
+    numpy.ndarray
+        Phase-averaged values, of shape (nbins, ny, nx) (NaN for empty
+        bins).
+
+    """
+    coords, times = probes.read_probe_times(filepath)
+    times = times[(times >= time_limits[0]) & (times <= time_limits[1])]
+    bins = get_phase_bins(times, t, phase, nbins)
+    shape = tuple(line.size for line in coords[::-1])
+    means = numpy.full((nbins,) + shape, numpy.nan)
+    for k in range(nbins):
+        if numpy.any(bins == k):
+            _, means[k] = probes.get_time_averaged_values(
+                filepath, time_values=times[bins == k])
+    return coords, means
+
+
+def write_phase_average(filepath, stats, phases, probe_data, attrs):
+    """Write the phase-averaged fields into a HDF5 file."""
+    with h5py.File(filepath, 'w') as outfile:
+        outfile.create_dataset('phases', data=phases)
+        outfile.create_dataset('counts', data=[s.count for s in stats])
+        for name in FIELDS:
+            shape = next(s.mean[name].shape for s in stats if s.count > 0)
+            mean = numpy.full((len(stats),) + shape, numpy.nan)
+            std = numpy.full((len(stats),) + shape, numpy.nan)
+            for k, s in enumerate(stats):
+                if s.count > 0:
+                    mean[k] = s.mean[name]
+                    std[k] = numpy.sqrt(s.variance(name))
+            outfile.create_dataset(f'{name}/mean', data=mean)
+            outfile.create_dataset(f'{name}/std', data=std)
+        for name, (coords, means) in probe_data.items():
+            for dim, line in zip('xyz', coords):
+                outfile.create_dataset(f'probes/{name}/{dim}', data=line)
+            outfile.create_dataset(f'probes/{name}/mean', data=means)
+        for key, value in attrs.items():
+            outfile.attrs[key] = value
+
+
+def parse_command_line():
+    """Parse the command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('simudir', type=pathlib.Path,
+                        help='simulation directory')
+    parser.add_argument('--time-limits', type=float, nargs=2,
+                        default=[50.0, 80.0], metavar=('START', 'END'),
+                        help='time window (default: 50 80)')
+    parser.add_argument('--nbins', type=int, default=8,
+                        help='number of phase bins (default: 8)')
+    parser.add_argument('--method', default='hilbert',
+                        choices=['hilbert', 'zero-crossing'],
+                        help='phase detection method (default: hilbert)')
+    parser.add_argument('--nproc', type=int, default=None,
+                        help='number of worker processes '
+                             '(default: all CPUs)')
+    parser.add_argument('--no-probes', dest='probes', action='store_false',
+                        help='do not phase-average the volume probes')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_command_line()
+    datadir = args.simudir / 'output'
+    t, cl = read_lift_coefficient(args.simudir)
+    t, phase = get_shedding_phase(t, cl, args.time_limits,
+                                  method=args.method)
+    valid = ~numpy.isnan(phase)
+    frequency = ((phase[valid][-1] - phase[valid][0]) /
+                 (2.0 * numpy.pi * (t[valid][-1] - t[valid][0])))
+    print(f'[INFO] Shedding frequency: {frequency:.4f} '
+          f'({(phase[valid][-1] - phase[valid][0]) / (2 * numpy.pi):.1f} '
+          'cycles)')
+
+    with open(args.simudir / 'config.yaml', 'r') as infile:
+        params = yaml.safe_load(infile)['parameters']
+    timesteps = incremental.get_saved_timesteps(
+        datadir, field_stats.get_timesteps(args.simudir, args.time_limits))
+    bins = get_phase_bins(numpy.array(timesteps) * params['dt'],
+                          t, phase, args.nbins)
+    if numpy.all(bins < 0):
+        raise ValueError('No saved snapshot with a defined phase in the time '
+                         f'window {args.time_limits}')
+    stats = phase_average_fields(datadir, timesteps, bins, args.nbins,
+                                 nproc=args.nproc)
+
+    probe_data = {}
+    if args.probes:
+        for filepath in sorted(datadir.glob('probe*.h5')):
+            if filepath.name.endswith('.ts.h5'):
+                continue
+            print(f'[INFO] Phase-averaging probe {filepath.name} ...')
+            probe_data[filepath.stem] = phase_average_probe(
+                filepath, t, phase, args.nbins, args.time_limits)
+
+    phases = 2.0 * numpy.pi * (numpy.arange(args.nbins) + 0.5) / args.nbins
+    attrs = dict(time_limits=args.time_limits, method=args.method,
+                 frequency=frequency)
+    filepath = datadir / 'phase_average.h5'
+    write_phase_average(filepath, stats, phases, probe_data, attrs)
+    print(f'[INFO] Saved {filepath}')
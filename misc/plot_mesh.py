@@ -0,0 +1,138 @@
+"""Fast rendering of the gridlines of large structured Cartesian meshes.
+
+Instead of one Matplotlib line per gridline, all gridlines are drawn as a
+single LineCollection.
+Only the gridlines inside the current view are drawn, and lines closer
+than a pixel are decimated (level of detail); the collection is updated
+whenever the view changes (zoom, pan).
+"""
+
+import numpy
+from matplotlib import collections as mcollections
+from matplotlib import patches
+from matplotlib import pyplot
+
+
+def decimate_gridline(line, vmin, vmax, npixels):
+    """Return the gridline coordinates visible at the pixel resolution.
+
+    Parameters
+    ----------
+    line : numpy.ndarray
+        Coordinates of the gridline (sorted).
+    vmin : float
+        Lower limit of the view.
+    vmax : float
+        Upper limit of the view.
+    npixels : int
+        Number of pixels spanned by the view.
+
+    Returns
+    -------
+    numpy.ndarray
+        Coordinates of the gridlines to draw (at most one per pixel).
+
+    """
+    i0, i1 = numpy.searchsorted(line, [vmin, vmax])
+    visible = line[max(i0 - 1, 0):i1 + 1]
+    if visible.size <= npixels:
+        return visible
+    pixels = numpy.floor((visible - vmin) / (vmax - vmin) * npixels)
+    _, indices = numpy.unique(pixels, return_index=True)
+    return visible[indices]
+
+
+class GridlinesArtist(object):
+    """Level-of-detail gridlines of a 2D mesh attached to an axis."""
+
+    def __init__(self, ax, gridlines, **kwargs):
+        """Add the gridlines to the axis.
+
+        Parameters
+        ----------
+        ax : matplotlib.axes.Axes
+            The axis.
+        gridlines : list of numpy.ndarray
+            Gridlines in the x and y directions.
+        kwargs : dict
+            Keyword arguments passed to the LineCollection.
+
+        """
+        self.ax = ax
+        self.x, self.y = (numpy.asarray(line) for line in gridlines)
+        kwargs.setdefault('color', 'black')
+        kwargs.setdefault('linewidth', 0.2)
+        self.collection = mcollections.LineCollection([], **kwargs)
+        ax.add_collection(self.collection)
+        ax.callbacks.connect('xlim_changed', self.update)
+        ax.callbacks.connect('ylim_changed', self.update)
+
+    def update(self, ax=None):
+        """Update the visible gridlines for the current view."""
+        (x0, x1), (y0, y1) = self.ax.get_xlim(), self.ax.get_ylim()
+        bbox = self.ax.get_window_extent()
+        xs = decimate_gridline(self.x, x0, x1, max(int(bbox.width), 1))
+        ys = decimate_gridline(self.y, y0, y1, max(int(bbox.height), 1))
+        xa, xb = max(x0, self.x[0]), min(x1, self.x[-1])
+        ya, yb = max(y0, self.y[0]), min(y1, self.y[-1])
+        segments = numpy.empty((xs.size + ys.size, 2, 2))
+        segments[:xs.size, :, 0] = xs[:, None]
+        segments[:xs.size, :, 1] = [ya, yb]
+        segments[xs.size:, :, 0] = [xa, xb]
+        segments[xs.size:, :, 1] = ys[:, None]
+        self.collection.set_segments(segments)
+        self.ax.figure.canvas.draw_idle()
+
+
+def plot_gridlines_2d(gridlines, ax=None, body=None, boxes=None,
+                      limits=None, **kwargs):
+    """Plot the gridlines of a 2D mesh with level of detail.
+
+    Parameters
+    ----------
+    gridlines : list of numpy.ndarray
+        Gridlines in the x and y directions.
+    ax : matplotlib.axes.Axes
+        Axis to use; default: None (create a new figure).
+    body : tuple of numpy.ndarray
+        Coordinates of the immersed boundary to overlay; default: None.
+    boxes : list
+        Refinement boxes (with attributes xstart, xend, ystart, yend)
+        to overlay; default: None.
+    limits : tuple of floats
+        Initial view (xmin, xmax, ymin, ymax); default: None (whole domain).
+    kwargs : dict
+        Keyword arguments passed to the LineCollection.
+
+    Returns
+    -------
+    matplotlib.figure.Figure
+        The figure.
+    matplotlib.axes.Axes
+        The axis.
+
+    """
+    if ax is None:
+        fig, ax = pyplot.subplots(figsize=(8.0, 6.0))
+    fig = ax.figure
+    ax.set_xlabel('x')
+    ax.set_ylabel('y')
+    x, y = gridlines
+    artist = GridlinesArtist(ax, gridlines, **kwargs)
+    for i, box in enumerate(boxes or []):
+        ax.add_patch(patches.Rectangle((box.xstart, box.ystart),
+                                       box.xend - box.xstart,
+                                       box.yend - box.ystart,
+                                       fill=False, color=f'C{i}',
+                                       linewidth=1.5, zorder=3))
+    if body is not None:
+        ax.plot(*body, color='C3', linewidth=1.0, zorder=4)
+    ax.set_aspect('equal', adjustable='box')
+    if limits is None:
+        limits = (x[0], x[-1], y[0], y[-1])
+    ax.set_xlim(limits[:2])
+    ax.set_ylim(limits[2:])
+    fig.tight_layout()
+    artist.update()
+    ax.gridlines_artist = artist  # keep a reference to the callbacks
+    return fig, ax
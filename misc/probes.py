@@ -0,0 +1,287 @@
+"""Consolidated time-series store for the output of PetIBM volume probes.
+
+PetIBM writes each volume probe (e.g., `probe1-u.h5`) with one HDF5
+dataset per time value (`<field>/<time>`), next to the gridlines of the
+probe (`mesh/x`, `mesh/y`).
+Here, the probe file is rewritten into a companion file
+(e.g., `probe1-u.ts.h5`) with a single chunked dataset `values` of shape
+(time, ny, nx) and a sorted array `times`, optionally compressed and
+stored in single precision.
+Reading a time window then boils down to one hyperslab read.
+The companion records the size and modification time of the probe file
+it mirrors; it is only used when both still match.
+
+    python misc/probes.py runs/Re2000/both_lips/2k35/output/probe*.h5
+"""
+
+import argparse
+import os
+import pathlib
+
+import h5py
+import numpy
+
+
+CHUNK_SIZE = 2**20  # target size (in bytes) of an HDF5 chunk
+
+
+def get_timeseries_path(filepath):
+    """Return the path of the consolidated companion of a probe file."""
+    filepath = pathlib.Path(filepath)
+    return filepath.with_suffix('.ts.h5')
+
+
+def _stat(filepath):
+    """Return the size and modification time (in ns) of a file."""
+    stat = filepath.stat()
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _get_field_name(infile):
+    """Return the name of the group with the time values of a probe."""
+    names = [key for key in infile.keys() if key != 'mesh']
+    if len(names) != 1:
+        raise ValueError(f'Cannot infer field name of {infile.filename} '
+                         f'(groups: {names})')
+    return names[0]
+
+
+def _get_time_keys(group):
+    """Return the time values and keys of a probe group, sorted by time."""
+    items = []
+    for key in group.keys():
+        try:
+            items.append((float(key), key))
+        except ValueError:  # not a time value
+            continue
+    items.sort()
+    return (numpy.array([time for time, _ in items]),
+            [key for _, key in items])
+
+
+def _read_coords(infile):
+    """Return the gridlines of a probe."""
+    return [infile['mesh'][dim][:] for dim in ('x', 'y', 'z')
+            if dim in infile['mesh']]
+
+
+def consolidate(filepath, name=None, dtype=None, compression=None):
+    """Rewrite a probe file into a single chunked time-series dataset.
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the probe file written by PetIBM.
+    name : str
+        Name of the field (group with the time values); default: None
+        (inferred from the file).
+    dtype : str or numpy.dtype
+        Storage type of the values (e.g., 'float32'); default: None
+        (same as in the probe file).
+    compression : str
+        HDF5 compression filter (e.g., 'gzip' or 'lzf'); default: None.
+
+    Returns
+    -------
+    pathlib.Path
+        Path of the consolidated file.
+
+    """
+    filepath = pathlib.Path(filepath)
+    outpath = get_timeseries_path(filepath)
+    tmppath = outpath.with_name(f'.{outpath.name}.{os.getpid()}')
+    size, mtime_ns = _stat(filepath)
+    with h5py.File(filepath, 'r') as infile:
+        if name is None:
+            name = _get_field_name(infile)
+        group = infile[name]
+        times, keys = _get_time_keys(group)
+        if len(keys) == 0:
+            raise ValueError(f'No time value in {filepath}')
+        shape = group[keys[0]].shape
+        dtype = numpy.dtype(dtype or group[keys[0]].dtype)
+        nchunk = max(1, min(len(keys),
+                            CHUNK_SIZE // (dtype.itemsize *
+                                           int(numpy.prod(shape)))))
+        buffer = numpy.empty((nchunk,) + shape, dtype=dtype)
+        with h5py.File(tmppath, 'w') as outfile:
+            for dim, line in zip('xyz', _read_coords(infile)):
+                outfile.create_dataset(f'mesh/{dim}', data=line)
+            outfile.create_dataset('times', data=times)
+            dset = outfile.create_dataset('values', (len(keys),) + shape,
+                                          dtype=dtype,
+                                          chunks=(nchunk,) + shape,
+                                          compression=compression)
+            # Copy the time values chunk by chunk.
+            for start in range(0, len(keys), nchunk):
+                batch = keys[start:start + nchunk]
+                for i, key in enumerate(batch):
+                    group[key].read_direct(buffer, dest_sel=numpy.s_[i])
+                dset[start:start + len(batch)] = buffer[:len(batch)]
+            outfile.attrs['name'] = name
+            outfile.attrs['source_size'] = size
+            outfile.attrs['source_mtime_ns'] = mtime_ns
+    tmppath.replace(outpath)
+    return outpath
+
+
+def is_timeseries_up_to_date(filepath):
+    """Check if the consolidated companion of a probe file is up to date."""
+    filepath = pathlib.Path(filepath)
+    tspath = get_timeseries_path(filepath)
+    if not tspath.is_file():
+        return False
+    if not filepath.is_file():
+        return True  # only the consolidated file is available
+    size, mtime_ns = _stat(filepath)
+    with h5py.File(tspath, 'r') as f:
+        return (f.attrs.get('source_size') == size and
+                f.attrs.get('source_mtime_ns') == mtime_ns)
+
+
+def read_probe_times(filepath, name=None):
+    """Return the gridlines and time values of a probe (not the values)."""
+    filepath = pathlib.Path(filepath)
+    if is_timeseries_up_to_date(filepath):
+        with h5py.File(get_timeseries_path(filepath), 'r') as f:
+            return _read_coords(f), f['times'][:]
+    with h5py.File(filepath, 'r') as infile:
+        times, _ = _get_time_keys(infile[name or _get_field_name(infile)])
+        return _read_coords(infile), times
+
+
+def _select(times, time_limits=None, time_values=None, tol=1e-6):
+    """Return the slice or indices of the requested time values."""
+    if time_values is not None:
+        time_values = numpy.atleast_1d(time_values)
+        indices = numpy.searchsorted(times, time_values - tol)
+        indices = numpy.minimum(indices, times.size - 1)
+        missing = numpy.abs(times[indices] - time_values) > tol
+        if numpy.any(missing):
+            raise ValueError('Time values not available: '
+                             f'{time_values[missing]}')
+        return indices
+    if time_limits is None:
+        return slice(None)
+    start, end = numpy.searchsorted(times, time_limits[0] - tol), \
+        numpy.searchsorted(times, time_limits[1] + tol, side='right')
+    return slice(start, end)
+
+
+def read_probe(filepath, name=None, time_limits=None, time_values=None,
+               update=True, **kwargs):
+    """Read the time series of a volume probe.
+
+    The consolidated companion is used if it is up to date; otherwise, it
+    is created first (if requested) or the probe file is read directly.
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the probe file written by PetIBM.
+    name : str
+        Name of the field; default: None (inferred from the file).
+    time_limits : tuple of floats
+        Time window (inclusive) to read; default: None (all times).
+    time_values : array_like
+        Time values to read (takes precedence over `time_limits`);
+        default: None.
+    update : bool
+        If True, create the consolidated file when missing or outdated;
+        default: True.
+    kwargs : dict
+        Keyword arguments passed to `consolidate` (dtype, compression).
+
+    Returns
+    -------
+    list of numpy.ndarray
+        Gridlines of the probe.
+    numpy.ndarray
+        Time values, of shape (nt,).
+    numpy.ndarray
+        Values of the field, of shape (nt, ny, nx).
+
+    """
+    filepath = pathlib.Path(filepath)
+    if not is_timeseries_up_to_date(filepath) and update:
+        try:
+            consolidate(filepath, name=name, **kwargs)
+        except OSError:  # read-only location
+            pass
+    if is_timeseries_up_to_date(filepath):
+        with h5py.File(get_timeseries_path(filepath), 'r') as f:
+            times = f['times'][:]
+            mask = _select(times, time_limits, time_values)
+            # h5py requires increasing indices for fancy selections.
+            if isinstance(mask, numpy.ndarray):
+                indices, inverse = numpy.unique(mask, return_inverse=True)
+                values = f['values'][indices.tolist()][inverse]
+            else:
+                values = f['values'][mask]
+            return _read_coords(f), times[mask], values
+    with h5py.File(filepath, 'r') as infile:
+        group = infile[name or _get_field_name(infile)]
+        times, keys = _get_time_keys(group)
+        mask = _select(times, time_limits, time_values)
+        keys = numpy.array(keys, dtype=object)[mask]
+        values = numpy.array([group[key][:] for key in keys])
+        return _read_coords(infile), times[mask], values
+
+
+def get_time_averaged_values(filepath, name=None, time_limits=None,
+                             time_values=None, **kwargs):
+    """Return the time-averaged values of a volume probe.
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the probe file written by PetIBM.
+    name : str
+        Name of the field; default: None (inferred from the file).
+    time_limits : tuple of floats
+        Time window (inclusive) to average over; default: None.
+    time_values : array_like
+        Time values to average over; default: None.
+    kwargs : dict
+        Keyword arguments passed to `read_probe`.
+
+    Returns
+    -------
+    list of numpy.ndarray
+        Gridlines of the probe.
+    numpy.ndarray
+        Time-averaged values of the field (double precision).
+
+    """
+    coords, times, values = read_probe(filepath, name=name,
+                                       time_limits=time_limits,
+                                       time_values=time_values, **kwargs)
+    if times.size == 0:
+        raise ValueError(f'No time value to average in {filepath}')
+    return coords, numpy.mean(values, axis=0, dtype=numpy.float64)
+
+
+def parse_command_line():
+    """Parse the command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('filepaths', type=pathlib.Path, nargs='+',
+                        help='probe files written by PetIBM')
+    parser.add_argument('--float32', dest='dtype', action='store_const',
+                        const='float32', default=None,
+                        help='store the values in single precision')
+    parser.add_argument('--compression', default=None,
+                        choices=['gzip', 'lzf'],
+                        help='HDF5 compression filter')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_command_line()
+    for filepath in args.filepaths:
+        if filepath.name.endswith('.ts.h5'):
+            continue  # already consolidated
+        outpath = consolidate(filepath, dtype=args.dtype,
+                              compression=args.compression)
+        print(f'[INFO] {filepath} -> {outpath.name} '
+              f'({_stat(filepath)[0] / 2**20:.1f} MiB -> '
+              f'{_stat(outpath)[0] / 2**20:.1f} MiB)')
@@ -0,0 +1,174 @@
+"""Compute the spectra and Strouhal numbers of the force coefficients.
+
+The histories of the drag and lift coefficients of all simulations of a
+cube (see `force_cube.py`) are resampled on a uniform (coarser) time grid
+and stacked into a single array, so that the power spectral densities
+(Welch's method, zero-padded segments) of all signals are computed with
+one call to `scipy.signal.welch`.
+The dominant frequency of each signal is the peak of its spectrum (mean
+excluded), refined with a parabola through the logarithm of the three
+values around the peak; the Strouhal number is St = f c / U (chord c and
+freestream speed U are 1 in the non-dimensional simulations).
+
+    python misc/spectra.py runs/Re2000/data/force_coefficients.h5
+"""
+
+import argparse
+import pathlib
+
+import numpy
+from scipy import interpolate, signal
+
+import force_cube
+
+
+def resample(t, values, dt=None):
+    """Resample signals on a uniform time grid.
+
+    Parameters
+    ----------
+    t : numpy.ndarray
+        Time values, of shape (nt,).
+    values : numpy.ndarray
+        Signals, of shape (..., nt).
+    dt : float
+        Time-step size of the grid; default: None (median time interval).
+
+    Returns
+    -------
+    numpy.ndarray
+        Uniform time values.
+    numpy.ndarray
+        Resampled signals (all at once).
+
+    """
+    if dt is None:
+        dt = float(numpy.median(numpy.diff(t)))
+    num = int(numpy.floor((t[-1] - t[0]) / dt + 1e-6)) + 1
+    tu = t[0] + dt * numpy.arange(num)
+    if tu.size == t.size and numpy.allclose(tu, t, rtol=0.0, atol=1e-9):
+        return t, values
+    # Extrapolation only covers the round-off of the last time value.
+    return tu, interpolate.interp1d(t, values, axis=-1, assume_sorted=True,
+                                    fill_value='extrapolate')(tu)
+
+
+def get_dominant_frequencies(f, psd):
+    """Return the frequency of the peak of each spectrum (f > 0).
+
+    Parameters
+    ----------
+    f : numpy.ndarray
+        Frequencies, of shape (nf,).
+    psd : numpy.ndarray
+        Power spectral densities, of shape (..., nf).
+
+    Returns
+    -------
+    numpy.ndarray
+        Dominant frequencies, of shape (...); NaN for invalid spectra.
+
+    """
+    shape = psd.shape[:-1]
+    psd = psd.reshape(-1, f.size)
+    valid = numpy.all(numpy.isfinite(psd), axis=-1) & (psd.max(axis=-1) > 0)
+    k = 1 + numpy.argmax(numpy.where(valid[:, None], psd, 0.0)[:, 1:],
+                         axis=-1)
+    k = numpy.clip(k, 1, f.size - 2)
+    rows = numpy.arange(psd.shape[0])
+    tiny = numpy.finfo(psd.dtype).tiny
+    ym, y0, yp = (numpy.log(numpy.maximum(psd[rows, k + i], tiny))
+                  for i in (-1, 0, 1))
+    denom = ym - 2.0 * y0 + yp
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        shift = numpy.where(denom < 0.0, 0.5 * (ym - yp) / denom, 0.0)
+    freqs = f[k] + numpy.clip(shift, -0.5, 0.5) * (f[1] - f[0])
+    return numpy.where(valid, freqs, numpy.nan).reshape(shape)
+
+
+def compute_spectra(t, histories, dt=0.01, segment=None, padding=8):
+    """Compute the spectra of signals with a single call to Welch's method.
+
+    Parameters
+    ----------
+    t : numpy.ndarray
+        Time values, of shape (nt,).
+    histories : numpy.ndarray
+        Signals, of shape (..., nt); signals with NaN values are ignored.
+    dt : float
+        Time-step size of the resampled signals (Nyquist frequency well
+        above the shedding frequencies); default: 0.01.
+    segment : float
+        Duration of the Welch segments (50% overlap); default: None (half
+        of the time window).
+    padding : int
+        Zero-padding factor of the segments; default: 8.
+
+    Returns
+    -------
+    numpy.ndarray
+        Frequencies, of shape (nf,).
+    numpy.ndarray
+        Power spectral densities, of shape (..., nf).
+    numpy.ndarray
+        Dominant frequencies, of shape (...).
+
+    """
+    invalid = ~numpy.all(numpy.isfinite(histories), axis=-1)
+    tu, values = resample(t, histories, dt=dt)
+    fs = 1.0 / (tu[1] - tu[0])
+    values = numpy.where(invalid[..., None], 0.0, values)
+    nperseg = tu.size // 2 if segment is None else int(round(segment * fs))
+    nperseg = max(2, min(nperseg, tu.size))
+    nfft = 2**int(numpy.ceil(numpy.log2(padding * nperseg)))
+    f, psd = signal.welch(values, fs=fs, nperseg=nperseg, nfft=nfft,
+                          detrend='constant', axis=-1)
+    psd[invalid] = numpy.nan
+    return f, psd, get_dominant_frequencies(f, psd)
+
+
+def add_spectra(cube, chord=1.0, velocity=1.0, **kwargs):
+    """Add the spectra and Strouhal numbers of Cd and Cl to a cube.
+
+    The histories of the cube are required (`history=True`); the keyword
+    arguments are passed to `compute_spectra`.
+    """
+    if cube.t is None:
+        raise ValueError('The cube has no force history')
+    names = ('cd', 'cl')
+    histories = numpy.stack([cube.data[f'{name}/history'] for name in names])
+    f, psd, freqs = compute_spectra(cube.t, histories, **kwargs)
+    cube.f = f
+    for i, name in enumerate(names):
+        cube.data[f'{name}/psd'] = psd[i]
+        cube.data[f'{name}/St'] = freqs[i] * chord / velocity
+    return cube
+
+
+def parse_command_line():
+    """Parse the command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('filepath', type=pathlib.Path,
+                        help='HDF5 file of the cube (with histories)')
+    parser.add_argument('--segment', type=float, default=None,
+                        help='duration of the Welch segments '
+                             '(default: half of the time window)')
+    parser.add_argument('--padding', type=int, default=8,
+                        help='zero-padding factor (default: 8)')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_command_line()
+    cube = force_cube.read_cube(args.filepath)
+    add_spectra(cube, segment=args.segment, padding=args.padding)
+    for Re in cube.Re:
+        for section in cube.sections:
+            print(f'[Re={Re} - {section}]')
+            print('AoA\tSt (Cd)\tSt (Cl)')
+            for aoa, st_cd, st_cl in zip(cube.angles,
+                                         cube.get('cd/St', Re, section),
+                                         cube.get('cl/St', Re, section)):
+                print(f'{aoa:g}\t{st_cd:.4f}\t{st_cl:.4f}')
+    force_cube.write_cube(args.filepath, cube)
+    print(f'[INFO] Saved {args.filepath}')
@@ -0,0 +1,259 @@
+"""Detect the initial transient and the averaging window of force histories.
+
+The histories of the force coefficients are reduced to batch means.
+Batches span whole shedding cycles, so that the oscillation does not leak
+into the batch means: they are delimited by the upward crossings of the
+lift fluctuation (about its mean over the second half of the history)
+through a band of half-width a fraction of its standard deviation
+(hysteresis: a crossing only counts once the lift went below the band, so
+that noise around the mean does not add spurious cycles);
+without vortex shedding (not enough crossings), batches of fixed duration
+are used instead.
+The end of the initial transient is found with MSER (marginal standard
+error rule, White 1997) applied to the batch means: the truncation point
+minimizes the squared standard error of the mean of the remaining
+batches; it is computed for all truncation points at once with cumulative
+sums.
+After the transient, the shortest window whose batch-means standard error
+of the mean reaches a target (for all coefficients) tells when a
+simulation could have been stopped.
+
+    python misc/transient.py runs/Re2000/*/2k35 --target 0.005
+"""
+
+import argparse
+import pathlib
+
+import numpy
+import yaml
+
+import petibmpy
+
+import forces
+
+
+def get_time_bounds(t, batch):
+    """Return the indices delimiting batches of fixed duration.
+
+    Parameters
+    ----------
+    t : numpy.ndarray
+        Time values.
+    batch : float
+        Duration of a batch (the last, incomplete batch is dropped).
+
+    Returns
+    -------
+    numpy.ndarray
+        Index of the first sample of each batch, followed by the index
+        past the last sample of the last batch.
+
+    """
+    nb = int(numpy.floor((t[-1] - t[0]) / batch + 1e-9))
+    return numpy.searchsorted(t, t[0] + batch * numpy.arange(nb + 1) - 1e-9)
+
+
+def get_cycle_bounds(t, lift, cycles=2, band=0.5):
+    """Return the indices delimiting batches of whole shedding cycles.
+
+    Parameters
+    ----------
+    t : numpy.ndarray
+        Time values.
+    lift : numpy.ndarray
+        Lift coefficient.
+    cycles : int
+        Number of shedding cycles per batch; default: 2.
+    band : float
+        Half-width of the hysteresis band, relative to the standard
+        deviation of the lift over the second half of the history;
+        default: 0.5.
+
+    Returns
+    -------
+    numpy.ndarray
+        Index of the first sample of each batch (first sample above the
+        band after a sample below it), followed by the index past the last
+        batch.
+
+    """
+    second = t >= 0.5 * (t[0] + t[-1])
+    fluct = lift - numpy.mean(lift[second])
+    h = band * numpy.std(fluct[second])
+    # Samples outside the band, and rises from below to above it.
+    idx = numpy.flatnonzero((fluct < -h) | (fluct > h))
+    high = fluct[idx] > h
+    rises = idx[1:][high[1:] & ~high[:-1]]
+    return rises[::cycles]
+
+
+def get_batch_means(values, bounds):
+    """Return the means of a signal over the batches.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        Values of the signal, of shape (..., nt).
+    bounds : numpy.ndarray
+        Indices delimiting the batches (see `get_time_bounds`).
+
+    Returns
+    -------
+    numpy.ndarray
+        Mean of each batch, of shape (..., nbatches).
+
+    """
+    return (numpy.add.reduceat(values[..., :bounds[-1]], bounds[:-1],
+                               axis=-1) / numpy.diff(bounds))
+
+
+def mser(means):
+    """Return the MSER truncation point of a series of batch means.
+
+    Parameters
+    ----------
+    means : numpy.ndarray
+        Batch means.
+
+    Returns
+    -------
+    int
+        Number of batches to discard (at most half of them).
+    numpy.ndarray
+        MSER statistic for each truncation point.
+
+    """
+    n = means.size
+    # Sums over the batches d, ..., n-1 for all truncation points d.
+    s1 = numpy.cumsum(means[::-1])[::-1]
+    s2 = numpy.cumsum(means[::-1]**2)[::-1]
+    m = numpy.arange(n, 0, -1)
+    stat = numpy.maximum(s2 - s1**2 / m, 0.0) / m**2
+    stat = stat[:n // 2 + 1]
+    return int(numpy.argmin(stat)), stat
+
+
+def get_standard_errors(means):
+    """Return the standard error of the mean of the first k batch means.
+
+    Returns
+    -------
+    numpy.ndarray
+        Standard error for k = 1, ..., n (NaN for k = 1).
+
+    """
+    k = numpy.arange(1, means.size + 1)
+    s1, s2 = numpy.cumsum(means), numpy.cumsum(means**2)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        var = numpy.maximum(s2 - s1**2 / k, 0.0) / (k - 1)
+        return numpy.sqrt(var / k)
+
+
+def detect_window(t, signals, lift=None, cycles=2, batch=5.0,
+                  target=0.005, min_batches=5):
+    """Detect the end of the transient and the shortest averaging window.
+
+    Parameters
+    ----------
+    t : numpy.ndarray
+        Time values.
+    signals : list of numpy.ndarray
+        Signals (e.g., drag and lift coefficients).
+    lift : numpy.ndarray
+        Lift coefficient, to batch the signals on shedding cycles;
+        default: None (batches of fixed duration).
+    cycles : int
+        Number of shedding cycles per batch; default: 2.
+    batch : float
+        Duration of a batch without shedding; default: 5.0.
+    target : float
+        Target standard error of the mean of all signals; default: 0.005.
+    min_batches : int
+        Minimum number of batches of a window; default: 5.
+
+    Returns
+    -------
+    dict
+        start: end of the transient (latest among the signals);
+        end: end of the shortest window reaching the target (None if the
+        target is not reached);
+        errors: standard errors of the signals over the whole stationary
+        part of the history;
+        batching: 'cycles' or 'time'.
+
+    """
+    batching = 'time'
+    if lift is not None:
+        bounds = get_cycle_bounds(t, numpy.asarray(lift), cycles=cycles)
+        if bounds.size > 2 * min_batches:
+            batching = 'cycles'
+    if batching == 'time':
+        bounds = get_time_bounds(t, batch)
+    if bounds.size <= 2 * min_batches:
+        raise ValueError(f'History too short for {2 * min_batches} batches')
+    means = [get_batch_means(numpy.asarray(values), bounds)
+             for values in signals]
+    d = max(mser(mb)[0] for mb in means)
+    errors = numpy.array([get_standard_errors(mb[d:]) for mb in means])
+    reached = numpy.all(errors <= target, axis=0)
+    reached[:min_batches - 1] = False
+    end = None
+    if numpy.any(reached):
+        end = float(t[bounds[d + numpy.argmax(reached) + 1] - 1])
+    return dict(start=float(t[bounds[d]]), end=end,
+                errors=[float(e[-1]) for e in errors], batching=batching)
+
+
+def parse_command_line():
+    """Parse the command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('simudirs', type=pathlib.Path, nargs='+',
+                        help='simulation directories')
+    parser.add_argument('--cycles', type=int, default=2,
+                        help='shedding cycles per batch (default: 2)')
+    parser.add_argument('--batch', type=float, default=5.0,
+                        help='duration of a batch without shedding '
+                             '(default: 5.0)')
+    parser.add_argument('--target', type=float, default=0.005,
+                        help='target standard error of the mean '
+                             'of Cd and Cl (default: 0.005)')
+    parser.add_argument('--min-batches', type=int, default=5,
+                        help='minimum number of batches of a window '
+                             '(default: 5)')
+    parser.add_argument('--output', type=pathlib.Path, default=None,
+                        help='YAML file to save the windows')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_command_line()
+    results, savings = {}, []
+    print('Case\tTransient\tWindow end\tSE(C_D)\tSE(C_L)\tSaved')
+    for simudir in args.simudirs:
+        t, fx, fy = forces.read_forces(simudir / 'output' / 'forces-0.txt')
+        cd, cl = petibmpy.get_force_coefficients(fx, fy, coeff=2.0)
+        window = detect_window(t, (cd, cl), lift=cl, cycles=args.cycles,
+                               batch=args.batch,
+                               target=args.target,
+                               min_batches=args.min_batches)
+        saved = None
+        if window['end'] is not None:
+            saved = float(t[-1] - window['end'])
+            savings.append(saved)
+        window.update(final_time=float(t[-1]), saved=saved)
+        results[str(simudir)] = window
+        end = '-' if window['end'] is None else f'{window["end"]:.1f}'
+        print(f'{simudir}\t{window["start"]:.1f}\t{end}\t'
+              f'{window["errors"][0]:.4f}\t{window["errors"][1]:.4f}\t'
+              f'{"-" if saved is None else f"{saved:.1f}"}')
+    unconverged = len(results) - len(savings)
+    if savings:
+        print(f'[INFO] Time units that could be saved: min {min(savings):.1f},'
+              f' total {sum(savings):.1f} ({len(savings)} simulation(s))')
+    if unconverged:
+        print(f'[WARNING] {unconverged} simulation(s) did not reach the '
+              f'target standard error {args.target}')
+    if args.output is not None:
+        with open(args.output, 'w') as outfile:
+            yaml.safe_dump(results, outfile, default_flow_style=False)
+        print(f'[INFO] Saved {args.output}')
@@ -0,0 +1,230 @@
+"""Compute confidence intervals of the statistics of force coefficients.
+
+Successive values of a force history are strongly correlated, so the
+standard error of a time average is not the standard deviation over the
+square root of the number of time steps.
+Two estimates of the standard error of the mean are computed:
+
+* batch means: the window is cut into batches of whole shedding cycles
+  (`transient.get_cycle_bounds`, or batches of fixed duration without
+  shedding), so that the oscillation does not leak into the batch means,
+  which are nearly independent;
+* integrated autocorrelation time: the autocorrelation function (FFT) is
+  summed up to the smallest lag M with M >= c tau (Sokal's window, c = 5)
+  and the variance is inflated by tau.
+  The autocorrelation of a deterministic oscillation does not decay, so
+  that tau depends on where the sum stops: with vortex shedding, this
+  estimate is unreliable (often too large) and the batch means should be
+  preferred.
+
+Confidence intervals of the mean and RMS (root mean square) values are
+obtained by bootstrapping the batches (resampled with replacement; the
+statistics are computed from the batch sums of x and x^2).
+
+    python misc/uncertainty.py runs/independence/2k35/base --time-limits 50 80
+"""
+
+import argparse
+import pathlib
+
+import numpy
+from scipy import stats
+
+import petibmpy
+
+import forces
+import transient
+
+
+def get_batches(t, lift=None, cycles=1, batch=5.0, min_batches=5):
+    """Return the indices delimiting the batches of a history.
+
+    Parameters
+    ----------
+    t : numpy.ndarray
+        Time values.
+    lift : numpy.ndarray
+        Lift coefficient, to batch on shedding cycles; default: None
+        (batches of fixed duration).
+    cycles : int
+        Number of shedding cycles per batch; default: 1.
+    batch : float
+        Duration of a batch without shedding; default: 5.0.
+    min_batches : int
+        Minimum number of batches of whole cycles (batches of fixed
+        duration are used otherwise); default: 5.
+
+    Returns
+    -------
+    numpy.ndarray
+        Indices delimiting the batches (see `transient.get_time_bounds`).
+    str
+        Batching: 'cycles' or 'time'.
+
+    """
+    if lift is not None:
+        bounds = transient.get_cycle_bounds(t, lift, cycles=cycles)
+        if bounds.size > min_batches:
+            return bounds, 'cycles'
+    return transient.get_time_bounds(t, batch), 'time'
+
+
+def get_integrated_times(values, c=5.0):
+    """Return the integrated autocorrelation times of signals.
+
+    Parameters
+    ----------
+    values : numpy.ndarray
+        Signals, of shape (..., nt).
+    c : float
+        Constant of Sokal's automatic window; default: 5.0.
+
+    Returns
+    -------
+    numpy.ndarray
+        Integrated autocorrelation times (in number of samples), of
+        shape (...); 1 for uncorrelated signals.
+
+    """
+    nt = values.shape[-1]
+    fluct = values - values.mean(axis=-1, keepdims=True)
+    spectrum = numpy.fft.rfft(fluct, n=2 * nt, axis=-1)
+    acf = numpy.fft.irfft(numpy.abs(spectrum)**2, axis=-1)[..., :nt]
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        rho = acf / acf[..., :1]
+    rho = numpy.nan_to_num(rho)  # constant signals
+    taus = 2.0 * numpy.cumsum(rho, axis=-1) - 1.0  # window M = 0, ..., nt-1
+    # First lag M with M >= c tau(M) (last lag if never).
+    window = numpy.arange(nt) >= c * taus
+    window[..., -1] = True
+    M = numpy.argmax(window, axis=-1)
+    tau = numpy.take_along_axis(taus, M[..., None], axis=-1)[..., 0]
+    return numpy.maximum(tau, 1.0)
+
+
+def compute_intervals(t, values, lift=None, cycles=1, batch=5.0,
+                      confidence=0.95, nboot=2000, seed=None):
+    """Compute the statistics of signals with their uncertainties.
+
+    Parameters
+    ----------
+    t : numpy.ndarray
+        Time values, of shape (nt,).
+    values : numpy.ndarray
+        Signals, of shape (..., nt).
+    lift : numpy.ndarray
+        Lift coefficient, to batch on shedding cycles; default: None
+        (batches of fixed duration).
+    cycles : int
+        Number of shedding cycles per batch; default: 1.
+    batch : float
+        Duration of a batch without shedding; default: 5.0.
+    confidence : float
+        Confidence level of the intervals; default: 0.95.
+    nboot : int
+        Number of bootstrap samples; default: 2000.
+    seed : int
+        Seed of the random number generator; default: None.
+
+    All statistics are computed over the whole batches: with batches of
+    shedding cycles, the partial cycles at both ends of the window are
+    dropped, so the point estimates may differ slightly from those over
+    the whole window.
+
+    Returns
+    -------
+    dict
+        mean, rms: time-averaged and RMS values, of shape (...);
+        se_batch, se_iat: standard errors of the mean (batch means and
+        integrated autocorrelation time), of shape (...);
+        tau: integrated autocorrelation times (in samples), of shape (...);
+        mean_ci, rms_ci: bootstrap intervals, of shape (..., 2);
+        mean_hw: half-width of the interval of the mean (Student's t with
+        the batch-means standard error), of shape (...);
+        nbatches: number of batches; batching: 'cycles' or 'time';
+        time_limits: time values of the first and last samples used.
+
+    """
+    bounds, batching = get_batches(t, lift=lift, cycles=cycles, batch=batch)
+    nbatches = bounds.size - 1
+    if nbatches < 2:
+        raise ValueError('History too short for 2 batches')
+    # Keep the samples of the whole batches only.
+    values = numpy.asarray(values)[..., bounds[0]:bounds[-1]]
+    time_limits = (float(t[bounds[0]]), float(t[bounds[-1] - 1]))
+    bounds = bounds - bounds[0]
+    nt = values.shape[-1]
+    mean = values.mean(axis=-1)
+    rms = numpy.sqrt((values**2).mean(axis=-1))
+    means = transient.get_batch_means(values, bounds)
+    se_batch = means.std(axis=-1, ddof=1) / numpy.sqrt(nbatches)
+    tau = get_integrated_times(values)
+    se_iat = values.std(axis=-1) * numpy.sqrt(tau / nt)
+    # Bootstrap the batches (same resampling for all signals); batches of
+    # whole cycles differ in size, hence the sums and counts.
+    counts = numpy.diff(bounds)
+    sums = numpy.stack([means * counts,
+                        transient.get_batch_means(values**2, bounds) * counts])
+    rng = numpy.random.RandomState(seed)
+    indices = rng.randint(nbatches, size=(nboot, nbatches))
+    samples = sums[..., indices].sum(axis=-1) / counts[indices].sum(axis=-1)
+    q = 100.0 * numpy.array([0.5 - confidence / 2, 0.5 + confidence / 2])
+    mean_ci = numpy.moveaxis(numpy.percentile(samples[0], q, axis=-1), 0, -1)
+    rms_ci = numpy.moveaxis(numpy.percentile(numpy.sqrt(samples[1]), q,
+                                             axis=-1), 0, -1)
+    mean_hw = stats.t.ppf(0.5 + confidence / 2, nbatches - 1) * se_batch
+    return dict(mean=mean, rms=rms, se_batch=se_batch, se_iat=se_iat,
+                tau=tau, mean_ci=mean_ci, rms_ci=rms_ci, mean_hw=mean_hw,
+                nbatches=nbatches, batching=batching,
+                time_limits=time_limits)
+
+
+def read_coefficients(simudir):
+    """Return the time values and the drag and lift coefficients."""
+    t, fx, fy = forces.read_forces(simudir / 'output' / 'forces-0.txt')
+    cd, cl = petibmpy.get_force_coefficients(fx, fy, coeff=2.0)
+    return t, numpy.stack([cd, cl])
+
+
+def parse_command_line():
+    """Parse the command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('simudirs', type=pathlib.Path, nargs='+',
+                        help='simulation directories')
+    parser.add_argument('--time-limits', type=float, nargs=2,
+                        default=[50.0, 80.0], metavar=('START', 'END'),
+                        help='time window (default: 50 80)')
+    parser.add_argument('--cycles', type=int, default=1,
+                        help='shedding cycles per batch (default: 1)')
+    parser.add_argument('--batch', type=float, default=5.0,
+                        help='duration of a batch without shedding '
+                             '(default: 5.0)')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                        help='confidence level (default: 0.95)')
+    parser.add_argument('--nboot', type=int, default=2000,
+                        help='number of bootstrap samples (default: 2000)')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_command_line()
+    print(f'Time limits: {args.time_limits}; '
+          f'{100 * args.confidence:g}% confidence intervals')
+    for simudir in args.simudirs:
+        t, values = read_coefficients(simudir)
+        mask = (t >= args.time_limits[0]) & (t <= args.time_limits[1])
+        t, values = t[mask], values[:, mask]
+        res = compute_intervals(t, values, lift=values[1],
+                                cycles=args.cycles, batch=args.batch,
+                                confidence=args.confidence, nboot=args.nboot)
+        print(f'[{simudir}] {res["nbatches"]} batches ({res["batching"]}) '
+              f'from t={res["time_limits"][0]:g} to '
+              f't={res["time_limits"][1]:g}')
+        for j, name in enumerate(('C_D', 'C_L')):
+            mean_ci, rms_ci = res['mean_ci'][j], res['rms_ci'][j]
+            print(f'<{name}>={res["mean"][j]:.4f} '
+                  f'(SE {res["se_batch"][j]:.4f} batch, '
+                  f'{res["se_iat"][j]:.4f} IAT; '
+                  f'[{mean_ci[0]:.4f}, {mean_ci[1]:.4f}]), '
+                  f'rms({name})={res["rms"][j]:.4f} '
+                  f'([{rms_ci[0]:.4f}, {rms_ci[1]:.4f}])')
@@ -0,0 +1,283 @@
+"""Compute the vorticity field at saved time steps with a process pool.
+
+The staggered grids of the velocity components are read once and sent to
+each worker when the pool starts (not with every time step); the workers
+read the velocity field of a time step, compute the vorticity, and write
+it to disk.
+The grid of the vorticity field is written once by the main process.
+
+The computation can be restricted to a region of interest (box): only the
+hyperslabs of the velocity components needed to compute the vorticity at
+the grid nodes inside the box (halo included) are read from the HDF5
+files, and only the vorticity inside the box is stored.
+
+The vorticity fields are written either in one file per time step or,
+with `archive=True`, as frames of a single compressed archive `wz.h5`
+(optionally in single precision); see `archive.py`.
+
+Time steps whose vorticity file is up to date with the solution file (and
+with the box) are skipped, so that the post-processing can be run again
+while a simulation is still producing output.
+"""
+
+import multiprocessing
+import os
+import time
+
+import h5py
+import numpy
+
+import petibmpy
+
+import archive as wz_archive
+import incremental
+
+
+def read_grid_hdf5(filepath, name, slices=None):
+    """Read the gridlines of a field from a HDF5 file (optionally windowed).
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the HDF5 grid file (e.g., `grid.h5`).
+    name : str
+        Name of the field (e.g., 'u').
+    slices : tuple of slice
+        Slices of the field in each direction, in (y, x) order (as for the
+        values of the field); default: None (whole gridlines).
+
+    Returns
+    -------
+    list of numpy.ndarray
+        The gridlines (x first).
+
+    """
+    with h5py.File(filepath, 'r') as infile:
+        dims = [dim for dim in ('x', 'y', 'z') if dim in infile[name]]
+        if slices is None:
+            return [infile[name][dim][:] for dim in dims]
+        return [infile[name][dim][s] for dim, s in zip(dims, slices[::-1])]
+
+
+def read_field_hdf5(filepath, name, slices=None):
+    """Read the values of a field from a HDF5 file (optionally windowed).
+
+    Parameters
+    ----------
+    filepath : pathlib.Path
+        Path of the HDF5 file written by PetIBM.
+    name : str
+        Name of the field (e.g., 'u').
+    slices : tuple of slice
+        Hyperslab to read, in (y, x) order; default: None (whole field).
+
+    Returns
+    -------
+    numpy.ndarray
+        Values of the field.
+
+    """
+    with h5py.File(filepath, 'r') as infile:
+        if slices is None:
+            return infile[name][:]
+        return infile[name][tuple(slices)]
+
+
+def _node_range(line, start, end):
+    """Return the indices of the first and last nodes covering a range."""
+    first = numpy.searchsorted(line, start, side='right') - 1
+    last = numpy.searchsorted(line, end, side='left')
+    return max(int(first), 0), min(int(last), line.size - 1)
+
+
+def get_window_slices(grid_u, grid_v, box):
+    """Return the hyperslabs of u and v needed to get the vorticity in a box.
+
+    The vorticity is located at the nodes (x of u, y of v); its stencil
+    involves the u-values just below and above each node, and the v-values
+    just left and right of it.
+    The windows of u and v therefore form a staggered sub-domain, so that
+    the vorticity can be computed as on the whole domain.
+
+    Parameters
+    ----------
+    grid_u : list of numpy.ndarray
+        Gridlines of the x-velocity.
+    grid_v : list of numpy.ndarray
+        Gridlines of the y-velocity.
+    box : tuple of floats
+        Region of interest (xmin, xmax, ymin, ymax).
+
+    Returns
+    -------
+    tuple of slice
+        Hyperslab of u, in (y, x) order.
+    tuple of slice
+        Hyperslab of v, in (y, x) order.
+
+    """
+    i0, i1 = _node_range(grid_u[0], box[0], box[1])
+    j0, j1 = _node_range(grid_v[1], box[2], box[3])
+    slices_u = (slice(j0, j1 + 2), slice(i0, i1 + 1))
+    slices_v = (slice(j0, j1 + 1), slice(i0, i1 + 2))
+    return slices_u, slices_v
+
+
+_grids = {}  # staggered grids of the velocity components (in workers)
+
+
+def _init_worker(grid_u, grid_v, datadir, outdir, slices=(None, None),
+                 archive=False):
+    """Store the grids and directories in the global scope of a worker."""
+    _grids.update(u=grid_u, v=grid_v, datadir=datadir, outdir=outdir,
+                  slices_u=slices[0], slices_v=slices[1], archive=archive)
+
+
+def _compute_timestep(timestep):
+    """Compute the vorticity field at a given time step.
+
+    The field is written by the worker (one file per time step), or
+    returned to be written in the archive by the main process.
+    """
+    filepath = _grids['datadir'] / f'{timestep:0>7}.h5'
+    u = read_field_hdf5(filepath, 'u', slices=_grids['slices_u'])
+    v = read_field_hdf5(filepath, 'v', slices=_grids['slices_v'])
+    wz, grid_wz = petibmpy.compute_wz(u, v, _grids['u'], _grids['v'])
+    if _grids['archive']:
+        return timestep, grid_wz, wz
+    filepath = _grids['outdir'] / f'{timestep:0>7}.h5'
+    petibmpy.write_field_hdf5(filepath, 'wz', wz)
+    return timestep, grid_wz, None
+
+
+def _write_grid(filepath, grid):
+    """Write the grid of the vorticity (unless unchanged, to keep mtime)."""
+    if filepath.is_file():
+        current = read_grid_hdf5(filepath, 'wz')
+        if (len(current) == len(grid) and
+                all(numpy.array_equal(a, b) for a, b in zip(current, grid))):
+            return
+    petibmpy.write_grid_hdf5(filepath, 'wz', *grid)
+
+
+def compute_vorticity(datadir, outdir, timesteps, nproc=None, box=None,
+                      force=False, content=False, archive=False,
+                      dtype='float64'):
+    """Compute and write the vorticity field at the given time steps.
+
+    Parameters
+    ----------
+    datadir : pathlib.Path
+        Directory with the grid and the solution written by PetIBM.
+    outdir : pathlib.Path
+        Directory where to write the vorticity fields (and their grid).
+    timesteps : list of int
+        Time steps to process.
+    nproc : int
+        Number of worker processes; default: None (number of CPUs,
+        at most one per time step).
+    box : tuple of floats
+        Region of interest (xmin, xmax, ymin, ymax); default: None
+        (whole domain).
+    force : bool
+        If True, process all time steps, even those up to date;
+        default: False.
+    content : bool
+        If True, compare the solution files with their content (SHA-256)
+        instead of their size and modification time; default: False.
+    archive : bool
+        If True, write the fields in a single archive (`outdir/wz.h5`)
+        instead of one file per time step; default: False.
+    dtype : str
+        Storage type of the values in the archive; default: 'float64'.
+
+    Returns
+    -------
+    float
+        Throughput (number of snapshots processed per second).
+
+    """
+    timesteps = incremental.get_saved_timesteps(
+        datadir, [int(timestep) for timestep in timesteps])
+    outdir.mkdir(parents=True, exist_ok=True)
+    # Skip the time steps already processed with the same inputs.
+    manifest = incremental.Manifest(outdir / 'manifest.yaml', content=content)
+    params = dict()
+    if box is not None:
+        params['box'] = [float(v) for v in box]
+    archive_path = wz_archive.get_archive_path(outdir, 'wz')
+    if archive:
+        params['dtype'] = str(numpy.dtype(dtype))
+    frames = wz_archive.get_frames(archive_path) if archive else {}
+
+    def get_paths(timestep):
+        """Return the output and input files of a time step."""
+        name = f'{timestep:0>7}.h5'
+        output = archive_path if archive else outdir / name
+        return output, [datadir / 'grid.h5', datadir / name]
+
+    def get_key(timestep):
+        """Return the key of a time step in the manifest."""
+        return f'{timestep:0>7}' if archive else None
+
+    if not force:
+        num = len(timesteps)
+        timesteps = [timestep for timestep in timesteps
+                     if not ((timestep in frames or not archive) and
+                             manifest.is_up_to_date(*get_paths(timestep),
+                                                    params=params,
+                                                    key=get_key(timestep)))]
+        print(f'[INFO] Skipping {num - len(timesteps)} time step(s) '
+              'already processed')
+    if len(timesteps) == 0:
+        return 0.0
+    filepath = datadir / 'grid.h5'
+    grid_u = read_grid_hdf5(filepath, 'u')
+    grid_v = read_grid_hdf5(filepath, 'v')
+    slices = (None, None)
+    if box is not None:
+        slices = get_window_slices(grid_u, grid_v, box)
+        grid_u = read_grid_hdf5(filepath, 'u', slices=slices[0])
+        grid_v = read_grid_hdf5(filepath, 'v', slices=slices[1])
+        print(f'[INFO] Region of interest {tuple(box)}: '
+              f'{grid_u[0].size}x{grid_v[1].size} nodes')
+    nproc = max(1, min(nproc or os.cpu_count() or 1, len(timesteps)))
+    initargs = (grid_u, grid_v, datadir, outdir, slices, archive)
+    print(f'[INFO] Computing vorticity at {len(timesteps)} time step(s) '
+          f'with {nproc} process(es) ...')
+    tic = time.perf_counter()
+    writer = None
+    if nproc == 1:
+        _init_worker(*initargs)
+        results = map(_compute_timestep, timesteps)
+        pool = None
+    else:
+        pool = multiprocessing.Pool(nproc, initializer=_init_worker,
+                                    initargs=initargs)
+        results = pool.imap_unordered(_compute_timestep, timesteps)
+    try:
+        for i, (timestep, grid_wz, wz) in enumerate(results):
+            if archive:
+                if writer is None:
+                    writer = wz_archive.ArchiveWriter(archive_path, 'wz',
+                                                      grid_wz, dtype=dtype)
+                writer.write(timestep, wz)
+            elif i == 0:
+                _write_grid(outdir / 'grid.h5', grid_wz)
+            manifest.update(*get_paths(timestep), params=params,
+                            key=get_key(timestep))
+            manifest.save()
+            elapsed = time.perf_counter() - tic
+            print(f'[time step {timestep}] Saved vorticity field '
+                  f'({i + 1}/{len(timesteps)}, '
+                  f'{(i + 1) / elapsed:.2f} snapshots/s)')
+    finally:
+        if writer is not None:
+            writer.close()
+        if pool is not None:
+            pool.terminate()  # all tasks are done (or one failed)
+            pool.join()
+    throughput = len(timesteps) / (time.perf_counter() - tic)
+    print(f'[INFO] Processed {len(timesteps)} snapshot(s) '
+          f'({throughput:.2f} snapshots/s)')
+    return throughput
@@ -0,0 +1,226 @@
+"""Compute statistics of force histories over many time windows at once.
+
+The signals are traversed once to build prefix sums of x and x^2 (shifted
+by their first value to limit cancellation), so that the mean, RMS (root
+mean square), and standard deviation over any window are obtained in O(1)
+from two differences.
+Minimum and maximum values use the same idea: prefix and suffix extrema
+within blocks of samples, plus a sparse table over the block extrema
+(only N / block values), answer a window spanning several blocks in O(1);
+windows shorter than a block are scanned directly.
+Building costs O(N) and W windows cost O(W), hence O(N + W) to scan the
+sensitivity of the statistics to the averaging window; `WindowStats`
+requires increasing time values.
+The windows include both time limits (as `petibmpy.get_time_averaged_values`
+and `petibmpy.get_rms_values`).
+Only `WindowStats` meets the O(N + W) cost: a single window is cheaper to
+reduce directly, with a few passes over its samples (`get_statistics`).
+
+    python misc/window_stats.py runs/Re2000/*/2k35 --starts 40 70 --end 80
+"""
+
+import argparse
+import pathlib
+
+import numpy
+
+import petibmpy
+
+import forces
+
+
+class WindowStats(object):
+    """Mean, RMS, minimum, and maximum values of signals over time windows."""
+
+    def __init__(self, t, *signals, block=64):
+        """Build the prefix sums and extrema of the signals.
+
+        Parameters
+        ----------
+        t : numpy.ndarray
+            Time values (increasing), of shape (nt,).
+        signals : numpy.ndarray
+            Signals, of shape (nt,).
+        block : int
+            Number of samples per block for the extrema; default: 64.
+
+        """
+        self.t = numpy.asarray(t)
+        values = numpy.stack([numpy.asarray(s, dtype=numpy.float64)
+                              for s in signals])
+        k, nt = values.shape
+        self.shift = values[:, :1].copy()
+        x = values - self.shift
+        self.s1 = numpy.zeros((k, nt + 1))
+        self.s2 = numpy.zeros((k, nt + 1))
+        numpy.cumsum(x, axis=-1, out=self.s1[:, 1:])
+        numpy.cumsum(x**2, axis=-1, out=self.s2[:, 1:])
+        # Minimum values of (x, -x) to get the minimum and maximum at once.
+        self.block = block
+        nb = -(-nt // block)
+        y = numpy.full((2 * k, nb * block), numpy.inf)
+        y[:k, :nt], y[k:, :nt] = values, -values
+        y = y.reshape(2 * k, nb, block)
+        self.blocks = y
+        self.prefix = numpy.minimum.accumulate(y, axis=-1)
+        self.suffix = numpy.minimum.accumulate(y[..., ::-1],
+                                               axis=-1)[..., ::-1]
+        levels = max(1, int(numpy.log2(nb)) + 1)
+        self.table = numpy.full((levels, 2 * k, nb), numpy.inf)
+        self.table[0] = self.prefix[..., -1]
+        for j in range(1, levels):
+            h = 2**(j - 1)
+            self.table[j, :, :nb - h] = numpy.minimum(
+                self.table[j - 1, :, :nb - h], self.table[j - 1, :, h:])
+
+    def get_indices(self, time_limits):
+        """Return the indices delimiting time windows.
+
+        Parameters
+        ----------
+        time_limits : numpy.ndarray
+            Start and end times of the windows, of shape (..., 2).
+
+        Returns
+        -------
+        numpy.ndarray
+            Index of the first sample of each window, of shape (...).
+        numpy.ndarray
+            Index past the last sample of each window, of shape (...).
+
+        """
+        time_limits = numpy.asarray(time_limits, dtype=numpy.float64)
+        return (numpy.searchsorted(self.t, time_limits[..., 0], side='left'),
+                numpy.searchsorted(self.t, time_limits[..., 1], side='right'))
+
+    def _get_minima(self, i0, i1):
+        """Return the minimum values of (x, -x) over windows [i0, i1)."""
+        B = self.block
+        last = numpy.maximum(i1 - 1, i0)
+        b0, b1 = i0 // B, last // B
+        # Windows spanning several blocks: suffix of the first block,
+        # prefix of the last block, and sparse table over the inner blocks
+        # (two overlapping ranges of 2^j blocks).
+        minima = numpy.minimum(self.suffix[:, b0, i0 % B],
+                               self.prefix[:, b1, last % B])
+        size = b1 - b0 - 1
+        j = numpy.log2(numpy.maximum(size, 1)).astype(int)
+        nb = self.table.shape[-1]
+        inner = numpy.minimum(
+            self.table[j, :, numpy.minimum(b0 + 1, nb - 1)],
+            self.table[j, :, numpy.clip(b1 - 2**j, 0, nb - 1)]).T
+        minima = numpy.where(size > 0, numpy.minimum(minima, inner), minima)
+        # Windows within a block: direct scan.
+        short = numpy.flatnonzero(b0 == b1)
+        if short.size > 0:
+            offsets = numpy.arange(B)
+            inside = ((offsets >= (i0[short] % B)[:, None]) &
+                      (offsets <= (last[short] % B)[:, None]))
+            values = numpy.where(inside, self.blocks[:, b0[short]], numpy.inf)
+            minima[:, short] = values.min(axis=-1)
+        return minima
+
+    def compute(self, time_limits):
+        """Compute the statistics of the signals over time windows.
+
+        Parameters
+        ----------
+        time_limits : numpy.ndarray
+            Start and end times of the windows, of shape (..., 2).
+
+        Returns
+        -------
+        dict of numpy.ndarray
+            mean, rms, std, min, max: statistics of each signal over each
+            window, of shape (signal, ...); NaN for empty windows.
+
+        """
+        i0, i1 = self.get_indices(time_limits)
+        shape = i0.shape
+        i0, i1 = i0.ravel(), i1.ravel()
+        count = i1 - i0
+        k = self.s1.shape[0]
+        with numpy.errstate(divide='ignore', invalid='ignore'):
+            m1 = (self.s1[:, i1] - self.s1[:, i0]) / count
+            m2 = (self.s2[:, i1] - self.s2[:, i0]) / count
+        # Mean of the squares of the unshifted signals.
+        rms = numpy.sqrt(numpy.maximum(
+            m2 + self.shift * (2.0 * m1 + self.shift), 0.0))
+        std = numpy.sqrt(numpy.maximum(m2 - m1**2, 0.0))
+        minima = self._get_minima(numpy.minimum(i0, self.t.size - 1), i1)
+        stats = dict(mean=m1 + self.shift, rms=rms, std=std,
+                     min=minima[:k], max=-minima[k:])
+        for name, values in stats.items():
+            values[:, count <= 0] = numpy.nan
+            stats[name] = values.reshape((k,) + shape)
+        return stats
+
+
+def get_statistics(t, *signals, limits=(-numpy.inf, numpy.inf)):
+    """Return the mean, RMS, minimum, and maximum values over a window.
+
+    Parameters
+    ----------
+    t : numpy.ndarray
+        Time values (if they do not increase, e.g., after a restart that
+        repeats time values, the window is selected with a mask).
+    signals : numpy.ndarray
+        Signals.
+    limits : tuple of floats
+        Time window; default: all time values.
+
+    Returns
+    -------
+    dict of numpy.ndarray
+        mean, rms, std, min, max: statistics of each signal, of shape
+        (signal,); NaN for an empty window.
+
+    """
+    t = numpy.asarray(t)
+    if numpy.all(numpy.diff(t) > 0.0):
+        window = slice(numpy.searchsorted(t, limits[0], side='left'),
+                       numpy.searchsorted(t, limits[1], side='right'))
+    else:
+        window = (t >= limits[0]) & (t <= limits[1])
+    values = numpy.stack([numpy.asarray(s, dtype=numpy.float64)[window]
+                          for s in signals])
+    if values.shape[-1] == 0:
+        nan = numpy.full(len(signals), numpy.nan)
+        return dict(mean=nan, rms=nan.copy(), std=nan.copy(),
+                    min=nan.copy(), max=nan.copy())
+    mean = values.sum(axis=-1) / values.shape[-1]
+    m2 = numpy.einsum('ij,ij->i', values, values) / values.shape[-1]
+    return dict(mean=mean, rms=numpy.sqrt(m2),
+                std=numpy.sqrt(numpy.maximum(m2 - mean**2, 0.0)),
+                min=values.min(axis=-1), max=values.max(axis=-1))
+
+
+def parse_command_line():
+    """Parse the command-line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('simudirs', type=pathlib.Path, nargs='+',
+                        help='simulation directories')
+    parser.add_argument('--starts', type=float, nargs=2, default=[40.0, 70.0],
+                        metavar=('FIRST', 'LAST'),
+                        help='range of start times (default: 40 70)')
+    parser.add_argument('--step', type=float, default=1.0,
+                        help='step between start times (default: 1.0)')
+    parser.add_argument('--end', type=float, default=80.0,
+                        help='end time of the windows (default: 80.0)')
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_command_line()
+    starts = numpy.arange(args.starts[0], args.starts[1] + 1e-9, args.step)
+    windows = numpy.stack([starts, numpy.full_like(starts, args.end)], -1)
+    for simudir in args.simudirs:
+        t, fx, fy = forces.read_forces(simudir / 'output' / 'forces-0.txt')
+        cd, cl = petibmpy.get_force_coefficients(fx, fy, coeff=2.0)
+        stats = WindowStats(t, cd, cl).compute(windows)
+        print(f'[{simudir}]')
+        print('Start\t<C_D>\trms(C_D)\t<C_L>\trms(C_L)')
+        for i, start in enumerate(starts):
+            print(f'{start:g}\t{stats["mean"][0, i]:.4f}\t'
+                  f'{stats["rms"][0, i]:.4f}\t{stats["mean"][1, i]:.4f}\t'
+                  f'{stats["rms"][1, i]:.4f}')
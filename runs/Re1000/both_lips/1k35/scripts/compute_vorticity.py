@@ -1,39 +1,55 @@
 """Compute the vorticity field."""
 
+import argparse
 import pathlib
+import sys
 
 import numpy
-import petibmpy
 import yaml
 
+sys.path.insert(0, str(pathlib.Path(__file__).absolute().parents[5] / 'misc'))
+import vorticity  # noqa: E402
+
+
+parser = argparse.ArgumentParser(description='Compute the vorticity field.')
+parser.add_argument('--nproc', type=int, default=None,
+                    help='number of worker processes (default: all CPUs)')
+parser.add_argument('--all', dest='all_timesteps', action='store_true',
+                    help='process all saved time steps')
+parser.add_argument('--box', type=float, nargs=4,
+                    default=[-1.0, 4.0, -1.5, 1.5],
+                    metavar=('XMIN', 'XMAX', 'YMIN', 'YMAX'),
+                    help='region of interest (default: plotted window)')
+parser.add_argument('--full-domain', dest='box', action='store_const',
+                    const=None,
+                    help='compute the vorticity in the whole domain')
+parser.add_argument('--force', action='store_true',
+                    help='recompute time steps already up to date')
+parser.add_argument('--hash', dest='content', action='store_true',
+                    help='compare the solution files with their content '
+                         '(instead of size and modification time)')
+parser.add_argument('--archive', action='store_true',
+                    help='write all snapshots in a single compressed '
+                         'archive (wz.h5)')
+parser.add_argument('--float32', dest='dtype', action='store_const',
+                    const='float32', default='float64',
+                    help='store the archive in single precision')
+args = parser.parse_args()
 
 maindir = pathlib.Path(__file__).absolute().parents[1]
 datadir = maindir / 'output'
 outdir = maindir / 'postprocessing' / 'wz'
-outdir.mkdir(parents=True, exist_ok=True)
 
 filepath = maindir / 'config.yaml'
 with open(filepath, 'r') as f:
     config = yaml.safe_load(f)['parameters']
 start, end, nsave = config['startStep'], config['nt'], config['nsave']
 timesteps = numpy.arange(start, end + 1, step=nsave)
-timesteps = [150000, 160000]
-
-filepath = datadir / 'grid.h5'
-grid_u = petibmpy.read_grid_hdf5(filepath, 'u')
-grid_v = petibmpy.read_grid_hdf5(filepath, 'v')
-saved_once = False
-for timestep in timesteps:
-    print(f'[time step {timestep}] Computing and saving vorticity field ...')
-    filepath = datadir / f'{timestep:0>7}.h5'
-    u = petibmpy.read_field_hdf5(filepath, 'u')
-    v = petibmpy.read_field_hdf5(filepath, 'v')
-    wz, grid_wz = petibmpy.compute_wz(u, v, grid_u, grid_v)
-
-    if not saved_once:
-        filepath = outdir / 'grid.h5'
-        petibmpy.write_grid_hdf5(filepath, 'wz', *grid_wz)
-        saved_once = True
-
-    filepath = outdir / f'{timestep:0>7}.h5'
-    petibmpy.write_field_hdf5(filepath, 'wz', wz)
+if not args.all_timesteps:
+    timesteps = [150000, 160000]
+
+if __name__ == '__main__':
+    vorticity.compute_vorticity(datadir, outdir, timesteps, nproc=args.nproc,
+                                box=args.box, force=args.force,
+                                content=args.content, archive=args.archive,
+                                dtype=args.dtype)
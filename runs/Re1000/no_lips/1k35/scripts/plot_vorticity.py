@@ -1,12 +1,41 @@
 """Plot the voriticity field at saved time steps."""
 
+import argparse
 import pathlib
+import sys
 
 import numpy
 import petibmpy
 import yaml
 from matplotlib import pyplot
 
+sys.path.insert(0, str(pathlib.Path(__file__).absolute().parents[5] / 'misc'))
+import animate  # noqa: E402
+import archive  # noqa: E402
+import bodies  # noqa: E402
+import incremental  # noqa: E402
+
+
+parser = argparse.ArgumentParser(description='Plot the vorticity field.')
+parser.add_argument('--all', dest='all_timesteps', action='store_true',
+                    help='plot all saved time steps')
+parser.add_argument('--force', action='store_true',
+                    help='plot time steps whose figure is up to date')
+parser.add_argument('--hash', dest='content', action='store_true',
+                    help='compare the vorticity files with their content '
+                         '(instead of size and modification time)')
+parser.add_argument('--archive', action='store_true',
+                    help='read the frames from the vorticity archive wz.h5')
+parser.add_argument('--animate', type=pathlib.Path, default=None,
+                    metavar='FILE',
+                    help='render the time steps into a video (.mp4 or .gif) '
+                         'instead of PNG files')
+parser.add_argument('--fps', type=int, default=10,
+                    help='frames per second of the video (default: 10)')
+parser.add_argument('--nproc', type=int, default=None,
+                    help='number of worker processes to render the video '
+                         '(default: all CPUs)')
+args = parser.parse_args()
 
 maindir = pathlib.Path(__file__).absolute().parents[1]
 datadir = maindir / 'postprocessing' / 'wz'
@@ -19,21 +48,69 @@ with open(filepath, 'r') as f:
 start, end, nsave = config['startStep'], config['nt'], config['nsave']
 dt = config['dt']
 timesteps = numpy.arange(start, end + 1, step=nsave)
-timesteps = [145000, 165000]
+if not args.all_timesteps:
+    timesteps = [145000, 165000]
+manifest = incremental.Manifest(figdir / 'manifest.yaml', content=args.content)
 
-filepath = maindir / 'snake.body'
-body = petibmpy.read_body(filepath, skiprows=1)
+bodypath = maindir / 'snake.body'
+body = bodies.read_body(bodypath)
 
-filepath = datadir / 'grid.h5'
-grid = petibmpy.read_grid_hdf5(filepath, 'wz')
+if args.archive:
+    archive_path = archive.get_archive_path(datadir, 'wz')
+    if not archive_path.is_file():
+        print(f'[WARNING] Archive {archive_path} not found; '
+              'reading the snapshot files instead')
+        args.archive = False
+if args.archive:
+    frames = archive.get_frames(archive_path)  # write stamp of each frame
+    timesteps = [timestep for timestep in timesteps if timestep in frames]
+    grid = archive.read_grid(archive_path)
+else:
+    timesteps = incremental.get_saved_timesteps(datadir, timesteps)
+    filepath = datadir / 'grid.h5'
+    grid = petibmpy.read_grid_hdf5(filepath, 'wz')
 
 pyplot.rc('font', family='serif', size=12)
 levels = numpy.linspace(-5.0, 5.0, num=50)
 
+if args.animate is not None:
+    # Render the snapshots in parallel and encode them into a video.
+    source = archive_path if args.archive else datadir
+    animate.animate_vorticity(source, grid, body, timesteps, args.animate,
+                              dt, levels=levels, fps=args.fps,
+                              nproc=args.nproc)
+    sys.exit(0)
+
+
+def get_inputs(timestep):
+    """Return the inputs and parameters of the figure at a time step."""
+    if args.archive:
+        return [bodypath], dict(stamp=frames[timestep])
+    return ([bodypath, datadir / 'grid.h5', datadir / f'{timestep:0>7}.h5'],
+            None)
+
+
+# Skip the figures that are up to date.
+todo = []
 for timestep in timesteps:
-    print(f'[time step {timestep}] Loading and plotting the vorticity field ...')
-    filepath = datadir / f'{timestep:0>7}.h5'
-    wz = petibmpy.read_field_hdf5(filepath, 'wz')
+    figpath = figdir / f'vorticity_{timestep:0>7}.png'
+    if not args.force and manifest.is_up_to_date(figpath,
+                                                 *get_inputs(timestep)):
+        print(f'[time step {timestep}] Figure up to date; skipping')
+        continue
+    todo.append(timestep)
+
+# Stream the vorticity fields (one frame in memory at a time).
+if args.archive:
+    snapshots = archive.iter_frames(archive_path, 'wz', timesteps=todo)
+else:
+    snapshots = ((timestep,
+                  petibmpy.read_field_hdf5(datadir / f'{timestep:0>7}.h5',
+                                           'wz'))
+                 for timestep in todo)
+
+for timestep, wz in snapshots:
+    print(f'[time step {timestep}] Plotting the vorticity field ...')
 
     fig, ax = pyplot.subplots(figsize=(5.0, 3.0))
     ax.text(-0.5, 1.0, f't = {timestep * dt:.1f}')
@@ -46,7 +123,9 @@ for timestep in timesteps:
     ax.set_ylim(-1.5, 1.5)
     fig.tight_layout()
 
-    filepath = figdir / f'vorticity_{timestep:0>7}.png'
-    fig.savefig(filepath, dpi=300, bbox_inches='tight')
+    figpath = figdir / f'vorticity_{timestep:0>7}.png'
+    fig.savefig(figpath, dpi=300, bbox_inches='tight')
+    manifest.update(figpath, *get_inputs(timestep))
+    manifest.save()
 
     pyplot.close(fig)
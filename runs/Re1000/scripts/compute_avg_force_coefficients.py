@@ -1,10 +1,13 @@
 """Compute time-averaged force coefficients vs. angle of attack."""
 
 import pathlib
+import sys
 
 import yaml
 
-import petibmpy
+sys.path.insert(0, str(pathlib.Path(__file__).absolute().parents[3] / 'misc'))
+import force_cube  # noqa: E402
+import spectra  # noqa: E402
 
 
 maindir = pathlib.Path(__file__).absolute().parents[1]
@@ -14,33 +17,40 @@ angles = [15, 20, 25, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39, 40, 45]
 Re = 1000  # Reynolds number
 limits = (50.0, 80.0)  # time-limits use for averaging force coefficients
 
-# Load forces from files and compute time-averaged force coefficients.
-cd_all, cl_all = dict(), dict()
-for section in sections:
-    label = section.replace('_', ' ')
-    cd_section, cl_section = [], []
-    for angle in angles:
-        folder = f'{Re // 1000}k{angle}'
-        print(f'[{label} - {folder}] Computing time-averaged values ...')
-        simudir = maindir / section / folder
-        datadir = simudir / 'output'
-        filepath = datadir / 'forces-0.txt'
-        t, fx, fy = petibmpy.read_forces(filepath)
-        cd, cl = petibmpy.get_force_coefficients(fx, fy, coeff=2.0)
-        cd, cl = petibmpy.get_time_averaged_values(t, cd, cl, limits=limits)
-        cd_section.append(float(cd))
-        cl_section.append(float(cl))
-    cd_all[label], cl_all[label] = cd_section, cl_section
-
-data = dict()
-data['Re'] = Re
-data['time limits'] = limits
-data['AoA'] = angles
-data['Cd'] = cd_all
-data['Cl'] = cl_all
-
-datadir = maindir / 'data'
-datadir.mkdir(parents=True, exist_ok=True)
-filepath = datadir / 'avg_force_coefficients.yaml'
-with open(filepath, 'w') as f:
-    yaml.safe_dump(data, f)
+# Load forces from files and compute time-averaged force coefficients
+# (all simulations in parallel; the guard is required by the process pool).
+if __name__ == '__main__':
+    cases = [force_cube.Case(Re, section, angle,
+                             maindir / section / f'{Re // 1000}k{angle}')
+             for section in sections for angle in angles]
+    cube = force_cube.load_cube(cases, time_limits=limits, history=True,
+                                sections=sections)
+    # Strouhal numbers (dominant frequencies of all histories at once).
+    spectra.add_spectra(cube)
+    cd_all, cl_all = dict(), dict()
+    st_cd_all, st_cl_all = dict(), dict()
+    for section in sections:
+        label = section.replace('_', ' ')
+        cd_all[label] = cube.get('cd/mean', Re, section).tolist()
+        cl_all[label] = cube.get('cl/mean', Re, section).tolist()
+        st_cd_all[label] = cube.get('cd/St', Re, section).tolist()
+        st_cl_all[label] = cube.get('cl/St', Re, section).tolist()
+
+    data = dict()
+    data['Re'] = Re
+    data['time limits'] = limits
+    data['AoA'] = angles
+    data['Cd'] = cd_all
+    data['Cl'] = cl_all
+    data['St (Cd)'] = st_cd_all
+    data['St (Cl)'] = st_cl_all
+
+    datadir = maindir / 'data'
+    datadir.mkdir(parents=True, exist_ok=True)
+    filepath = datadir / 'avg_force_coefficients.yaml'
+    with open(filepath, 'w') as f:
+        yaml.safe_dump(data, f)
+
+    # Save the statistics, histories, and spectra of all simulations (read
+    # by the plotting scripts).
+    force_cube.write_cube(datadir / 'force_coefficients.h5', cube)
@@ -1,42 +1,29 @@
 """Plot vertical profiles of the velocity components."""
 
 import pathlib
+import sys
 
-import h5py
-import numpy
 from matplotlib import pyplot
 
 import petibmpy
 
-
-def get_time_values_hdf5(filepath, name):
-    """Return time values of HDF5 datasets."""
-    with h5py.File(filepath, 'r') as infile:
-        times = [float(t_str) for t_str in list(infile[name].keys())[:-1]]
-    return numpy.array(sorted(times))
+sys.path.insert(0, str(pathlib.Path(__file__).absolute().parents[3] / 'misc'))
+import bodies  # noqa: E402
+import probes  # noqa: E402
 
 
 def get_time_averaged_profile(filepath, name, xloc, time_limits):
     """Return the time-averaged vertical profile at given x-location."""
-    # Get array of revelant time values.
-    times = get_time_values_hdf5(filepath, name)
-    mask = numpy.where((times >= time_limits[0]) &
-                       (times <= time_limits[1]))[0]
-    times = times[mask]
-    # Load solution, interpolate at x-location, and time-average.
-    probe = petibmpy.ProbeVolume(name, name)
-    initialized = False
-    for time in times:
-        # Load solution from file.
-        (x, y), vals_ = probe.read_hdf5(filepath, time)
-        # Interpolate at x=xloc.
-        vals_ = petibmpy.linear_interpolation(vals_.T, x, xloc)
-        if not initialized:
-            vals = vals_
-            initialized = True
-        else:
-            vals += vals_
-    vals /= times.size
+    # Time values within the window, excluding the last saved time (as in
+    # the published averages).
+    _, times = probes.read_probe_times(filepath, name=name)
+    times = times[:-1]
+    times = times[(times >= time_limits[0]) & (times <= time_limits[1])]
+    # Load solution averaged over the time values (single read).
+    (x, y), vals = probes.get_time_averaged_values(filepath, name=name,
+                                                   time_values=times)
+    # Interpolate at x=xloc.
+    vals = petibmpy.linear_interpolation(vals.T, x, xloc)
     return dict(y=y, vals=vals)
 
 
@@ -123,7 +110,7 @@ for component in ('u', 'v'):
     fig.tight_layout()
     # Add immersed body to the plot.
     filepath = maindir / 'both_lips' / case / 'snake.body'
-    body = petibmpy.read_body(filepath, skiprows=1)
+    body = bodies.read_body(filepath)
     ax.fill(*body, color='black', alpha=0.5)
     # Save figure as PNG.
     figdir = maindir / 'figures'
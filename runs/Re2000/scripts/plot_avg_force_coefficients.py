@@ -1,11 +1,13 @@
 """Plot time-averaged force coefficients vs. angle of attack."""
 
 import pathlib
+import sys
 
 import yaml
 from matplotlib import pyplot
 
-import petibmpy
+sys.path.insert(0, str(pathlib.Path(__file__).absolute().parents[3] / 'misc'))
+import force_cube  # noqa: E402
 
 
 save_figures = True  # save Matplotlib figures as PNG files
@@ -16,12 +18,23 @@ pyplot.rc('font', family='serif', size=12)
 maindir = pathlib.Path(__file__).absolute().parents[1]
 datadir = maindir / 'data'
 
-with open(datadir / 'avg_force_coefficients.yaml', 'r') as f:
-    data = yaml.safe_load(f)
-Re = data['Re']
-angles = data['AoA']
-cd_all = data['Cd']
-cl_all = data['Cl']
+filepath = datadir / 'force_coefficients.h5'
+if filepath.is_file():
+    cube = force_cube.read_cube(filepath)
+    Re = cube.Re[0]
+    angles = cube.angles
+    cd_all, cl_all = dict(), dict()
+    for section in cube.sections:
+        label = section.replace('_', ' ')
+        cd_all[label] = cube.get('cd/mean', Re, section)
+        cl_all[label] = cube.get('cl/mean', Re, section)
+else:  # only the summary (committed to the repository) is available
+    with open(datadir / 'avg_force_coefficients.yaml', 'r') as f:
+        data = yaml.safe_load(f)
+    Re = data['Re']
+    angles = data['AoA']
+    cd_all = data['Cd']
+    cl_all = data['Cl']
 
 ratio_all = dict()
 sections = ['both lips', 'front lip', 'back lip', 'no lips']
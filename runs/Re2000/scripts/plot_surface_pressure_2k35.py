@@ -1,13 +1,16 @@
 """Plot the profile of the surface pressure."""
 
 import pathlib
+import sys
 
 import numpy
 import pandas
 from matplotlib import pyplot
 from scipy.interpolate import RegularGridInterpolator
 
-import petibmpy
+sys.path.insert(0, str(pathlib.Path(__file__).absolute().parents[3] / 'misc'))
+import bodies  # noqa: E402
+import probes  # noqa: E402
 
 
 def get_surface_pressure(simudir):
@@ -16,7 +19,7 @@ def get_surface_pressure(simudir):
 
     # Load boundary coordinates from file.
     filepath = simudir / 'snake.body'
-    xb, yb = petibmpy.read_body(filepath, skiprows=1)
+    xb, yb = bodies.read_body(filepath)
 
     # Compute mid-points on the boundary.
     xb_m, yb_m = 0.5 * (xb[:-1] + xb[1:]), 0.5 * (yb[:-1] + yb[1:])
@@ -31,9 +34,10 @@ def get_surface_pressure(simudir):
     # List of time values to process.
     times = numpy.arange(50.0, 80.0 + 1, 2.0)
 
-    # Define the grid interpolator.
+    # Load the pressure averaged over time (single read of the probe).
     filepath = datadir / 'probe-p.h5'
-    grid, p = petibmpy.ProbeVolume('p', 'p').read_hdf5(filepath, times[0])
+    grid, p = probes.get_time_averaged_values(filepath, name='p',
+                                              time_values=times)
     interpolator = RegularGridInterpolator(grid, p.T)
 
     # Define the interpolation points.
@@ -41,13 +45,8 @@ def get_surface_pressure(simudir):
     x_interp, y_interp = xb_m + dist * x_n, yb_m + dist * y_n
     points = numpy.array([x_interp, y_interp]).T
 
-    # Interpolate the pressure at interpolation points (averaged over time).
-    p_interp = numpy.zeros_like(x_interp)
-    for time in times:
-        _, p = petibmpy.ProbeVolume('p', 'p').read_hdf5(filepath, time)
-        interpolator.values = p.T
-        p_interp += interpolator(points)
-    p_interp /= len(times)
+    # Interpolate the time-averaged pressure at interpolation points.
+    p_interp = interpolator(points)
 
     return xb_m, p_interp
 
@@ -1,11 +1,18 @@
 """Compute statistics about the force coefficients."""
 
 import pathlib
+import sys
 
+import numpy
 import pandas
 
 import petibmpy
 
+sys.path.insert(0, str(pathlib.Path(__file__).absolute().parents[4] / 'misc'))
+import forces  # noqa: E402
+import uncertainty  # noqa: E402
+import window_stats  # noqa: E402
+
 
 maindir = pathlib.Path(__file__).absolute().parents[1]
 metadata = {'Base case': 'base',
@@ -22,17 +29,23 @@ print(f'Time limits: {time_limits}')
 df = pandas.DataFrame(
     columns=['Case', '<C_D>', 'rms(C_D)', '<C_L>', 'rms(C_L)']
 )
+intervals = []
 
 for name, folder in metadata.items():
     simudir = maindir / folder
     filepath = simudir / 'output' / 'forces-0.txt'
-    t, fx, fy = petibmpy.read_forces(filepath)
+    t, fx, fy = forces.read_forces(filepath)
     cd, cl = petibmpy.get_force_coefficients(fx, fy, coeff=2.0)
-    cd_mean, cl_mean = petibmpy.get_time_averaged_values(t, cd, cl,
-                                                         limits=time_limits)
-    cd_rms, cl_rms = petibmpy.get_rms_values(t, cd, cl, limits=time_limits)
+    stats = window_stats.get_statistics(t, cd, cl, limits=time_limits)
+    (cd_mean, cl_mean), (cd_rms, cl_rms) = stats['mean'], stats['rms']
 
     df.loc[len(df)] = [name, cd_mean, cd_rms, cl_mean, cl_rms]
+    # Standard errors of the mean (batch means on shedding cycles and
+    # integrated autocorrelation time) and 95% confidence intervals
+    # (batch bootstrap), with the statistics over the same whole cycles.
+    mask = (t >= time_limits[0]) & (t <= time_limits[1])
+    intervals.append(uncertainty.compute_intervals(
+        t[mask], numpy.stack([cd, cl])[:, mask], lift=cl[mask], seed=0))
 
 df = df.set_index('Case').round(decimals=3)
 
@@ -46,6 +59,23 @@ rdiff_df = rdiff_df.round(decimals=1)
 print('\nPercentage relative difference wrt Base case:')
 print(rdiff_df)
 
+res = {key: numpy.array([r[key] for r in intervals])
+       for key in ('mean', 'rms', 'se_batch', 'se_iat', 'mean_ci', 'rms_ci')}
+ci_df = pandas.DataFrame(index=df.index)
+for i, name in enumerate(['C_D', 'C_L']):
+    ci_df[f'<{name}>_cycles'] = res['mean'][:, i]
+    ci_df[f'rms({name})_cycles'] = res['rms'][:, i]
+    ci_df[f'<{name}>_se'] = res['se_batch'][:, i]
+    ci_df[f'<{name}>_se_iat'] = res['se_iat'][:, i]
+    ci_df[f'<{name}>_low'], ci_df[f'<{name}>_high'] = res['mean_ci'][:, i].T
+    ci_df[f'rms({name})_low'], ci_df[f'rms({name})_high'] = (
+        res['rms_ci'][:, i].T)
+ci_df = ci_df.round(decimals=4)
+
+print('\nStatistics over whole shedding cycles, standard errors, '
+      'and 95% confidence intervals:')
+print(ci_df)
+
 merged = df.merge(rdiff_df, on='Case', suffixes=('', '_rdiff'))
 ncols = len(df.columns)
 ordered_cols = [
@@ -54,4 +84,4 @@ ordered_cols = [
 datadir = maindir / 'data'
 datadir.mkdir(parents=True, exist_ok=True)
 filepath = datadir / 'force_coefficients_stats.csv'
-merged[ordered_cols].to_csv(filepath)
+merged[ordered_cols].join(ci_df).to_csv(filepath)
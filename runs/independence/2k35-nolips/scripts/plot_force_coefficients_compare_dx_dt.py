@@ -2,11 +2,15 @@
 
 import collections
 from matplotlib import pyplot
-import numpy
 import pathlib
+import sys
 
 import petibmpy
 
+sys.path.insert(0, str(pathlib.Path(__file__).absolute().parents[4] / 'misc'))
+import forces  # noqa: E402
+import window_stats  # noqa: E402
+
 
 Solution = collections.namedtuple('Solution', ['t', 'cd', 'cl'])
 
@@ -15,16 +19,15 @@ def get_force_coefficients(simudir):
     """Load forces from file and return force coefficients."""
     datadir = simudir / 'output'
     filepath = datadir / 'forces-0.txt'
-    t, fx, fy = petibmpy.read_forces(filepath)
+    t, fx, fy = forces.read_forces(filepath)
     cd, cl = petibmpy.get_force_coefficients(fx, fy, coeff=2.0)
     return Solution(t, cd, cl)
 
 
 def get_time_averaged_stats(solution, limits):
-    mask = numpy.where((solution.t >= limits[0]) & (solution.t <= limits[1]))
-    return Solution(limits,
-                    numpy.mean(solution.cd[mask]),
-                    numpy.mean(solution.cl[mask]))
+    stats = window_stats.get_statistics(solution.t, solution.cd, solution.cl,
+                                        limits=limits)
+    return Solution(limits, *stats['mean'])
 
 
 # Set parameters.
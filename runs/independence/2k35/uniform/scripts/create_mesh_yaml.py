@@ -3,8 +3,12 @@
 import collections
 from matplotlib import pyplot
 import pathlib
+import sys
 
-import petibmpy
+sys.path.insert(0, str(pathlib.Path(__file__).absolute().parents[5] / 'misc'))
+import bodies  # noqa: E402
+import meshcache  # noqa: E402
+import plot_mesh  # noqa: E402
 
 
 Box = collections.namedtuple('Box', ['xstart', 'xend', 'ystart', 'yend'])
@@ -30,17 +34,15 @@ config = [dict(direction='x', start=domain.xstart,
           dict(direction='y', start=domain.ystart,
                subDomains=[config_y1, config_y2, config_y3])]
 
-grid = petibmpy.CartesianGrid(config)
-print(grid)
 simudir = pathlib.Path(__file__).absolute().parents[1]
 filepath = simudir / 'mesh.yaml'
-grid.write_yaml(filepath, ndigits=10)
-grid.print_info()
+gridlines = meshcache.write_mesh_yaml(config, filepath, ndigits=10)
+meshcache.print_info(gridlines)
 
 if show_figure:
-    fig, ax = grid.plot_gridlines_2d()
-    # Plot body coordinates.
+    # Plot gridlines (level of detail) with body coordinates and boxes.
     filepath = simudir / 'snake.body'
-    xb, yb = petibmpy.read_body(filepath, skiprows=1)
-    ax.plot(xb, yb, color='C3', marker='x')
+    body = bodies.read_body(filepath)
+    fig, ax = plot_mesh.plot_gridlines_2d(gridlines, body=body,
+                                          boxes=[box])
     pyplot.show()